@@ -1,78 +1,113 @@
+import glob
+import os
+
 import pandas as pd
 import numpy as np
 import streamlit as st
 
+from armazenamento import ano_do_arquivo
+from perfil_extrato import COLUNAS_CRITICAS, ERRO_QUANTIS, carregar_perfil, gerar_perfil
+
+# Extratos brutos do TSE, um por eleição (extrato_bancario_partido_<ano>.csv)
+PADRAO_EXTRATOS = "extrato_bancario_partido_*.csv"
+
+def extratos_disponiveis():
+    """Extratos brutos encontrados, por ano (o mais recente primeiro)."""
+    extratos = {ano_do_arquivo(caminho) or caminho: caminho for caminho in glob.glob(PADRAO_EXTRATOS)}
+    return dict(sorted(extratos.items(), reverse=True))
+
+@st.cache_resource(show_spinner="Perfilando o extrato (uma passada em blocos)...")
+def ler_perfil(caminho, tamanho, modificado):
+    """
+    Retorna (perfil, gravado). O perfil gravado ao lado do extrato
+    (.perfil.json) é reaproveitado enquanto corresponde ao arquivo (mesmo
+    tamanho e data ou, se não, mesmo hash do conteúdo); senão o perfil é
+    recalculado numa passada e `gravado` é False. `tamanho` e `modificado`
+    só entram na chave do cache, que guarda o resultado por processo.
+    """
+    perfil = carregar_perfil(caminho)
+    if perfil is not None:
+        return perfil, True
+    return gerar_perfil(caminho), False
+
 def analise_exploratoria():
-    st.title("📊 Análise Exploratória - Extratos Bancários de Partidos (2020)")
-    
+    extratos = extratos_disponiveis()
+    ano = st.sidebar.selectbox("Ano do extrato:", list(extratos)) if extratos else "2020"
+    caminho = extratos.get(ano, "extrato_bancario_partido_2020.csv")
+    st.title(f"📊 Análise Exploratória - Extratos Bancários de Partidos ({ano})")
+
     # 1. Carregar dados
     st.header("1. Carregamento de Dados")
     try:
-        extrato = pd.read_csv('extrato_bancario_partido_2020.csv', 
-                             encoding='latin-1', sep=';', low_memory=False)
-        st.success(f"✅ Dataset carregado com sucesso!")
-        st.write(f"**Dimensões:** {extrato.shape[0]:,} linhas × {extrato.shape[1]} colunas")
+        info = os.stat(caminho)
+        perfil, gravado = ler_perfil(caminho, info.st_size, info.st_mtime_ns)
+        origem = "perfil gravado" if gravado else "uma passada sobre o arquivo"
+        st.success(f"✅ Dataset perfilado com sucesso ({origem})!")
+        st.write(f"**Dimensões:** {perfil['linhas']:,} linhas × {len(perfil['colunas'])} colunas")
     except Exception as e:
         st.error(f"❌ Erro ao carregar arquivo: {e}")
         return
-    
+
     # 2. Informações básicas
     st.header("2. Informações Básicas")
-    
+
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.metric("Total de Transações", f"{len(extrato):,}")
+        st.metric("Total de Transações", f"{perfil['linhas']:,}")
     with col2:
-        st.metric("Partidos Únicos", extrato['SG_PARTIDO'].nunique())
+        st.metric("Partidos Únicos", len(perfil['partidos']))
     with col3:
-        valor_total = extrato['VR_LANCAMENTO'].sum()
-        st.metric("Valor Total Movimentado", f"R$ {valor_total:,.2f}")
-    
+        st.metric("Valor Total Movimentado", f"R$ {perfil['valor_total']:,.2f}")
+
     # 3. Estrutura das colunas
     st.header("3. Estrutura das Colunas")
     st.write("**Colunas disponíveis:**")
-    for i, col in enumerate(extrato.columns, 1):
+    for i, col in enumerate(perfil['colunas'], 1):
         st.write(f"{i}. `{col}`")
-    
+
     # 4. Amostra dos dados
     st.header("4. Amostra dos Dados")
-    st.dataframe(extrato.head(10), use_container_width=True)
-    
+    st.dataframe(pd.DataFrame(perfil['amostra'], columns=perfil['colunas']), use_container_width=True)
+
     # 5. Análise de valores missing
     st.header("5. Valores Missing/Problemas")
-    missing_data = extrato.isnull().sum()
+    missing_data = pd.Series(perfil['ausentes'], dtype='int64')
     st.write("Valores missing por coluna:")
     st.dataframe(missing_data[missing_data > 0], use_container_width=True)
-    
+
     # 6. Análise de tipos de lançamento
     st.header("6. Tipos de Lançamento")
-    tipo_lancamento = extrato['TP_LANCAMENTO'].value_counts()
-    st.write(tipo_lancamento)
-    
+    if perfil['tipos']:
+        st.write(pd.Series(perfil['tipos'], name='count').rename_axis('TP_LANCAMENTO'))
+    else:
+        st.warning("Coluna TP_LANCAMENTO não encontrada!")
+
     # 7. Partidos com mais movimentação
     st.header("7. Top 10 Partidos por Movimentação")
-    movimentacao_partidos = extrato.groupby('SG_PARTIDO').agg({
-        'VR_LANCAMENTO': ['sum', 'count']
-    }).round(2)
-    movimentacao_partidos.columns = ['Valor Total', 'Qtd Transações']
-    st.dataframe(movimentacao_partidos.nlargest(10, 'Valor Total'), use_container_width=True)
-    
+    if perfil['partidos']:
+        movimentacao_partidos = pd.DataFrame.from_dict(perfil['partidos'], orient='index').round(2)
+        movimentacao_partidos.columns = ['Valor Total', 'Qtd Transações']
+        movimentacao_partidos.index.name = 'SG_PARTIDO'
+        st.dataframe(movimentacao_partidos.nlargest(10, 'Valor Total'), use_container_width=True)
+    else:
+        st.warning("Nenhum partido encontrado no extrato!")
+
     # 8. Análise de valores
     st.header("8. Estatísticas dos Valores")
-    st.write(extrato['VR_LANCAMENTO'].describe())
-    
+    st.write(pd.Series(perfil['valor'], name='VR_LANCAMENTO', dtype='float64'))
+    st.caption(f"Quartis estimados em uma passada, com erro relativo de até {ERRO_QUANTIS:.0%}.")
+
     # 9. Verificar colunas críticas para nossas perguntas
     st.header("9. Colunas Críticas para Análise")
-    colunas_criticas = ['DS_LANCAMENTO', 'NM_CONTRAPARTE', 'DS_FONTE_RECURSO', 'DS_TIPO_OPERACAO']
-    for coluna in colunas_criticas:
-        if coluna in extrato.columns:
-            st.write(f"**{coluna}:** {extrato[coluna].nunique()} valores únicos")
-            st.write(f"Exemplos: {extrato[coluna].dropna().head(5).tolist()}")
+    for coluna in COLUNAS_CRITICAS:
+        if coluna in perfil['distintos']:
+            st.write(f"**{coluna}:** {perfil['distintos'][coluna]} valores únicos")
+            st.write(f"Exemplos: {perfil['exemplos'][coluna]}")
         else:
             st.warning(f"Coluna {coluna} não encontrada!")
-    
-    return extrato
+
+    return perfil
 
 # Executar análise
 if __name__ == "__main__":
-    df = analise_exploratoria()
\ No newline at end of file
+    perfil = analise_exploratoria()
@@ -0,0 +1,394 @@
+import glob
+import hashlib
+import os
+import re
+import shutil
+import sys
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from serie_temporal import ordenar_por_data
+
+# =============================================
+# ARMAZENAMENTO COLUNAR (PARQUET) DO DASHBOARD
+# =============================================
+
+ARQUIVO_CSV = "extrato_bancario_DASHBOARD.csv"
+DIRETORIO_PARQUET = "extrato_bancario_DASHBOARD.parquet"
+
+# Frame preparado em Arrow IPC, mapeado em memória por todos os processos
+ARQUIVO_ARROW = "extrato_bancario_DASHBOARD.arrow"
+
+# Colunas usadas pela partição Hive (ANO=.../NM_ESFERA=.../SG_PARTIDO=...).
+# ANO é o ano do arquivo de origem (um extrato por eleição), não da transação
+COLUNA_ANO = 'ANO'
+COLUNAS_PARTICAO = [COLUNA_ANO, 'NM_ESFERA', 'SG_PARTIDO']
+
+# Colunas efetivamente lidas pelo dashboard (projeção)
+ESQUEMA_DASHBOARD = pa.schema([
+    ('DT_LANCAMENTO', pa.timestamp('ns')),
+    ('NM_ESFERA', pa.string()),
+    ('CATEGORIA_GASTO', pa.string()),
+    ('SG_PARTIDO', pa.string()),
+    ('NM_CONTRAPARTE', pa.string()),
+    ('VR_LANCAMENTO_NUM', pa.float64()),
+])
+COLUNAS_DASHBOARD = ESQUEMA_DASHBOARD.names
+
+# Colunas mantidas em memória como categóricas (dicionário + códigos inteiros)
+COLUNAS_CATEGORICAS = ['NM_ESFERA', 'SG_PARTIDO', 'CATEGORIA_GASTO', 'NM_CONTRAPARTE']
+
+# Tipos das colunas conhecidas; as demais colunas do CSV são gravadas como texto
+TIPOS_COLUNAS = {
+    'DT_LANCAMENTO': pa.timestamp('ns'),
+    'VR_LANCAMENTO_NUM': pa.float64(),
+}
+
+LINHAS_POR_BLOCO = 500_000
+
+# Troca de versões do dataset: a anterior fica ao lado dele, com este
+# sufixo, até a nova estar no lugar; os leitores esperam a troca por até
+# TENTATIVAS_TROCA × ESPERA_TROCA segundos
+SUFIXO_VERSAO_ANTERIOR = ".antigo-"
+TENTATIVAS_TROCA = 50
+ESPERA_TROCA = 0.02
+
+
+def _esquema_csv(caminho_csv):
+    """Monta o esquema Arrow a partir do cabeçalho do CSV."""
+    colunas = pd.read_csv(caminho_csv, encoding='utf-8', nrows=0).columns
+    return pa.schema([(col, TIPOS_COLUNAS.get(col, pa.string())) for col in colunas])
+
+
+def _blocos_csv(caminho_csv, esquema, linhas_por_bloco):
+    """Lê o CSV em blocos e devolve RecordBatches já tipados."""
+    colunas_texto = {
+        campo.name: str for campo in esquema if campo.name not in TIPOS_COLUNAS
+    }
+    leitor = pd.read_csv(
+        caminho_csv,
+        encoding='utf-8',
+        dtype=colunas_texto,
+        chunksize=linhas_por_bloco
+    )
+    for bloco in leitor:
+        if 'DT_LANCAMENTO' in bloco.columns:
+            bloco['DT_LANCAMENTO'] = pd.to_datetime(bloco['DT_LANCAMENTO'], errors='coerce')
+        if 'VR_LANCAMENTO_NUM' in bloco.columns:
+            bloco['VR_LANCAMENTO_NUM'] = pd.to_numeric(bloco['VR_LANCAMENTO_NUM'], errors='coerce')
+        yield pa.RecordBatch.from_pandas(bloco, schema=esquema, preserve_index=False)
+
+
+# ---------------------------------------------
+# Ano da partição
+# ---------------------------------------------
+
+def ano_do_arquivo(caminho):
+    """Ano no nome do arquivo de origem (ex.: extrato_bancario_partido_2020.csv), ou None."""
+    encontrado = re.search(r'(?<!\d)((?:19|20)\d{2})(?!\d)', os.path.basename(caminho))
+    return encontrado.group(1) if encontrado else None
+
+
+def _ano_predominante(bloco):
+    """Ano mais frequente das datas do bloco, para arquivos sem ano no nome."""
+    anos = pc.year(bloco.column('DT_LANCAMENTO')).drop_null()
+    if len(anos) == 0:
+        return "sem-ano"
+    return str(pc.mode(anos)[0]['mode'].as_py())
+
+
+def esquema_com_ano(esquema):
+    """Esquema de escrita com a coluna ANO da partição."""
+    return esquema.append(pa.field(COLUNA_ANO, pa.string()))
+
+
+def blocos_com_ano(blocos, ano=None):
+    """
+    Acrescenta aos blocos a coluna ANO, constante em todo o arquivo de
+    origem. Sem `ano`, vale o ano predominante das datas do primeiro bloco.
+    """
+    for bloco in blocos:
+        if ano is None:
+            ano = _ano_predominante(bloco)
+        yield bloco.append_column(COLUNA_ANO, pa.array([ano] * bloco.num_rows, pa.string()))
+
+
+def converter_csv_para_parquet(caminho_csv=ARQUIVO_CSV, diretorio=DIRETORIO_PARQUET,
+                               linhas_por_bloco=LINHAS_POR_BLOCO, ano=None):
+    """
+    Converte o CSV do dashboard em um dataset Parquet tipado e particionado
+    por ANO, NM_ESFERA e SG_PARTIDO (o ano vem de `ano`, do nome do arquivo
+    ou das datas). A escrita é feita em blocos num diretório temporário,
+    que só substitui o destino ao final da conversão.
+    """
+    esquema = _esquema_csv(caminho_csv)
+    temporario = diretorio + ".tmp"
+    shutil.rmtree(temporario, ignore_errors=True)
+
+    ds.write_dataset(
+        blocos_com_ano(_blocos_csv(caminho_csv, esquema, linhas_por_bloco), ano or ano_do_arquivo(caminho_csv)),
+        temporario,
+        schema=esquema_com_ano(esquema),
+        format='parquet',
+        partitioning=COLUNAS_PARTICAO,
+        partitioning_flavor='hive',
+        existing_data_behavior='overwrite_or_ignore'
+    )
+
+    substituir_dataset(temporario, diretorio)
+    return diretorio
+
+
+def substituir_dataset(temporario, diretorio=DIRETORIO_PARQUET):
+    """
+    Coloca a versão montada em `temporario` no lugar do dataset. Nenhum
+    sistema de arquivos troca um diretório por outro atomicamente: entre
+    as duas renomeações o dataset some por um instante, e quem o procura
+    nesse intervalo deve usar dataset_existe, que espera a nova versão. Se
+    a segunda renomeação falha, a versão anterior volta ao lugar.
+    """
+    anterior = f"{os.path.normpath(diretorio)}{SUFIXO_VERSAO_ANTERIOR}{os.getpid()}"
+    if os.path.exists(diretorio):
+        os.replace(diretorio, anterior)
+    try:
+        os.replace(temporario, diretorio)
+    except OSError:
+        if os.path.exists(anterior):
+            os.replace(anterior, diretorio)
+        raise
+    shutil.rmtree(anterior, ignore_errors=True)
+
+
+def dataset_existe(diretorio=DIRETORIO_PARQUET):
+    """
+    Indica se o dataset está no disco. Enquanto uma troca de versões está
+    em andamento (a versão anterior está ao lado dele, ver
+    substituir_dataset), espera a nova em vez de responder que não existe.
+    """
+    padrao = glob.escape(os.path.normpath(diretorio) + SUFIXO_VERSAO_ANTERIOR) + "*"
+    for _ in range(TENTATIVAS_TROCA):
+        if os.path.isdir(diretorio):
+            return True
+        if not glob.glob(padrao):
+            return False
+        time.sleep(ESPERA_TROCA)
+    return os.path.isdir(diretorio)
+
+
+def versao_dataset(caminho=DIRETORIO_PARQUET):
+    """
+    Identificador barato da versão do dataset, calculado a partir do nome,
+    tamanho e data de modificação dos arquivos (sem ler o conteúdo).
+    """
+    if not os.path.exists(caminho):
+        return 'inexistente'
+
+    arquivos = [caminho]
+    if os.path.isdir(caminho):
+        arquivos = sorted(
+            os.path.join(raiz, nome)
+            for raiz, _, nomes in os.walk(caminho)
+            for nome in nomes
+        )
+
+    sha = hashlib.sha1()
+    for arquivo in arquivos:
+        info = os.stat(arquivo)
+        sha.update(f"{os.path.relpath(arquivo, caminho)}:{info.st_size}:{info.st_mtime_ns}\n".encode())
+    return sha.hexdigest()[:16]
+
+
+def abrir_dataset(diretorio=DIRETORIO_PARQUET):
+    """Abre o dataset Parquet particionado sem ler os dados."""
+    particionamento = ds.HivePartitioning.discover(infer_dictionary=True)
+    return ds.dataset(diretorio, format='parquet', partitioning=particionamento)
+
+
+def abrir_arquivos(arquivos, diretorio=DIRETORIO_PARQUET):
+    """Abre apenas as peças indicadas do dataset, mantendo as colunas de partição."""
+    particionamento = ds.HivePartitioning.discover(infer_dictionary=True)
+    return ds.dataset(list(arquivos), format='parquet', partitioning=particionamento,
+                      partition_base_dir=diretorio)
+
+
+def filtro_sem_nao_informado():
+    """Predicado que descarta as linhas 'NÃO INFORMADO' nas colunas de filtro."""
+    filtro = None
+    for coluna in ['NM_ESFERA', 'CATEGORIA_GASTO', 'SG_PARTIDO']:
+        valores = ds.field(coluna).cast(pa.string())
+        contem = pc.match_substring(valores, "NÃO INFORMADO", ignore_case=True)
+        informado = ~pc.coalesce(contem, pc.scalar(False))
+        filtro = informado if filtro is None else filtro & informado
+    return filtro
+
+
+def _contem_nao_informado(serie):
+    """Máscara 'NÃO INFORMADO' avaliada no dicionário da coluna categórica."""
+    categorias = serie.cat.categories
+    invalidas = categorias[categorias.str.contains("NÃO INFORMADO", case=False, na=False)]
+    return serie.isin(invalidas)
+
+
+def remover_nao_informado(dados):
+    """Remove as linhas 'NÃO INFORMADO' de esfera, categoria e partido."""
+    informados = (
+        ~_contem_nao_informado(dados['NM_ESFERA']) &
+        ~_contem_nao_informado(dados['CATEGORIA_GASTO']) &
+        ~_contem_nao_informado(dados['SG_PARTIDO'])
+    )
+    # Sem linhas a remover, o frame original é mantido (e não copiado)
+    if informados.all():
+        return dados
+    return dados[informados]
+
+
+def ler_dataset(diretorio=DIRETORIO_PARQUET, colunas=COLUNAS_DASHBOARD, filtro=None, arquivos=None):
+    """
+    Lê o dataset Parquet com projeção de colunas e filtro empurrado para a
+    leitura (partições e row groups que não atendem ao filtro são ignorados).
+    Com `arquivos` (ex.: as peças dos anos escolhidos no catálogo), só eles
+    são abertos. As colunas de texto chegam como categóricas, sem passar
+    por objetos Python.
+    """
+    dataset = abrir_dataset(diretorio) if arquivos is None else abrir_arquivos(arquivos, diretorio)
+    tabela = dataset.to_table(columns=colunas, filter=filtro)
+    return compactar_dados(tabela.to_pandas(strings_to_categorical=True))
+
+
+def compactar_dados(df):
+    """
+    Converte o frame do dashboard para a representação compacta: colunas de
+    texto categóricas (códigos inteiros + dicionário), data em datetime64 e
+    valor numérico em float64.
+    """
+    for coluna in COLUNAS_CATEGORICAS:
+        if coluna not in df.columns:
+            continue
+        if not isinstance(df[coluna].dtype, pd.CategoricalDtype):
+            df[coluna] = df[coluna].astype('category')
+        # Dicionário em ordem alfabética: group-bys saem na mesma ordem do texto
+        categorias = df[coluna].cat.categories
+        if not categorias.is_monotonic_increasing:
+            df[coluna] = df[coluna].cat.reorder_categories(categorias.sort_values())
+    remover_categorias_vazias(df, COLUNAS_CATEGORICAS)
+
+    # As conversões só são feitas quando necessárias, preservando colunas
+    # que já chegam sem cópia de um arquivo mapeado em memória
+    if 'DT_LANCAMENTO' in df.columns and not pd.api.types.is_datetime64_dtype(df['DT_LANCAMENTO']):
+        df['DT_LANCAMENTO'] = pd.to_datetime(df['DT_LANCAMENTO'], errors='coerce')
+    if 'VR_LANCAMENTO_NUM' in df.columns and df['VR_LANCAMENTO_NUM'].dtype != 'float64':
+        df['VR_LANCAMENTO_NUM'] = pd.to_numeric(df['VR_LANCAMENTO_NUM'], errors='coerce').astype('float64')
+    return df
+
+
+def concatenar_dados(*frames):
+    """
+    Concatena frames compactos unindo os dicionários das colunas categóricas
+    (apenas os códigos são remapeados, sem voltar a objetos Python).
+    """
+    colunas = {}
+    for coluna in frames[0].columns:
+        series = [frame[coluna] for frame in frames]
+        if all(isinstance(serie.dtype, pd.CategoricalDtype) for serie in series):
+            colunas[coluna] = pd.api.types.union_categoricals(series, sort_categories=True, ignore_order=True)
+        else:
+            colunas[coluna] = pd.concat(series, ignore_index=True)
+    return compactar_dados(pd.DataFrame(colunas))
+
+
+def remover_categorias_vazias(df, colunas):
+    """Descarta do dicionário das colunas categóricas os valores sem nenhuma linha."""
+    for coluna in colunas:
+        if coluna in df.columns and df[coluna].nunique(dropna=True) < len(df[coluna].cat.categories):
+            df[coluna] = df[coluna].cat.remove_unused_categories()
+    return df
+
+
+def preparar_dados(df):
+    """
+    Frame pronto para o dashboard: compacto, sem as linhas "NÃO INFORMADO",
+    sem categorias vazias e ordenado por data. No modo compartilhado isso é
+    feito uma única vez, antes de gravar o arquivo Arrow.
+    """
+    dados = remover_nao_informado(compactar_dados(df))
+    return ordenar_por_data(remover_categorias_vazias(dados, COLUNAS_CATEGORICAS))
+
+
+# =============================================
+# MODO COMPARTILHADO (ARROW IPC MAPEADO EM MEMÓRIA)
+# =============================================
+
+# Formato do arquivo Arrow: arquivos de outro formato (ex.: gravados antes
+# de preparar_dados) são regravados
+FORMATO_ARROW = 'preparado-1'
+
+def arquivo_arrow_anos(anos, caminho=ARQUIVO_ARROW):
+    """Arquivo Arrow de uma seleção de anos do catálogo (um por seleção)."""
+    raiz, extensao = os.path.splitext(caminho)
+    return f"{raiz}.{'_'.join(anos)}{extensao}"
+
+
+def gravar_arrow(df, caminho=ARQUIVO_ARROW, versao=''):
+    """
+    Grava o frame preparado como Arrow IPC (Feather v2) sem compressão, em
+    um único lote, para que possa ser mapeado em memória sem cópia.
+    """
+    tabela = pa.Table.from_pandas(df, preserve_index=False).combine_chunks()
+    metadados = dict(tabela.schema.metadata or {})
+    metadados[b'versao'] = versao.encode('utf-8')
+    metadados[b'formato'] = FORMATO_ARROW.encode('utf-8')
+    tabela = tabela.replace_schema_metadata(metadados)
+
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with pa.OSFile(temporario, 'wb') as destino:
+        with pa.ipc.new_file(destino, tabela.schema) as escritor:
+            escritor.write_table(tabela)
+    os.replace(temporario, caminho)
+
+
+def versao_arrow(caminho=ARQUIVO_ARROW):
+    """Versão do dataset de origem gravada no arquivo Arrow (ou None, ou de outro formato)."""
+    if not os.path.exists(caminho):
+        return None
+    with pa.memory_map(caminho, 'r') as fonte:
+        metadados = pa.ipc.open_file(fonte).schema.metadata or {}
+    if metadados.get(b'formato', b'').decode('utf-8') != FORMATO_ARROW:
+        return None
+    return metadados.get(b'versao', b'').decode('utf-8')
+
+
+def abrir_arrow(caminho=ARQUIVO_ARROW):
+    """
+    Abre o arquivo Arrow mapeado em memória. Colunas numéricas e códigos das
+    categóricas apontam para as páginas do arquivo (somente leitura), de modo
+    que processos no mesmo host compartilham o page cache.
+    """
+    tabela = pa.ipc.open_file(pa.memory_map(caminho, 'r')).read_all()
+    return tabela.to_pandas(split_blocks=True)
+
+
+def ler_dataset_compartilhado(diretorio=DIRETORIO_PARQUET, caminho_arrow=ARQUIVO_ARROW, filtro=None,
+                              arquivos=None, versao=None):
+    """
+    Lê o dataset pelo arquivo Arrow mapeado em memória, regravando-o a
+    partir do Parquet quando a versão do dataset (ou, com `arquivos`, a
+    `versao` informada para eles) mudou. O arquivo é gravado já preparado
+    (preparar_dados), e o frame mapeado é devolvido sem nenhuma alteração:
+    qualquer transformação criaria uma cópia privada em cada processo.
+    """
+    versao = versao or versao_dataset(diretorio)
+    if versao_arrow(caminho_arrow) != versao:
+        gravar_arrow(preparar_dados(ler_dataset(diretorio, filtro=filtro, arquivos=arquivos)), caminho_arrow, versao)
+    return abrir_arrow(caminho_arrow)
+
+
+if __name__ == "__main__":
+    origem = sys.argv[1] if len(sys.argv) > 1 else ARQUIVO_CSV
+    destino = sys.argv[2] if len(sys.argv) > 2 else DIRETORIO_PARQUET
+    ano = sys.argv[3] if len(sys.argv) > 3 else None
+    converter_csv_para_parquet(origem, destino, ano=ano)
+    print(f"Dataset Parquet gravado em: {destino}")
@@ -0,0 +1,224 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from armazenamento import (
+    COLUNAS_DASHBOARD, COLUNAS_PARTICAO, DIRETORIO_PARQUET, ESQUEMA_DASHBOARD,
+    LINHAS_POR_BLOCO, _blocos_csv, _esquema_csv, abrir_dataset, ano_do_arquivo,
+    blocos_com_ano, esquema_com_ano
+)
+from ingestao import ARQUIVO_HASHES, _blocos_extrato, hash_arquivo
+from instantaneo import gerar_instantaneo, precisao_configurada
+
+# =============================================
+# ATUALIZAÇÃO INCREMENTAL DO DATASET (LOTES)
+# =============================================
+
+# Arquivos de controle dentro do dataset (o prefixo '_' os esconde do
+# pyarrow). O índice de hashes, ARQUIVO_HASHES, é descartado a cada ingestão
+ARQUIVO_LOTES = "_lotes.json"
+
+PREFIXO_LOTE = "lote-"
+
+
+def hash_linhas(dados):
+    """Hash de 64 bits de cada linha, calculado só sobre as colunas do dashboard."""
+    return pd.util.hash_pandas_object(dados[COLUNAS_DASHBOARD], index=False).to_numpy()
+
+
+def _contar_hashes(hashes):
+    """Hashes distintos (ordenados) e a quantidade de ocorrências de cada um."""
+    return np.unique(np.asarray(hashes, dtype=np.uint64), return_counts=True)
+
+
+def _somar_hashes(indice, novos):
+    """Acrescenta as ocorrências de `novos` ao índice (hashes, contagens)."""
+    if len(novos) == 0:
+        return indice
+    hashes, contagens = _contar_hashes(novos)
+    todos = np.concatenate([indice[0], hashes])
+    quantidades = np.concatenate([indice[1], contagens])
+    unicos, posicao = np.unique(todos, return_inverse=True)
+    return unicos, np.bincount(posicao, weights=quantidades, minlength=len(unicos)).astype(np.int64)
+
+
+def _ocorrencias(indice, hashes):
+    """Quantas vezes cada hash já aparece no índice."""
+    unicos, contagens = indice
+    if len(unicos) == 0:
+        return np.zeros(len(hashes), dtype=np.int64)
+    posicao = np.minimum(np.searchsorted(unicos, hashes), len(unicos) - 1)
+    return np.where(unicos[posicao] == hashes, contagens[posicao], 0)
+
+
+# ---------------------------------------------
+# Arquivos de controle
+# ---------------------------------------------
+
+def carregar_lotes(diretorio=DIRETORIO_PARQUET):
+    """Lista dos lotes já anexados ao dataset, na ordem de chegada."""
+    caminho = os.path.join(diretorio, ARQUIVO_LOTES)
+    if not os.path.exists(caminho):
+        return []
+    with open(caminho, encoding='utf-8') as arquivo:
+        return json.load(arquivo)
+
+
+def salvar_lotes(diretorio, lotes):
+    """Grava a lista de lotes de forma atômica."""
+    caminho = os.path.join(diretorio, ARQUIVO_LOTES)
+    temporario = caminho + ".tmp"
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        json.dump(lotes, arquivo, indent=2, ensure_ascii=False)
+    os.replace(temporario, caminho)
+
+
+def carregar_indice_hashes(diretorio=DIRETORIO_PARQUET):
+    """
+    Índice (hashes, contagens) das linhas já gravadas. Na primeira chamada
+    depois de uma ingestão é montado varrendo o dataset em lotes de
+    registros e salvo em disco.
+    """
+    caminho = os.path.join(diretorio, ARQUIVO_HASHES)
+    if os.path.exists(caminho):
+        with np.load(caminho) as arquivo:
+            return arquivo['hashes'], arquivo['contagens']
+
+    hashes = [
+        hash_linhas(lote.to_pandas())
+        for lote in abrir_dataset(diretorio).to_batches(columns=COLUNAS_DASHBOARD)
+    ]
+    indice = _contar_hashes(np.concatenate(hashes) if hashes else [])
+    salvar_indice_hashes(diretorio, indice)
+    return indice
+
+
+def salvar_indice_hashes(diretorio, indice):
+    caminho = os.path.join(diretorio, ARQUIVO_HASHES)
+    temporario = caminho + ".tmp.npz"
+    np.savez(temporario, hashes=indice[0], contagens=indice[1])
+    os.replace(temporario, caminho)
+
+
+def _remover_pecas_orfas(diretorio, lotes):
+    """Apaga peças de lotes interrompidos antes de serem registrados."""
+    registradas = {
+        os.path.normpath(os.path.join(diretorio, arquivo))
+        for lote in lotes for arquivo in lote['arquivos']
+    }
+    for raiz, _, nomes in os.walk(diretorio):
+        for nome in nomes:
+            caminho = os.path.normpath(os.path.join(raiz, nome))
+            if nome.startswith(PREFIXO_LOTE) and caminho not in registradas:
+                os.remove(caminho)
+
+
+# ---------------------------------------------
+# Anexação
+# ---------------------------------------------
+
+def _linhas_novas(blocos, indice, contador):
+    """
+    Filtra os blocos, mantendo apenas as linhas ainda não gravadas. Uma linha
+    repetida k vezes no arquivo só é anexada nas ocorrências que excedem as
+    já existentes no dataset, então um extrato cumulativo republicado não
+    duplica os lançamentos antigos.
+    """
+    vistos = pd.Series(dtype='int64')
+    for bloco in blocos:
+        dados = bloco.to_pandas()
+        hashes = hash_linhas(dados)
+
+        anteriores = vistos.reindex(hashes, fill_value=0).to_numpy()
+        ordem = anteriores + pd.Series(hashes).groupby(hashes).cumcount().to_numpy()
+        novas = ordem >= _ocorrencias(indice, hashes)
+
+        contador['lidas'] += len(hashes)
+        contador['novas'] += int(novas.sum())
+        contador['hashes'].append(hashes[novas])
+        vistos = vistos.add(pd.Series(hashes).value_counts(), fill_value=0).astype('int64')
+
+        if novas.any():
+            yield bloco.filter(pa.array(novas))
+
+
+def anexar_lote(caminho, diretorio=DIRETORIO_PARQUET, bruto=False,
+                linhas_por_bloco=LINHAS_POR_BLOCO, ano=None):
+    """
+    Anexa ao dataset Parquet as linhas novas ou alteradas de `caminho`,
+    detectadas pelo hash da linha, sem reprocessar o que já está gravado.
+    `bruto=True` indica um extrato no formato original do TSE (passa pela
+    transformação da ingestão). As linhas vão para a partição de `ano` (ou
+    do ano no nome do arquivo, ou do predominante nas datas). Retorna o
+    registro do lote.
+    """
+    lotes = carregar_lotes(diretorio)
+    _remover_pecas_orfas(diretorio, lotes)
+    indice = carregar_indice_hashes(diretorio)
+
+    if bruto:
+        esquema = ESQUEMA_DASHBOARD
+        blocos = _blocos_extrato(caminho, linhas_por_bloco)
+    else:
+        esquema = _esquema_csv(caminho)
+        blocos = _blocos_csv(caminho, esquema, linhas_por_bloco)
+
+    identificador = time.strftime("%Y%m%d%H%M%S") + "-" + hash_arquivo(caminho)[:8]
+    contador = {'lidas': 0, 'novas': 0, 'hashes': []}
+    arquivos = []
+    ds.write_dataset(
+        blocos_com_ano(_linhas_novas(blocos, indice, contador), ano or ano_do_arquivo(caminho)),
+        diretorio,
+        schema=esquema_com_ano(esquema),
+        format='parquet',
+        partitioning=COLUNAS_PARTICAO,
+        partitioning_flavor='hive',
+        basename_template=PREFIXO_LOTE + identificador + "-{i}.parquet",
+        existing_data_behavior='overwrite_or_ignore',
+        file_visitor=lambda arquivo: arquivos.append(os.path.relpath(arquivo.path, diretorio))
+    )
+
+    lote = {
+        'id': identificador,
+        'origem': os.path.basename(caminho),
+        'arquivos': sorted(arquivos),
+        'linhas_lidas': contador['lidas'],
+        'linhas_novas': contador['novas'],
+    }
+    if arquivos:
+        novos = np.concatenate(contador['hashes'])
+        salvar_indice_hashes(diretorio, _somar_hashes(indice, novos))
+        salvar_lotes(diretorio, lotes + [lote])
+    return lote
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Anexa extratos novos ao dataset Parquet do dashboard.")
+    parser.add_argument('arquivos', nargs='+')
+    parser.add_argument('--destino', default=DIRETORIO_PARQUET)
+    parser.add_argument('--bruto', action='store_true',
+                        help="arquivos no formato original do TSE (latin-1, ';')")
+    parser.add_argument('--linhas-por-bloco', type=int, default=LINHAS_POR_BLOCO)
+    parser.add_argument('--ano', default=None,
+                        help="partição dos lotes (padrão: o ano no nome de cada arquivo)")
+    parser.add_argument('--sem-instantaneo', action='store_true',
+                        help="não regenera o instantâneo da visão padrão")
+    args = parser.parse_args()
+
+    anexados = False
+    for caminho in args.arquivos:
+        inicio = time.perf_counter()
+        lote = anexar_lote(caminho, args.destino, args.bruto, args.linhas_por_bloco, args.ano)
+        print(f"{caminho}: {lote['linhas_novas']} de {lote['linhas_lidas']} linhas anexadas "
+              f"em {time.perf_counter() - inicio:.1f}s")
+        anexados = anexados or bool(lote['arquivos'])
+
+    # Visão padrão pré-renderizada para o primeiro acesso após a atualização
+    if anexados and not args.sem_instantaneo:
+        gerar_instantaneo(args.destino, precisao=precisao_configurada())
@@ -0,0 +1,311 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# =============================================
+# BENCHMARK DO PIPELINE (CARGA → FILTRO → AGREGAÇÃO → FIGURA)
+# =============================================
+# Roda sem navegador: gera um extrato sintético com o formato do CSV do
+# dashboard, mede cada etapa com as mesmas funções do final.py e grava os
+# resultados em JSON para comparação entre versões.
+
+TAMANHOS_PADRAO = [10_000, 1_000_000, 10_000_000]
+
+# Tolerância padrão na comparação com um resultado anterior (20% mais lento)
+TOLERANCIA_PADRAO = 0.20
+
+LINHAS_POR_BLOCO_SINTETICO = 1_000_000
+
+ESFERAS = ['NACIONAL', 'ESTADUAL', 'MUNICIPAL', 'DISTRITAL', 'NÃO INFORMADO']
+PESOS_ESFERAS = [0.25, 0.40, 0.30, 0.03, 0.02]
+
+CATEGORIAS = [
+    'TRANSFERÊNCIAS', 'PAGAMENTOS', 'OUTRAS DESPESAS', 'PESSOAL', 'PROPAGANDA',
+    'ALUGUEL', 'TARIFAS BANCÁRIAS', 'NÃO INFORMADO'
+]
+PESOS_CATEGORIAS = [0.30, 0.22, 0.18, 0.10, 0.08, 0.05, 0.06, 0.01]
+
+PARTIDOS = [
+    'PT', 'MDB', 'PSDB', 'PSD', 'PP', 'PL', 'DEM', 'PSB', 'PDT', 'REPUBLICANOS',
+    'PSL', 'PTB', 'SOLIDARIEDADE', 'PODE', 'PSC', 'CIDADANIA', 'PC do B', 'PSOL',
+    'AVANTE', 'PROS', 'PV', 'PATRIOTA', 'NOVO', 'REDE', 'PMN', 'PTC', 'DC',
+    'PMB', 'PRTB', 'PCB', 'PCO', 'PSTU', 'UP'
+]
+
+# Fornecedores distintos por transação no extrato real (≈ 48 mil em 166 mil)
+FORNECEDORES_POR_LINHA = 0.3
+MAX_FORNECEDORES = 2_000_000
+
+
+# ---------------------------------------------
+# Extrato sintético
+# ---------------------------------------------
+
+def _pesos_zipf(n, expoente=1.1):
+    """Participação decrescente, como a dos partidos e fornecedores reais."""
+    pesos = 1.0 / np.arange(1, n + 1) ** expoente
+    return pesos / pesos.sum()
+
+
+def gerar_extrato(caminho, linhas, semente=0):
+    """
+    Grava em `caminho` um extrato com as colunas do CSV do dashboard: poucas
+    esferas e categorias, 33 partidos com participação desigual, fornecedores
+    na proporção do extrato real (cauda longa) e valores log-normais.
+    """
+    gerador = np.random.default_rng(semente)
+    fornecedores = max(1, min(int(linhas * FORNECEDORES_POR_LINHA), MAX_FORNECEDORES))
+    pesos_partidos = _pesos_zipf(len(PARTIDOS))
+    pesos_fornecedores = _pesos_zipf(fornecedores, expoente=0.8)
+    nomes_fornecedores = np.array([f"FORNECEDOR {i:07d}" for i in range(fornecedores)], dtype=object)
+
+    for inicio in range(0, linhas, LINHAS_POR_BLOCO_SINTETICO):
+        n = min(LINHAS_POR_BLOCO_SINTETICO, linhas - inicio)
+        bloco = pd.DataFrame({
+            'DT_LANCAMENTO': (
+                pd.Timestamp('2020-01-01') + pd.to_timedelta(gerador.integers(0, 366, n), unit='D')
+            ).strftime('%Y-%m-%d'),
+            'NM_ESFERA': gerador.choice(ESFERAS, n, p=PESOS_ESFERAS),
+            'CATEGORIA_GASTO': gerador.choice(CATEGORIAS, n, p=PESOS_CATEGORIAS),
+            'SG_PARTIDO': gerador.choice(PARTIDOS, n, p=pesos_partidos),
+            'NM_CONTRAPARTE': nomes_fornecedores[gerador.choice(fornecedores, n, p=pesos_fornecedores)],
+            'VR_LANCAMENTO_NUM': gerador.lognormal(7.5, 1.6, n).round(2),
+        })
+        bloco.to_csv(caminho, mode='w' if inicio == 0 else 'a', header=inicio == 0, index=False)
+
+
+# ---------------------------------------------
+# Medição
+# ---------------------------------------------
+
+def _pico_processo():
+    """Pico de memória residente do processo, em bytes (None se indisponível)."""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico if sys.platform == 'darwin' else pico * 1024
+
+
+def medir(etapa, funcao, repeticoes=1, preparar=None):
+    """
+    Executa `funcao` `repeticoes` vezes medindo o tempo de parede e, numa
+    execução a mais sob tracemalloc (que deixaria os tempos mais lentos), o
+    pico de memória alocada. `preparar`, se dado, roda antes de cada
+    execução, fora da medição. Retorna (resultado, medida).
+    """
+    tempos = []
+    for _ in range(repeticoes):
+        if preparar is not None:
+            preparar()
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+
+    if preparar is not None:
+        preparar()
+    tracemalloc.start()
+    try:
+        resultado = funcao()
+        pico = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return resultado, {
+        'etapa': etapa,
+        'segundos_min': min(tempos),
+        'segundos_mediana': statistics.median(tempos),
+        'repeticoes': repeticoes,
+        'pico_alocado_bytes': pico,
+    }
+
+
+def _selecao_parcial(opcoes):
+    """Seleção típica fora da visão padrão: duas esferas, todas as categorias, cinco partidos."""
+    return {
+        'NM_ESFERA': opcoes['NM_ESFERA'][:2],
+        'CATEGORIA_GASTO': opcoes['CATEGORIA_GASTO'],
+        'SG_PARTIDO': opcoes['SG_PARTIDO'][:5],
+    }
+
+
+def medir_pipeline(linhas, diretorio, repeticoes=3, semente=0):
+    """Gera o extrato de `linhas` linhas em `diretorio` e mede cada etapa do dashboard."""
+    original = os.getcwd()
+    os.chdir(diretorio)
+    try:
+        # Importados aqui: final.py e armazenamento.py usam caminhos relativos ao diretório atual
+        import plotly.io as pio
+
+        import final
+        from armazenamento import ARQUIVO_CSV, DIRETORIO_PARQUET
+        from cache_graficos import chave_selecao
+        from construcao_paralela import construir_figura
+        from cubo import DIMENSOES_CUBO, filtrar_cubo
+        from graficos import CORES, FONTES_GRAFICOS
+
+        medidas = []
+        inicio = time.perf_counter()
+        gerar_extrato(ARQUIVO_CSV, linhas, semente)
+        medidas.append({'etapa': 'gerar_extrato', 'segundos_min': time.perf_counter() - inicio})
+
+        # A primeira carga converte o CSV para Parquet; as seguintes só leem o dataset
+        def remover_parquet():
+            shutil.rmtree(DIRETORIO_PARQUET, ignore_errors=True)
+
+        _, medida = medir('carregar_dados_conversao', lambda: final.carregar_dados(True),
+                          preparar=remover_parquet)
+        medidas.append(medida)
+        dados, medida = medir('carregar_dados', lambda: final.carregar_dados(True), repeticoes)
+        medidas.append(medida)
+        if dados.attrs.get('versao') == 'demonstracao':
+            raise RuntimeError("carregar_dados caiu nos dados de demonstração")
+
+        # A base do dashboard (carga, cubos e índice), sem o cache do processo a cada repetição
+        base, medida = medir('carregar_base', lambda: final.carregar_base(True), repeticoes,
+                             preparar=final.carregar_base.clear)
+        medidas.append(medida)
+        cubo, consultas = base['cubo'], base['consultas']
+        opcoes = {dimensao: sorted(cubo[dimensao].dropna().unique()) for dimensao in DIMENSOES_CUBO}
+
+        for nome, selecao in [('padrao', opcoes), ('parcial', _selecao_parcial(opcoes))]:
+            # Bloco de filtros do main(): cubo filtrado, chave e resumo da seleção
+            def filtrar():
+                cubo_filt = filtrar_cubo(cubo, selecao['NM_ESFERA'], selecao['CATEGORIA_GASTO'], selecao['SG_PARTIDO'])
+                chave_selecao('benchmark', selecao['NM_ESFERA'], selecao['CATEGORIA_GASTO'], selecao['SG_PARTIDO'])
+                consultas.resumo(selecao)
+                return cubo_filt
+
+            # O resumo é memoizado: cada repetição parte de um cache de métricas vazio
+            cubo_filt, medida = medir(f'filtro_{nome}', filtrar, repeticoes, preparar=consultas._metricas.clear)
+            medidas.append(medida)
+            fontes = {
+                'cubo': cubo_filt,
+                'metricas': consultas.metricas_partido(selecao),
+                'mensal': filtrar_cubo(base['cubo_mensal'], selecao['NM_ESFERA'],
+                                       selecao['CATEGORIA_GASTO'], selecao['SG_PARTIDO']),
+            }
+
+            for construtor, fonte in FONTES_GRAFICOS.items():
+                figura, medida = medir(f'{construtor.__name__}_{nome}',
+                                       lambda: construir_figura(construtor, fontes[fonte], CORES), repeticoes)
+                payload, medida_json = medir(f'{construtor.__name__}_{nome}_json',
+                                             lambda: pio.to_json(figura, validate=False), repeticoes)
+                medida['payload_bytes'] = len(payload)
+                medidas.extend([medida, medida_json])
+
+        return {
+            'linhas': linhas,
+            'linhas_validas': len(consultas.dados),
+            'fornecedores': int(consultas.resumo()['fornecedores']),
+            'parquet_bytes': sum(
+                os.path.getsize(os.path.join(raiz, nome))
+                for raiz, _, nomes in os.walk(DIRETORIO_PARQUET) for nome in nomes
+            ),
+            'pico_processo_bytes': _pico_processo(),
+            'etapas': medidas,
+        }
+    finally:
+        os.chdir(original)
+
+
+def _versao_codigo():
+    """Commit atual do repositório, quando disponível."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _medir_em_processo(linhas, repeticoes, semente):
+    """Cada tamanho roda em um processo novo, para que o pico de memória não se acumule."""
+    saida = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--interno', str(linhas),
+         '--repeticoes', str(repeticoes), '--semente', str(semente)],
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(saida.strip().splitlines()[-1])
+
+
+def comparar(anterior, atual, tolerancia=TOLERANCIA_PADRAO):
+    """Etapas que ficaram mais lentas que `tolerancia` em relação ao resultado anterior."""
+    tempos_anteriores = {
+        (execucao['linhas'], etapa['etapa']): etapa['segundos_min']
+        for execucao in anterior['execucoes'] for etapa in execucao['etapas']
+    }
+    regressoes = []
+    for execucao in atual['execucoes']:
+        for etapa in execucao['etapas']:
+            antes = tempos_anteriores.get((execucao['linhas'], etapa['etapa']))
+            if antes and etapa['segundos_min'] > antes * (1 + tolerancia):
+                regressoes.append({
+                    'linhas': execucao['linhas'],
+                    'etapa': etapa['etapa'],
+                    'antes': antes,
+                    'depois': etapa['segundos_min'],
+                })
+    return regressoes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline do dashboard, sem navegador.")
+    parser.add_argument('--linhas', type=int, nargs='+', default=TAMANHOS_PADRAO)
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--saida', default=None, help="arquivo JSON com os resultados (padrão: stdout)")
+    parser.add_argument('--comparar', default=None, help="resultado anterior para detectar regressões")
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA_PADRAO)
+    parser.add_argument('--interno', type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.interno is not None:
+        with tempfile.TemporaryDirectory(prefix='benchmark-dashboard-') as diretorio:
+            print(json.dumps(medir_pipeline(args.interno, diretorio, args.repeticoes, args.semente)))
+        sys.exit(0)
+
+    resultado = {
+        'codigo': _versao_codigo(),
+        'data': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'maquina': {
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'sistema': platform.platform(),
+            'processadores': os.cpu_count(),
+        },
+        'execucoes': [],
+    }
+    for linhas in args.linhas:
+        print(f"Medindo {linhas:,} linhas...", file=sys.stderr)
+        resultado['execucoes'].append(_medir_em_processo(linhas, args.repeticoes, args.semente))
+
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(texto)
+    else:
+        print(texto)
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as arquivo:
+            regressoes = comparar(json.load(arquivo), resultado, args.tolerancia)
+        for regressao in regressoes:
+            print(f"REGRESSÃO {regressao['linhas']:,} linhas, {regressao['etapa']}: "
+                  f"{regressao['antes']:.4f}s → {regressao['depois']:.4f}s", file=sys.stderr)
+        sys.exit(1 if regressoes else 0)
@@ -0,0 +1,219 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import plotly.io as pio
+
+# =============================================
+# CACHE DE FIGURAS POR ESTADO DE FILTROS
+# =============================================
+
+# Orçamento padrão de memória do cache (tamanho do JSON das figuras)
+ORCAMENTO_PADRAO_BYTES = 256 * 1024 * 1024
+
+# Quantidade de usos a partir da qual a figura é copiada para o disco
+USOS_PARA_DISCO = 2
+
+
+def chave_selecao(versao, esferas, categorias, partidos, periodo=None):
+    """
+    Impressão digital barata do estado da página: versão do dataset mais a
+    seleção dos filtros (e o período, quando restrito). Substitui o hash do
+    DataFrame inteiro feito pelo st.cache_data a cada rerun.
+    """
+    chave = (
+        versao,
+        tuple(sorted(esferas)),
+        tuple(sorted(categorias)),
+        tuple(sorted(partidos)),
+    )
+    if periodo is not None:
+        chave += (tuple(str(data) for data in periodo),)
+    return chave
+
+
+class CacheGraficos:
+    """
+    Cache LRU das figuras já construídas, indexadas por (gráfico, chave da
+    seleção). O tamanho de cada entrada é o do JSON da figura; quando a soma
+    passa do orçamento, as entradas menos usadas recentemente são
+    descartadas. Opcionalmente, figuras usadas com frequência são gravadas
+    em `diretorio_disco` e sobrevivem a um reinício do processo.
+
+    Pedidos simultâneos da mesma chave ausente constroem a figura uma única
+    vez: o primeiro a constrói, e os demais esperam pelo seu resultado.
+    """
+
+    def __init__(self, orcamento_bytes=ORCAMENTO_PADRAO_BYTES, max_entradas=None,
+                 diretorio_disco=None, orcamento_disco_bytes=None):
+        self.orcamento_bytes = orcamento_bytes
+        self.max_entradas = max_entradas
+        self.diretorio_disco = diretorio_disco
+        self.orcamento_disco_bytes = orcamento_disco_bytes
+        self._entradas = OrderedDict()
+        self._bytes = 0
+        self._trava = threading.Lock()
+        # Chave em construção -> Future com a figura (ou o erro) de quem a constrói
+        self._em_construcao = {}
+        self._contadores = {
+            'acertos': 0,
+            'acertos_disco': 0,
+            'falhas': 0,
+            'esperas': 0,
+            'despejos': 0,
+        }
+        if diretorio_disco:
+            os.makedirs(diretorio_disco, exist_ok=True)
+
+    def obter(self, chave, construir):
+        """Retorna a figura da chave, construindo-a apenas em caso de falha."""
+        with self._trava:
+            entrada = self._entradas.get(chave)
+            if entrada is not None:
+                self._entradas.move_to_end(chave)
+                entrada['usos'] += 1
+                self._contadores['acertos'] += 1
+                promover = entrada['usos'] == USOS_PARA_DISCO
+            else:
+                futuro = self._em_construcao.get(chave)
+                construtor = futuro is None
+                if construtor:
+                    futuro = self._em_construcao[chave] = Future()
+                else:
+                    self._contadores['esperas'] += 1
+
+        if entrada is not None:
+            if promover:
+                self._gravar_disco(chave, entrada['figura'])
+            return entrada['figura']
+        if not construtor:
+            return futuro.result()
+
+        try:
+            figura = self._ler_disco(chave)
+            if figura is not None:
+                with self._trava:
+                    self._contadores['acertos_disco'] += 1
+                usos = USOS_PARA_DISCO
+            else:
+                figura = construir()
+                with self._trava:
+                    self._contadores['falhas'] += 1
+                usos = 1
+            self._inserir(chave, figura, usos)
+        except BaseException as erro:
+            # Quem espera recebe o mesmo erro; o próximo pedido tenta de novo
+            futuro.set_exception(erro)
+            raise
+        else:
+            futuro.set_result(figura)
+        finally:
+            with self._trava:
+                self._em_construcao.pop(chave, None)
+        return figura
+
+    def _inserir(self, chave, figura, usos):
+        tamanho = len(pio.to_json(figura, validate=False))
+        with self._trava:
+            anterior = self._entradas.pop(chave, None)
+            if anterior is not None:
+                self._bytes -= anterior['bytes']
+            self._entradas[chave] = {'figura': figura, 'bytes': tamanho, 'usos': usos}
+            self._bytes += tamanho
+            self._despejar()
+
+    def _despejar(self):
+        """Remove as entradas menos usadas recentemente até caber no orçamento."""
+        while len(self._entradas) > 1 and (
+            self._bytes > self.orcamento_bytes or
+            (self.max_entradas is not None and len(self._entradas) > self.max_entradas)
+        ):
+            _, entrada = self._entradas.popitem(last=False)
+            self._bytes -= entrada['bytes']
+            self._contadores['despejos'] += 1
+
+    # ---------------------------------------------
+    # Camada em disco
+    # ---------------------------------------------
+
+    def _caminho_disco(self, chave):
+        nome = hashlib.sha1(repr(chave).encode('utf-8')).hexdigest()
+        return os.path.join(self.diretorio_disco, nome + ".json")
+
+    def _ler_disco(self, chave):
+        if not self.diretorio_disco:
+            return None
+        caminho = self._caminho_disco(chave)
+        try:
+            with open(caminho, encoding='utf-8') as arquivo:
+                figura = pio.from_json(arquivo.read(), skip_invalid=True)
+        except (OSError, ValueError):
+            return None
+        os.utime(caminho)
+        return figura
+
+    def _gravar_disco(self, chave, figura):
+        if not self.diretorio_disco:
+            return
+        caminho = self._caminho_disco(chave)
+        # Grava ao lado e troca de uma vez: um leitor nunca vê o JSON pela metade
+        temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temporario, 'w', encoding='utf-8') as arquivo:
+                arquivo.write(pio.to_json(figura, validate=False))
+            os.replace(temporario, caminho)
+        except OSError:
+            # Sem espaço ou permissão, a figura fica só em memória
+            try:
+                os.remove(temporario)
+            except OSError:
+                pass
+            return
+        self._podar_disco()
+
+    def _podar_disco(self):
+        """Apaga os arquivos mais antigos quando o disco passa do orçamento."""
+        if self.orcamento_disco_bytes is None:
+            return
+        arquivos = []
+        for nome in os.listdir(self.diretorio_disco):
+            if nome.endswith(".json"):
+                info = os.stat(os.path.join(self.diretorio_disco, nome))
+                arquivos.append((info.st_mtime, info.st_size, nome))
+        total = sum(tamanho for _, tamanho, _ in arquivos)
+        for _, tamanho, nome in sorted(arquivos):
+            if total <= self.orcamento_disco_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.diretorio_disco, nome))
+            except OSError:
+                continue
+            total -= tamanho
+
+    # ---------------------------------------------
+    # Estatísticas
+    # ---------------------------------------------
+
+    def tamanho(self, chave):
+        """Tamanho do JSON da figura da chave (0 se ela não está em memória)."""
+        with self._trava:
+            entrada = self._entradas.get(chave)
+            return entrada['bytes'] if entrada is not None else 0
+
+    def estatisticas(self):
+        """Contadores de acertos, falhas, esperas e despejos e o uso atual de memória."""
+        with self._trava:
+            return dict(
+                self._contadores,
+                entradas=len(self._entradas),
+                bytes=self._bytes,
+                orcamento_bytes=self.orcamento_bytes,
+            )
+
+    def limpar(self):
+        """Esvazia a camada em memória (os arquivos em disco são mantidos)."""
+        with self._trava:
+            self._entradas.clear()
+            self._bytes = 0
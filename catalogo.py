@@ -0,0 +1,182 @@
+import argparse
+import hashlib
+import json
+import os
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from armazenamento import COLUNA_ANO, DIRETORIO_PARQUET, dataset_existe
+
+# =============================================
+# CATÁLOGO DO DATASET (UMA PARTIÇÃO POR ANO)
+# =============================================
+
+def caminho_catalogo(diretorio=DIRETORIO_PARQUET):
+    """Arquivo do catálogo, ao lado do dataset (dentro dele mudaria a versão)."""
+    return os.path.splitext(os.path.normpath(diretorio))[0] + ".catalogo.json"
+
+
+def _valores_particao(relativo):
+    """Valores das chaves Hive no caminho relativo da peça ({'ANO': '2020', ...})."""
+    valores = {}
+    for parte in os.path.dirname(relativo).split(os.sep):
+        chave, separador, valor = parte.partition("=")
+        if separador:
+            valores[chave] = valor
+    return valores
+
+
+def _data_iso(data):
+    return None if data is None or pd.isna(data) else pd.Timestamp(data).isoformat()
+
+
+def _estatisticas_peca(caminho, relativo, info):
+    """
+    Linhas e datas mínima e máxima de uma peça Parquet, lidas só do rodapé
+    (estatísticas dos row groups), e o partido da partição Hive.
+    """
+    metadados = pq.ParquetFile(caminho).metadata
+    posicao = metadados.schema.names.index('DT_LANCAMENTO') if 'DT_LANCAMENTO' in metadados.schema.names else None
+    inicio = fim = None
+    for grupo in range(metadados.num_row_groups):
+        if posicao is None:
+            break
+        estatisticas = metadados.row_group(grupo).column(posicao).statistics
+        if estatisticas is None or not estatisticas.has_min_max:
+            continue
+        inicio = estatisticas.min if inicio is None else min(inicio, estatisticas.min)
+        fim = estatisticas.max if fim is None else max(fim, estatisticas.max)
+
+    valores = _valores_particao(relativo)
+    return {
+        'tamanho': info.st_size,
+        'modificado': info.st_mtime_ns,
+        'ano': valores.get(COLUNA_ANO),
+        'partido': valores.get('SG_PARTIDO'),
+        'linhas': metadados.num_rows,
+        'inicio': _data_iso(inicio),
+        'fim': _data_iso(fim),
+    }
+
+
+def _ler_cache(caminho):
+    try:
+        with open(caminho, encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+    except (OSError, ValueError):
+        return {}
+
+
+def _gravar_cache(caminho, pecas):
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    try:
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            json.dump(pecas, arquivo, ensure_ascii=False)
+        os.replace(temporario, caminho)
+    except OSError:
+        # Sem permissão de escrita, o catálogo é refeito na próxima leitura
+        pass
+
+
+def _rotulo_legado(inicio, fim):
+    """Nome da partição de um dataset sem o nível ANO, pelos anos das datas."""
+    if inicio is None:
+        return "sem ano"
+    anos = sorted({pd.Timestamp(inicio).year, pd.Timestamp(fim).year})
+    return "-".join(str(ano) for ano in anos)
+
+
+def carregar_catalogo(diretorio=DIRETORIO_PARQUET):
+    """
+    Partições do dataset, uma por ANO (ou uma única, para um dataset gravado
+    antes do nível ANO), em ordem, cada uma com suas peças, linhas, datas
+    mínima e máxima, partidos presentes e versão. Só os rodapés das peças
+    novas ou alteradas são lidos; as estatísticas das demais vêm do cache
+    gravado ao lado do dataset.
+    """
+    if not dataset_existe(diretorio):
+        return []
+
+    caminho = caminho_catalogo(diretorio)
+    anteriores = _ler_cache(caminho)
+    pecas = {}
+    for raiz, pastas, nomes in os.walk(diretorio):
+        pastas[:] = sorted(pasta for pasta in pastas if not pasta.startswith(('_', '.')))
+        for nome in sorted(nomes):
+            if nome.startswith(('_', '.')) or not nome.endswith('.parquet'):
+                continue
+            arquivo = os.path.join(raiz, nome)
+            relativo = os.path.relpath(arquivo, diretorio)
+            info = os.stat(arquivo)
+            anterior = anteriores.get(relativo)
+            if anterior and (anterior['tamanho'], anterior['modificado']) == (info.st_size, info.st_mtime_ns):
+                pecas[relativo] = anterior
+            else:
+                pecas[relativo] = _estatisticas_peca(arquivo, relativo, info)
+    if pecas != anteriores:
+        _gravar_cache(caminho, pecas)
+
+    grupos = {}
+    for relativo, peca in pecas.items():
+        grupos.setdefault(peca['ano'], []).append((relativo, peca))
+    return [_resumir_particao(ano, grupos[ano]) for ano in sorted(grupos, key=lambda ano: ano or '')]
+
+
+def _resumir_particao(ano, pecas):
+    inicios = [peca['inicio'] for _, peca in pecas if peca['inicio']]
+    fins = [peca['fim'] for _, peca in pecas if peca['fim']]
+    inicio = pd.Timestamp(min(inicios)) if inicios else None
+    fim = pd.Timestamp(max(fins)) if fins else None
+
+    sha = hashlib.sha1()
+    for relativo, peca in pecas:
+        sha.update(f"{relativo}:{peca['tamanho']}:{peca['modificado']}\n".encode())
+    return {
+        'nome': ano or _rotulo_legado(inicio, fim),
+        'ano': ano,
+        'arquivos': [relativo for relativo, _ in pecas],
+        'linhas': sum(peca['linhas'] for _, peca in pecas),
+        'inicio': inicio,
+        'fim': fim,
+        'partidos': sorted({peca['partido'] for _, peca in pecas if peca['partido']}),
+        'versao': sha.hexdigest()[:16],
+    }
+
+
+def selecionar_particoes(catalogo, nomes=None):
+    """Partições do catálogo com os nomes indicados (todas, com None)."""
+    if nomes is None:
+        return list(catalogo)
+    return [particao for particao in catalogo if particao['nome'] in nomes]
+
+
+def arquivos_particoes(particoes, diretorio=DIRETORIO_PARQUET):
+    """Caminhos das peças das partições, para leitura apenas delas."""
+    return [os.path.join(diretorio, relativo) for particao in particoes for relativo in particao['arquivos']]
+
+
+def versao_particoes(particoes):
+    """
+    Versão da seleção, a partir das versões das suas partições: anexar ou
+    ingerir outro ano não a altera.
+    """
+    if not particoes:
+        return 'inexistente'
+    sha = hashlib.sha1()
+    for particao in particoes:
+        sha.update(f"{particao['nome']}:{particao['versao']}\n".encode())
+    return sha.hexdigest()[:16]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lista as partições do dataset Parquet do dashboard.")
+    parser.add_argument('--origem', default=DIRETORIO_PARQUET)
+    args = parser.parse_args()
+
+    for particao in carregar_catalogo(args.origem):
+        periodo = "sem datas"
+        if particao['inicio'] is not None:
+            periodo = f"{particao['inicio']:%d/%m/%Y} a {particao['fim']:%d/%m/%Y}"
+        print(f"{particao['nome']}: {particao['linhas']:,} linhas, {periodo}, "
+              f"{len(particao['partidos'])} partidos, {len(particao['arquivos'])} peças")
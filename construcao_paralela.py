@@ -0,0 +1,76 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from multiprocessing import get_context
+
+import pandas as pd
+
+from instrumentacao import INATIVO
+from orcamento_figuras import enxugar_figura
+
+# =============================================
+# CONSTRUÇÃO PARALELA DAS FIGURAS
+# =============================================
+
+THREADS_PADRAO = min(8, os.cpu_count() or 1)
+
+
+def _iniciar_processo():
+    """Processos de trabalho com as mesmas opções do pandas do servidor (ver final.py)."""
+    pd.set_option('mode.copy_on_write', True)
+
+
+def construir_figura(construtor, dados, cores):
+    """Constrói a figura e descarta o que o navegador não usa."""
+    return enxugar_figura(construtor(dados, cores))
+
+
+class ConstrutorFiguras:
+    """
+    Constrói as figuras de uma página ao mesmo tempo. Cada pedido ocupa uma
+    thread, que consulta o cache e faz as agregações em pandas (que liberam
+    o GIL na maior parte do tempo); com `processos` > 0 a montagem da figura
+    Plotly, Python puro, vai para um pool de processos. Os construtores
+    precisam ser funções de módulo (ver graficos.py) para serem enviados.
+    """
+
+    def __init__(self, cache, threads=THREADS_PADRAO, processos=0):
+        self.cache = cache
+        self._threads = ThreadPoolExecutor(max_workers=max(threads, 1), thread_name_prefix='graficos')
+        self._processos = None
+        if processos > 0:
+            self._processos = ProcessPoolExecutor(max_workers=processos, mp_context=get_context('spawn'),
+                                                  initializer=_iniciar_processo)
+
+    def _construir(self, construtor, dados, cores, atributos):
+        if callable(dados):
+            dados = dados()
+        atributos['linhas_entrada'] = len(dados)
+        atributos['cache'] = 'falha'
+        if self._processos is None:
+            return construir_figura(construtor, dados, cores)
+        return self._processos.submit(construir_figura, construtor, dados, cores).result()
+
+    def _obter(self, construtor, dados, chave, cores, rastreador):
+        with rastreador.trecho(construtor.__name__, cache='acerto') as atributos:
+            figura = self.cache.obter(chave, partial(self._construir, construtor, dados, cores, atributos))
+            atributos['payload_bytes'] = self.cache.tamanho(chave)
+        return figura
+
+    def construir(self, pedidos, cores, rastreador=INATIVO):
+        """
+        Recebe (construtor, dados, chave) para cada figura e devolve as figuras
+        na mesma ordem dos pedidos. `dados` pode ser uma função, chamada só
+        quando a figura não está no cache. Cada figura vira um trecho de
+        `rastreador`, com acerto ou falha de cache e o tamanho do JSON.
+        """
+        futuros = [
+            self._threads.submit(self._obter, construtor, dados, chave, cores, rastreador)
+            for construtor, dados, chave in pedidos
+        ]
+        return [futuro.result() for futuro in futuros]
+
+    def encerrar(self):
+        self._threads.shutdown(wait=False)
+        if self._processos is not None:
+            self._processos.shutdown(wait=False)
@@ -0,0 +1,297 @@
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from contagem_aproximada import erro_padrao
+from serie_temporal import limites_periodo, separar_periodo
+
+# =============================================
+# CONSULTAS SOBRE AS TRANSAÇÕES (MOTOR PANDAS)
+# =============================================
+
+CATEGORIA_TARIFAS = 'TARIFAS BANCÁRIAS'
+
+# Quantidade de estados de filtro com métricas guardadas em memória
+MAX_METRICAS_EM_CACHE = 64
+
+# Linhas por página da grade de transações (só a página vai ao navegador)
+LINHAS_POR_PAGINA = 50
+
+# Linhas por lote na leitura da seleção inteira (exportação)
+LINHAS_POR_LOTE = 50_000
+
+COLUNAS_METRICAS = [
+    'SG_PARTIDO', 'TOTAL_GASTO', 'TOTAL_TARIFAS', 'PERC_TARIFAS',
+    'QTD_FORNECEDORES', 'QTD_TRANSACOES'
+]
+
+
+def _contar_distintos(serie):
+    """Valores distintos não nulos, pelos códigos quando a série é categórica."""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        codigos = serie.cat.codes.to_numpy()
+        return int(np.count_nonzero(np.bincount(codigos[codigos >= 0])))
+    return serie.nunique()
+
+
+def agregar_metricas_partido(dados, contar_fornecedores=True):
+    """
+    Métricas por partido em uma única passada sobre as transações: total
+    gasto, tarifas bancárias e seu percentual, fornecedores distintos e
+    transações, mais o resumo geral usado no sidebar e nas informações técnicas.
+    Com `contar_fornecedores=False` as contagens de fornecedores ficam de fora
+    (são preenchidas depois pelos sketches aproximados).
+    """
+    agregacoes = {
+        'TOTAL_GASTO': ('VR_LANCAMENTO_NUM', 'sum'),
+        'TOTAL_TARIFAS': ('VR_TARIFAS', 'sum'),
+        'QTD_TRANSACOES': ('DT_LANCAMENTO', 'count'),
+    }
+    if contar_fornecedores:
+        agregacoes['QTD_FORNECEDORES'] = ('NM_CONTRAPARTE', 'nunique')
+
+    tarifas = dados['VR_LANCAMENTO_NUM'].where(dados['CATEGORIA_GASTO'] == CATEGORIA_TARIFAS, 0.0)
+    partidos = dados.assign(VR_TARIFAS=tarifas).groupby('SG_PARTIDO', observed=True).agg(
+        **agregacoes
+    ).reset_index()
+    partidos['PERC_TARIFAS'] = (partidos['TOTAL_TARIFAS'] / partidos['TOTAL_GASTO']) * 100
+
+    datas = dados['DT_LANCAMENTO']
+    resumo = {
+        'valor_total': float(dados['VR_LANCAMENTO_NUM'].sum()),
+        'transacoes': len(dados),
+        'partidos': len(partidos),
+        'inicio': datas.min() if datas.notna().any() else pd.NaT,
+        'fim': datas.max() if datas.notna().any() else pd.NaT,
+    }
+    if not contar_fornecedores:
+        return {'partidos': partidos, 'resumo': resumo}
+
+    resumo['fornecedores'] = _contar_distintos(dados['NM_CONTRAPARTE'])
+    return {'partidos': partidos[COLUNAS_METRICAS], 'resumo': resumo}
+
+
+def chave_ordenacao(serie, decrescente=False):
+    """
+    Chave numérica para ordenar a coluna: categóricas pelos códigos (as
+    categorias ficam em ordem alfabética), datas pelos nanossegundos. Os
+    valores ausentes vão ao final nos dois sentidos.
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        chave = serie.cat.codes.to_numpy().astype(np.int64)
+        ausentes = chave < 0
+    elif pd.api.types.is_datetime64_any_dtype(serie.dtype):
+        datas = serie.to_numpy(dtype='datetime64[ns]')
+        chave = datas.view(np.int64).copy()
+        ausentes = np.isnat(datas)
+    else:
+        chave = serie.to_numpy(dtype=np.float64, na_value=np.nan, copy=True)
+        ausentes = np.isnan(chave)
+    if decrescente:
+        chave = -chave
+    chave[ausentes] = np.inf if chave.dtype.kind == 'f' else np.iinfo(np.int64).max
+    return chave
+
+
+def menores_primeiro(chave, quantidade):
+    """
+    Posições dos `quantidade` menores valores de `chave`, em ordem, com os
+    empates na ordem original (como numa ordenação estável), sem ordenar o
+    restante: uma partição em O(n) separa os candidatos e só eles são ordenados.
+    """
+    if quantidade <= 0:
+        return np.empty(0, dtype=np.int64)
+    if quantidade >= len(chave):
+        return np.argsort(chave, kind='stable')
+    limite = np.partition(chave, quantidade - 1)[quantidade - 1]
+    menores = np.flatnonzero(chave < limite)
+    empates = np.flatnonzero(chave == limite)[:quantidade - len(menores)]
+    candidatos = np.concatenate([menores, empates])
+    return candidatos[np.lexsort((candidatos, chave[candidatos]))]
+
+
+def chave_metricas(selecao):
+    """Chave estável de uma seleção {dimensão: valores}."""
+    return tuple(sorted(
+        (dimensao, tuple(sorted(valores))) for dimensao, valores in (selecao or {}).items()
+    ))
+
+
+class Consultas(ABC):
+    """
+    Base dos motores de consulta: guarda as métricas por partido de cada
+    estado de filtro (LRU), de modo que gráficos e métricas do mesmo estado
+    compartilhem uma única passada sobre as transações. Com `sketches`
+    (SketchesCelulas de NM_CONTRAPARTE), as contagens de fornecedores são
+    estimativas HyperLogLog obtidas mesclando as células da seleção. Os
+    sketches não têm a dimensão de data: com um período na seleção, as
+    contagens são exatas. Cada motor implementa _calcular_metricas, pagina
+    e lotes.
+    """
+
+    def __init__(self, sketches=None):
+        self.sketches = sketches
+        self._metricas = OrderedDict()
+        self._calculando = {}
+        self._trava = threading.Lock()
+
+    @property
+    def aproximado(self):
+        return self.sketches is not None
+
+    @property
+    def erro_relativo(self):
+        """Erro padrão relativo das contagens de fornecedores (0 no modo exato)."""
+        return erro_padrao(self.sketches.precisao) if self.sketches is not None else 0.0
+
+    def metricas(self, selecao=None):
+        """
+        {'partidos': tabela por partido, 'resumo': totais} da seleção. Pedidos
+        simultâneos do mesmo estado (ex.: gráficos construídos em paralelo)
+        esperam um único cálculo.
+        """
+        chave = chave_metricas(selecao)
+        with self._trava:
+            if chave in self._metricas:
+                self._metricas.move_to_end(chave)
+                return self._metricas[chave]
+            trava_chave = self._calculando.setdefault(chave, threading.Lock())
+
+        with trava_chave:
+            with self._trava:
+                if chave in self._metricas:
+                    return self._metricas[chave]
+            try:
+                metricas = self._calcular_metricas(selecao)
+                with self._trava:
+                    self._metricas[chave] = metricas
+                    while len(self._metricas) > MAX_METRICAS_EM_CACHE:
+                        self._metricas.popitem(last=False)
+            finally:
+                with self._trava:
+                    self._calculando.pop(chave, None)
+        return metricas
+
+    def metricas_partido(self, selecao=None):
+        return self.metricas(selecao)['partidos']
+
+    def resumo(self, selecao=None):
+        return self.metricas(selecao)['resumo']
+
+    @abstractmethod
+    def _calcular_metricas(self, selecao):
+        """Métricas da seleção, no formato de `metricas`, sem passar pelo cache."""
+
+    @abstractmethod
+    def pagina(self, selecao=None, colunas=None, ordem=None, decrescente=False,
+               inicio=0, linhas=LINHAS_POR_PAGINA):
+        """
+        Página da grade de transações da seleção e o total de linhas dela:
+        as linhas [inicio, inicio + linhas) ordenadas por `ordem` (ausentes
+        por último, empates sempre na mesma ordem, para que as páginas não
+        repitam nem pulem linhas), só com as `colunas` pedidas. Apenas as
+        linhas da página são materializadas.
+        """
+
+    @abstractmethod
+    def lotes(self, selecao=None, colunas=None, linhas=LINHAS_POR_LOTE):
+        """
+        Todas as linhas da seleção, em frames de até `linhas` linhas com só
+        as `colunas` pedidas: um lote é materializado por vez. A ordem das
+        linhas é a de leitura do motor.
+        """
+
+    def _usar_sketches(self, selecao):
+        return self.sketches is not None and separar_periodo(selecao)[1] is None
+
+    def _contar_fornecedores(self, metricas, selecao):
+        """Preenche as contagens de fornecedores a partir dos sketches."""
+        partidos = metricas['partidos']
+        fornecedores = self.sketches.contar_por('SG_PARTIDO', selecao)
+        partidos = partidos.assign(QTD_FORNECEDORES=(
+            fornecedores.reindex(partidos['SG_PARTIDO'].astype(object)).fillna(0).astype('int64').to_numpy()
+        ))
+        metricas['resumo']['fornecedores'] = self.sketches.contar(selecao)
+        return {'partidos': partidos[COLUNAS_METRICAS], 'resumo': metricas['resumo']}
+
+
+class ConsultasPandas(Consultas):
+    """
+    Responde às consultas do dashboard sobre o frame em memória, filtrando-o
+    pelo índice bitmap. O frame vem ordenado por data (ver
+    serie_temporal.ordenar_por_data), então o período da seleção é uma
+    fatia encontrada por busca binária. Tem a mesma interface do MotorDuckDB.
+    """
+
+    def __init__(self, dados, indice, sketches=None):
+        super().__init__(sketches)
+        self.dados = dados
+        self.indice = indice
+        self.datas = dados['DT_LANCAMENTO'].to_numpy()
+
+    def posicoes(self, selecao=None):
+        """
+        Linhas da seleção no frame: None (todas), uma fatia (só o período) ou
+        as posições crescentes do índice bitmap.
+        """
+        selecao, periodo = separar_periodo(selecao)
+        posicoes = self.indice.selecionar(selecao) if selecao else None
+        if periodo is None:
+            return posicoes
+
+        inicio, fim = limites_periodo(self.datas, *periodo)
+        if posicoes is None:
+            return slice(inicio, fim)
+        # As posições do índice são crescentes: o período também é uma fatia delas
+        return posicoes[np.searchsorted(posicoes, inicio):np.searchsorted(posicoes, fim)]
+
+    def filtrar(self, selecao=None):
+        posicoes = self.posicoes(selecao)
+        if posicoes is None:
+            return self.dados
+        if isinstance(posicoes, slice):
+            return self.dados.iloc[posicoes]
+        return self.dados.take(posicoes)
+
+    def pagina(self, selecao=None, colunas=None, ordem=None, decrescente=False,
+               inicio=0, linhas=LINHAS_POR_PAGINA):
+        projecao = self.dados[list(colunas or self.dados.columns)]
+        posicoes = self.posicoes(selecao)
+        if posicoes is None:
+            posicoes = slice(0, len(self.dados))
+        if isinstance(posicoes, slice):
+            total = posicoes.stop - posicoes.start
+            if ordem is None:
+                inicio = min(inicio, total)
+                return projecao.iloc[posicoes.start + inicio:posicoes.start + min(inicio + linhas, total)], total
+            posicoes = np.arange(posicoes.start, posicoes.stop)
+
+        total = len(posicoes)
+        if ordem is not None:
+            # Só a coluna de ordenação da seleção é lida, e só as primeiras
+            # inicio + linhas posições são ordenadas
+            chave = chave_ordenacao(self.dados[ordem].take(posicoes), decrescente)
+            posicoes = posicoes[menores_primeiro(chave, inicio + linhas)]
+        return projecao.take(posicoes[inicio:inicio + linhas]), total
+
+    def lotes(self, selecao=None, colunas=None, linhas=LINHAS_POR_LOTE):
+        projecao = self.dados[list(colunas or self.dados.columns)]
+        posicoes = self.posicoes(selecao)
+        if posicoes is None:
+            posicoes = slice(0, len(self.dados))
+        if isinstance(posicoes, slice):
+            for inicio in range(posicoes.start, posicoes.stop, linhas):
+                yield projecao.iloc[inicio:min(inicio + linhas, posicoes.stop)]
+            return
+        for inicio in range(0, len(posicoes), linhas):
+            yield projecao.take(posicoes[inicio:inicio + linhas])
+
+    def _calcular_metricas(self, selecao):
+        if not self._usar_sketches(selecao):
+            return agregar_metricas_partido(self.filtrar(selecao))
+
+        metricas = agregar_metricas_partido(self.filtrar(selecao), contar_fornecedores=False)
+        return self._contar_fornecedores(metricas, selecao)
@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+
+# =============================================
+# CONTAGEM APROXIMADA DE DISTINTOS (HYPERLOGLOG)
+# =============================================
+
+# 2^12 registradores por célula: erro padrão de 1,04 / sqrt(4096) ≈ 1,6%
+PRECISAO_PADRAO = 12
+
+# Bits do hash usados para o posto (rho), depois dos bits do registrador
+BITS_POSTO = 32
+
+
+def erro_padrao(precisao=PRECISAO_PADRAO):
+    """
+    Erro relativo padrão do HyperLogLog, 1,04 / sqrt(m). Cerca de 95% das
+    contagens ficam a até dois erros padrão do valor exato.
+    """
+    return 1.04 / np.sqrt(1 << precisao)
+
+
+def hash_valores(serie):
+    """Hash de 64 bits de cada valor não nulo; categóricas são hasheadas só no dicionário."""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        codigos = serie.cat.codes.to_numpy()
+        hashes_categorias = pd.util.hash_array(serie.cat.categories.to_numpy(dtype=object))
+        validos = codigos >= 0
+        return hashes_categorias[codigos[validos]], validos
+    validos = serie.notna().to_numpy()
+    return pd.util.hash_array(serie.to_numpy(dtype=object)[validos]), validos
+
+
+def _posicoes(hashes, precisao):
+    """Registrador (bits altos) e posto do primeiro bit 1 (bits seguintes) de cada hash."""
+    registrador = (hashes >> np.uint64(64 - precisao)).astype(np.intp)
+    resto = ((hashes << np.uint64(precisao)) >> np.uint64(64 - BITS_POSTO)).astype(np.float64)
+    posto = np.full(len(hashes), BITS_POSTO + 1, dtype=np.uint8)
+    positivos = resto > 0
+    posto[positivos] = BITS_POSTO - np.floor(np.log2(resto[positivos])).astype(np.uint8)
+    return registrador, posto
+
+
+def estimar(registradores):
+    """Estimativa HyperLogLog (com correção de pequenas cardinalidades) por linha."""
+    registradores = np.atleast_2d(registradores)
+    m = registradores.shape[1]
+    alfa = 0.7213 / (1 + 1.079 / m)
+    bruta = alfa * m * m / np.sum(np.exp2(-registradores.astype(np.float64)), axis=1)
+    zeros = np.count_nonzero(registradores == 0, axis=1)
+    linear = m * np.log(m / np.maximum(zeros, 1))
+    estimativa = np.where((bruta <= 2.5 * m) & (zeros > 0), linear, bruta)
+    return np.rint(estimativa).astype(np.int64)
+
+
+class SketchesCelulas:
+    """
+    Um sketch HyperLogLog de `coluna` para cada célula das `dimensoes`
+    (ex.: esfera × categoria × partido), construído uma vez no carregamento.
+    Os sketches são mescláveis (máximo registrador a registrador), então
+    qualquer combinação de filtros obtém a contagem de distintos unindo as
+    células selecionadas, sem reler as transações.
+    """
+
+    def __init__(self, celulas, registradores, precisao=PRECISAO_PADRAO):
+        self.celulas = celulas.reset_index(drop=True)
+        self.dimensoes = list(celulas.columns)
+        self.registradores = registradores
+        self.precisao = precisao
+        self.opcoes = {
+            dimensao: set(self.celulas[dimensao].dropna()) for dimensao in self.dimensoes
+        }
+
+    @classmethod
+    def de_transacoes(cls, dados, dimensoes, coluna='NM_CONTRAPARTE', precisao=PRECISAO_PADRAO):
+        """Constrói os sketches a partir do frame de transações."""
+        grupos = dados.groupby(list(dimensoes), observed=True, dropna=False, sort=True)
+        celula = grupos.ngroup().to_numpy()
+        celulas = grupos.size().index.to_frame(index=False)[list(dimensoes)]
+
+        hashes, validos = hash_valores(dados[coluna])
+        registrador, posto = _posicoes(hashes, precisao)
+        registradores = np.zeros((len(celulas), 1 << precisao), dtype=np.uint8)
+        np.maximum.at(registradores, (celula[validos], registrador), posto)
+        return cls(celulas, registradores, precisao)
+
+    @classmethod
+    def de_registros(cls, registros, dimensoes, precisao=PRECISAO_PADRAO):
+        """
+        Constrói os sketches a partir de linhas (dimensões, REGISTRADOR, POSTO)
+        já reduzidas ao máximo por célula e registrador, por exemplo em SQL.
+        """
+        grupos = registros.groupby(list(dimensoes), observed=True, dropna=False, sort=True)
+        celula = grupos.ngroup().to_numpy()
+        celulas = grupos.size().index.to_frame(index=False)[list(dimensoes)]
+
+        registradores = np.zeros((len(celulas), 1 << precisao), dtype=np.uint8)
+        np.maximum.at(
+            registradores,
+            (celula, registros['REGISTRADOR'].to_numpy(dtype=np.intp)),
+            registros['POSTO'].to_numpy(dtype=np.uint8)
+        )
+        return cls(celulas, registradores, precisao)
+
+    def mesclar(self, outro):
+        """Sketches da união de dois conjuntos de transações (ex.: base + lote novo)."""
+        celulas = pd.concat([self.celulas, outro.celulas], ignore_index=True).astype(object)
+        grupos = celulas.groupby(self.dimensoes, dropna=False, sort=True)
+        celula = grupos.ngroup().to_numpy()
+
+        registradores = np.zeros((grupos.ngroups, self.registradores.shape[1]), dtype=np.uint8)
+        np.maximum.at(registradores, celula, np.concatenate([self.registradores, outro.registradores]))
+        return SketchesCelulas(grupos.size().index.to_frame(index=False)[self.dimensoes],
+                               registradores, self.precisao)
+
+    def _mascara(self, selecao):
+        """Células da seleção; dimensões com todos os valores marcados não restringem."""
+        mascara = np.ones(len(self.celulas), dtype=bool)
+        for dimensao, valores in (selecao or {}).items():
+            if dimensao not in self.opcoes or set(valores).issuperset(self.opcoes[dimensao]):
+                continue
+            mascara &= self.celulas[dimensao].isin(list(valores)).to_numpy()
+        return mascara
+
+    def contar(self, selecao=None):
+        """Distintos aproximados na união das células selecionadas."""
+        mascara = self._mascara(selecao)
+        if not mascara.any():
+            return 0
+        return int(estimar(self.registradores[mascara].max(axis=0))[0])
+
+    def contar_por(self, dimensao, selecao=None):
+        """Distintos aproximados por valor de `dimensao` dentro da seleção."""
+        mascara = self._mascara(selecao)
+        grupo, valores = pd.factorize(self.celulas.loc[mascara, dimensao], sort=True)
+        registradores = self.registradores[mascara][grupo >= 0]
+
+        uniao = np.zeros((len(valores), registradores.shape[1]), dtype=np.uint8)
+        np.maximum.at(uniao, grupo[grupo >= 0], registradores)
+        contagens = estimar(uniao) if len(valores) else []
+        return pd.Series(contagens, index=pd.Index(valores, name=dimensao), dtype='int64')
@@ -0,0 +1,71 @@
+import pandas as pd
+
+# =============================================
+# CUBO PRÉ-AGREGADO (ESFERA × PARTIDO × CATEGORIA)
+# =============================================
+
+DIMENSOES_CUBO = ['NM_ESFERA', 'SG_PARTIDO', 'CATEGORIA_GASTO']
+
+
+def construir_cubo(dados):
+    """
+    Agrega as transações no grão (NM_ESFERA, SG_PARTIDO, CATEGORIA_GASTO),
+    guardando a soma dos valores e a quantidade de transações de cada célula.
+    """
+    cubo = dados.groupby(DIMENSOES_CUBO, observed=True, dropna=False).agg(
+        VR_LANCAMENTO_NUM=('VR_LANCAMENTO_NUM', 'sum'),
+        QTD_TRANSACOES=('VR_LANCAMENTO_NUM', 'size')
+    ).reset_index()
+    return cubo
+
+
+def somar_cubos(cubo, delta):
+    """Atualiza o cubo somando, célula a célula, o cubo de um lote novo."""
+    cubo = pd.concat([cubo, delta], ignore_index=True)
+    for dimensao in DIMENSOES_CUBO:
+        cubo[dimensao] = cubo[dimensao].astype(object)
+    return cubo.groupby(DIMENSOES_CUBO, dropna=False).agg(
+        VR_LANCAMENTO_NUM=('VR_LANCAMENTO_NUM', 'sum'),
+        QTD_TRANSACOES=('QTD_TRANSACOES', 'sum')
+    ).reset_index()
+
+
+def filtrar_cubo(cubo, esferas, categorias, partidos):
+    """Seleciona as células do cubo que atendem aos filtros do sidebar."""
+    mascara = (
+        cubo['NM_ESFERA'].isin(esferas) &
+        cubo['CATEGORIA_GASTO'].isin(categorias) &
+        cubo['SG_PARTIDO'].isin(partidos)
+    )
+    return cubo[mascara]
+
+
+def resumo_cubo(cubo):
+    """Totais usados pelas métricas do sidebar e da visão geral."""
+    return {
+        'valor_total': cubo['VR_LANCAMENTO_NUM'].sum(),
+        'transacoes': int(cubo['QTD_TRANSACOES'].sum()),
+        'partidos': cubo['SG_PARTIDO'].nunique(),
+    }
+
+
+def agrupar_cauda(agregado, grupo, chave, valor, n, rotulo='Outros'):
+    """
+    Mantém as `n` `chave` de maior `valor` dentro de cada `grupo` (ex.: os
+    3 maiores partidos de cada esfera; empates seguem a ordem de aparição,
+    como em nlargest) e soma as demais numa linha `rotulo`, preservando o
+    total do grupo.
+    """
+    grupo = [grupo] if isinstance(grupo, str) else list(grupo)
+    totais = agregado.groupby(grupo + [chave], observed=True)[valor].sum()
+    posicao = totais.groupby(level=grupo, observed=True).rank(method='first', ascending=False)
+    selecionados = posicao.index[posicao <= n]
+
+    cauda = ~pd.MultiIndex.from_frame(agregado[grupo + [chave]]).isin(selecionados)
+    if not cauda.any():
+        return agregado
+
+    resultado = agregado.assign(**{chave: agregado[chave].astype(object)})
+    resultado.loc[cauda, chave] = rotulo
+    dimensoes = [coluna for coluna in agregado.columns if coluna != valor]
+    return resultado.groupby(dimensoes, observed=True, sort=False)[valor].sum().reset_index()
@@ -0,0 +1,166 @@
+import hashlib
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+
+# =============================================
+# DOWNLOAD DA BASE EM SEGUNDO PLANO
+# =============================================
+
+TAMANHO_BLOCO = 1 << 20
+
+
+class ErroChecksum(ValueError):
+    """O arquivo baixado não confere com o tamanho ou o SHA-256 esperados."""
+
+
+class GerenciadorDownload:
+    """
+    Baixa um arquivo em uma thread de segundo plano. Os bytes vão para
+    `destino + '.part'`; uma nova tentativa retoma do ponto onde parou
+    (cabeçalho Range). Ao final o tamanho anunciado pelo servidor e, se
+    informado, o SHA-256 são conferidos, e só então o arquivo é movido
+    atomicamente para `destino`. Sem nenhum dos dois, o arquivo não pode
+    ser conferido e é recusado.
+    """
+
+    def __init__(self, url, destino, sha256=None, tentativas=5, timeout=30,
+                 tamanho_bloco=TAMANHO_BLOCO):
+        self.url = url
+        self.destino = destino
+        self.parcial = destino + ".part"
+        self.sha256 = sha256.lower() if sha256 else None
+        self.tentativas = tentativas
+        self.timeout = timeout
+        self.tamanho_bloco = tamanho_bloco
+
+        self.estado = 'concluido' if os.path.exists(destino) else 'pendente'
+        self.baixados = 0
+        self.total = None
+        self.erro = None
+        self._thread = None
+        self._trava = threading.Lock()
+
+    # ---------------------------------------------
+    # Controle
+    # ---------------------------------------------
+
+    def iniciar(self):
+        """Inicia o download em segundo plano, se ainda não estiver em andamento."""
+        with self._trava:
+            if self.estado in ('baixando', 'concluido'):
+                return
+            self.estado = 'baixando'
+            self.erro = None
+            self._thread = threading.Thread(target=self._executar, name="download-base", daemon=True)
+            self._thread.start()
+
+    def aguardar(self, timeout=None):
+        """Bloqueia até o fim do download em andamento."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.estado == 'concluido'
+
+    def progresso(self):
+        """Fração baixada (0 a 1), ou None quando o tamanho total é desconhecido."""
+        if self.estado == 'concluido':
+            return 1.0
+        if not self.total:
+            return None
+        return min(self.baixados / self.total, 1.0)
+
+    def _executar(self):
+        try:
+            self.baixar()
+        except Exception as erro:
+            self.erro = erro
+            self.estado = 'erro'
+
+    # ---------------------------------------------
+    # Download
+    # ---------------------------------------------
+
+    def baixar(self):
+        """Executa o download de forma síncrona, com novas tentativas e retomada."""
+        for tentativa in range(self.tentativas):
+            try:
+                self._baixar_parcial()
+                break
+            except (urllib.error.URLError, OSError) as erro:
+                if tentativa == self.tentativas - 1:
+                    raise
+                self.erro = erro
+                time.sleep(min(2 ** tentativa, 30))
+
+        self._verificar()
+        os.replace(self.parcial, self.destino)
+        self.erro = None
+        self.estado = 'concluido'
+
+    def _baixar_parcial(self):
+        """Baixa (ou continua baixando) o conteúdo para o arquivo .part."""
+        inicio = os.path.getsize(self.parcial) if os.path.exists(self.parcial) else 0
+        cabecalhos = {'Range': f"bytes={inicio}-"} if inicio else {}
+        pedido = urllib.request.Request(self.url, headers=cabecalhos)
+
+        try:
+            resposta = urllib.request.urlopen(pedido, timeout=self.timeout)
+        except urllib.error.HTTPError as erro:
+            # 416: o .part já tem (ao menos) o tamanho do arquivo, informado
+            # em "Content-Range: bytes */<total>"; _verificar confere se bate
+            if erro.code == 416 and inicio:
+                faixa = erro.headers.get('Content-Range', '')
+                if faixa.startswith('bytes */') and faixa[8:].isdigit():
+                    self.total = int(faixa[8:])
+                self.baixados = inicio
+                return
+            raise
+
+        with resposta:
+            if inicio and resposta.status != 206:
+                # O servidor ignorou o Range: recomeça do zero
+                inicio = 0
+            self.total = _tamanho_total(resposta, inicio) or self.total
+            self.baixados = inicio
+
+            with open(self.parcial, 'ab' if inicio else 'wb') as arquivo:
+                for bloco in iter(lambda: resposta.read(self.tamanho_bloco), b''):
+                    arquivo.write(bloco)
+                    self.baixados += len(bloco)
+
+        if self.total is not None and self.baixados < self.total:
+            raise OSError(f"Download incompleto: {self.baixados} de {self.total} bytes")
+
+    def _verificar(self):
+        """
+        Confere o tamanho e o SHA-256 do arquivo baixado, descartando-o se
+        algum não conferir (ou se não houver como conferir).
+        """
+        tamanho = os.path.getsize(self.parcial)
+        if self.total is None and not self.sha256:
+            os.remove(self.parcial)
+            raise ErroChecksum(f"Sem tamanho nem SHA-256 para conferir {self.destino} "
+                               "(informe DASHBOARD_SHA256_DADOS)")
+        if self.total is not None and tamanho != self.total:
+            os.remove(self.parcial)
+            raise ErroChecksum(f"Tamanho inválido para {self.destino}: {tamanho} de {self.total} bytes")
+        if not self.sha256:
+            return
+        sha = hashlib.sha256()
+        with open(self.parcial, 'rb') as arquivo:
+            for bloco in iter(lambda: arquivo.read(self.tamanho_bloco), b''):
+                sha.update(bloco)
+        if sha.hexdigest() != self.sha256:
+            os.remove(self.parcial)
+            raise ErroChecksum(f"Checksum inválido para {self.destino}: {sha.hexdigest()}")
+
+
+def _tamanho_total(resposta, inicio):
+    """Tamanho total do arquivo segundo Content-Range ou Content-Length."""
+    faixa = resposta.headers.get('Content-Range')
+    if faixa and '/' in faixa and not faixa.endswith('/*'):
+        return int(faixa.rsplit('/', 1)[1])
+    tamanho = resposta.headers.get('Content-Length')
+    return int(tamanho) + inicio if tamanho else None
@@ -0,0 +1,163 @@
+import argparse
+import io
+import os
+import time
+import zlib
+from contextlib import nullcontext
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from armazenamento import COLUNAS_DASHBOARD, DIRETORIO_PARQUET, ESQUEMA_DASHBOARD
+from consultas import LINHAS_POR_LOTE
+
+# =============================================
+# EXPORTAÇÃO DA SELEÇÃO EM FLUXO (CSV/PARQUET)
+# =============================================
+
+# formato: (extensão, tipo MIME)
+FORMATOS_EXPORTACAO = {
+    'csv': ('.csv', 'text/csv'),
+    'parquet': ('.parquet', 'application/vnd.apache.parquet'),
+}
+
+# Mesmo formato de data do CSV do dashboard
+FORMATO_DATA_CSV = '%Y-%m-%d'
+
+# Exportações simultâneas por processo (as demais esperam a vez)
+EXPORTACOES_SIMULTANEAS_PADRAO = 1
+
+# Linhas exportáveis pelo navegador: o Streamlit entrega o arquivo a partir
+# da memória do servidor. Exportações maiores ficam com a linha de comando
+# deste módulo, que grava em disco sem limite
+LIMITE_EXPORTACAO_NAVEGADOR_PADRAO = 1_000_000
+
+
+def nome_exportacao(formato, comprimir=False, base="transacoes"):
+    """Nome do arquivo exportado e seu tipo MIME."""
+    extensao, tipo = FORMATOS_EXPORTACAO[formato]
+    if comprimir and formato == 'csv':
+        return f"{base}{extensao}.gz", 'application/gzip'
+    return f"{base}{extensao}", tipo
+
+
+# ---------------------------------------------
+# Escritores em blocos
+# ---------------------------------------------
+
+def _blocos_csv(lotes, colunas, comprimir):
+    """CSV dos lotes, um bloco de bytes por lote; com `comprimir`, em gzip."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if comprimir else None
+    cabecalho = True
+    for lote in lotes:
+        bloco = lote[colunas].to_csv(index=False, header=cabecalho, date_format=FORMATO_DATA_CSV).encode('utf-8')
+        cabecalho = False
+        yield compressor.compress(bloco) if compressor else bloco
+    if cabecalho:
+        bloco = (",".join(colunas) + "\n").encode('utf-8')
+        yield compressor.compress(bloco) if compressor else bloco
+    if compressor:
+        yield compressor.flush()
+
+
+class _Saida(io.RawIOBase):
+    """Destino do ParquetWriter que guarda só os bytes ainda não entregues."""
+
+    def __init__(self):
+        self._pedacos = []
+        self._posicao = 0
+
+    def writable(self):
+        return True
+
+    def write(self, dados):
+        self._pedacos.append(bytes(dados))
+        self._posicao += len(dados)
+        return len(dados)
+
+    def tell(self):
+        return self._posicao
+
+    def esvaziar(self):
+        dados = b"".join(self._pedacos)
+        self._pedacos.clear()
+        return dados
+
+
+def _blocos_parquet(lotes, colunas, comprimir):
+    """
+    Parquet dos lotes, um row group por lote, entregue à medida que cada
+    row group é gravado. Com `comprimir`, as colunas usam gzip em vez de
+    snappy (o arquivo continua legível por qualquer leitor Parquet).
+    """
+    esquema = pa.schema([ESQUEMA_DASHBOARD.field(coluna) for coluna in colunas])
+    saida = _Saida()
+    with pq.ParquetWriter(saida, esquema, compression='gzip' if comprimir else 'snappy') as escritor:
+        for lote in lotes:
+            escritor.write_table(pa.Table.from_pandas(lote[colunas], schema=esquema, preserve_index=False))
+            yield saida.esvaziar()
+    yield saida.esvaziar()
+
+
+# ---------------------------------------------
+# Exportação
+# ---------------------------------------------
+
+def blocos_exportacao(consultas, selecao=None, colunas=None, formato='csv', comprimir=False,
+                      vagas=None, linhas=LINHAS_POR_LOTE):
+    """
+    Bytes do arquivo da seleção, em blocos, lidos lote a lote do motor de
+    consultas (pandas ou DuckDB) só com as `colunas` pedidas: a memória
+    usada é a de um lote, qualquer que seja o tamanho da exportação. Com
+    `vagas` (um semáforo), a exportação espera a sua vez e, entre um lote e
+    outro, devolve o GIL às sessões interativas.
+    """
+    if formato not in FORMATOS_EXPORTACAO:
+        raise ValueError(f"Formato de exportação desconhecido: {formato}")
+    colunas = list(colunas or COLUNAS_DASHBOARD)
+    escrever = _blocos_csv if formato == 'csv' else _blocos_parquet
+
+    with vagas or nullcontext():
+        for bloco in escrever(consultas.lotes(selecao, colunas, linhas), colunas, comprimir):
+            if bloco:
+                yield bloco
+            time.sleep(0)
+
+
+def exportar(consultas, destino, selecao=None, colunas=None, formato='csv', comprimir=False,
+             vagas=None, linhas=LINHAS_POR_LOTE):
+    """
+    Grava a exportação em `destino` (caminho ou arquivo aberto em modo
+    binário) à medida que os blocos são gerados. Devolve os bytes gravados.
+    """
+    with open(destino, 'wb') if isinstance(destino, (str, os.PathLike)) else nullcontext(destino) as arquivo:
+        total = 0
+        for bloco in blocos_exportacao(consultas, selecao, colunas, formato, comprimir, vagas, linhas):
+            arquivo.write(bloco)
+            total += len(bloco)
+    return total
+
+
+if __name__ == "__main__":
+    from motor_duckdb import MotorDuckDB
+
+    parser = argparse.ArgumentParser(
+        description="Exporta as transações do dataset, filtradas, sem carregá-las na memória (motor DuckDB)."
+    )
+    parser.add_argument('destino')
+    parser.add_argument('--origem', default=DIRETORIO_PARQUET)
+    parser.add_argument('--formato', choices=list(FORMATOS_EXPORTACAO), default='csv')
+    parser.add_argument('--gzip', action='store_true', help="CSV em gzip; Parquet com colunas em gzip")
+    parser.add_argument('--colunas', nargs='+', default=None, choices=COLUNAS_DASHBOARD)
+    parser.add_argument('--esferas', nargs='+', default=None)
+    parser.add_argument('--categorias', nargs='+', default=None)
+    parser.add_argument('--partidos', nargs='+', default=None)
+    args = parser.parse_args()
+
+    selecao = {
+        dimensao: valores for dimensao, valores in [
+            ('NM_ESFERA', args.esferas), ('CATEGORIA_GASTO', args.categorias), ('SG_PARTIDO', args.partidos)
+        ] if valores
+    }
+    total = exportar(MotorDuckDB(args.origem), args.destino, selecao, args.colunas, args.formato, args.gzip)
+    print(f"Exportação gravada em {args.destino}: {total / 1024:,.0f} KB")
@@ -1,29 +1,146 @@
-import gdown
+import json
 import os
+import tempfile
+import threading
+import time
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
-import plotly.express as px
-import plotly.graph_objects as go
 
-# Baixar o arquivo do Google Drive antes de carregar
-url = "https://drive.google.com/uc?id=1kUYPvgu-HCIdvdWVDYGCbbfEjEvOetzH"
-output = "extrato_bancario_DASHBOARD.csv"
+from armazenamento import (
+    ARQUIVO_ARROW, ARQUIVO_CSV, DIRETORIO_PARQUET,
+    abrir_arquivos, arquivo_arrow_anos, compactar_dados, concatenar_dados,
+    converter_csv_para_parquet, dataset_existe, filtro_sem_nao_informado, ler_dataset,
+    ler_dataset_compartilhado, preparar_dados, remover_categorias_vazias,
+    remover_nao_informado, versao_dataset
+)
+from atualizacao import carregar_lotes
+from cache_graficos import CacheGraficos, chave_selecao
+from catalogo import arquivos_particoes, carregar_catalogo, selecionar_particoes, versao_particoes
+from construcao_paralela import THREADS_PADRAO, ConstrutorFiguras
+from consultas import LINHAS_POR_PAGINA, ConsultasPandas, chave_metricas
+from contagem_aproximada import PRECISAO_PADRAO, SketchesCelulas, erro_padrao
+from cubo import DIMENSOES_CUBO, construir_cubo, filtrar_cubo, somar_cubos
+from download import GerenciadorDownload
+from exportacao import (
+    EXPORTACOES_SIMULTANEAS_PADRAO, FORMATOS_EXPORTACAO, LIMITE_EXPORTACAO_NAVEGADOR_PADRAO, exportar, nome_exportacao
+)
+from graficos import (
+    CORES, FONTES_GRAFICOS, TEMA_PLOTLY, criar_grafico_barras_agrupadas_esferas,
+    criar_grafico_comparacao_percentual, criar_grafico_evolucao_mensal,
+    criar_grafico_treemap_esferas,
+    criar_indice_diversificacao_fornecedores, criar_ranking_eficiencia,
+    criar_scatter_tarifas_vs_gastos
+)
+from indice_bitmap import DIMENSOES_FILTRO, IndiceBitmap
+from instantaneo import ARQUIVO_INSTANTANEO, anos_padrao, carregar_instantaneo, modo_fornecedores
+from instrumentacao import INATIVO, Rastreador
+from motor_duckdb import DUCKDB_DISPONIVEL, MotorDuckDB
+from orcamento_figuras import ORCAMENTO_PAGINA_PADRAO
+from serie_temporal import (
+    COLUNA_DATA, agregar_mensal, construir_cubo_diario, cubo_no_periodo,
+    fatiar_cubo_diario, ordenar_por_data, somar_cubos_diarios
+)
+
+# O frame da base é compartilhado entre as sessões: com copy-on-write, uma
+# alteração feita por uma sessão nunca atinge o objeto compartilhado
+pd.set_option('mode.copy_on_write', True)
+
+# Modo compartilhado: a base é lida de um arquivo Arrow mapeado em memória,
+# cujas páginas são divididas por todos os processos do servidor
+MODO_COMPARTILHADO = os.environ.get('DASHBOARD_DADOS_COMPARTILHADOS', '0') == '1'
+
+# Motor das agregações: 'pandas' (frame em memória) ou 'duckdb' (SQL sobre o
+# arquivo). Sem o pacote duckdb instalado, o motor DuckDB fica desligado
+MOTOR_CONFIGURADO = os.environ.get('DASHBOARD_MOTOR', 'pandas')
+MOTOR = 'pandas' if MOTOR_CONFIGURADO == 'duckdb' and not DUCKDB_DISPONIVEL else MOTOR_CONFIGURADO
+
+# Contagem de fornecedores: 'exato' (padrão, para auditoria) ou 'aproximado' (HyperLogLog)
+FORNECEDORES_APROXIMADOS = os.environ.get('DASHBOARD_FORNECEDORES', 'exato') == 'aproximado'
+PRECISAO_HLL = int(os.environ.get('DASHBOARD_HLL_PRECISAO', PRECISAO_PADRAO))
+
+# Orçamento de payload (JSON enviado ao navegador) por página; o por figura fica em graficos.py
+ORCAMENTO_PAGINA = int(os.environ.get('DASHBOARD_ORCAMENTO_PAGINA_KB', ORCAMENTO_PAGINA_PADRAO // 1024)) * 1024
+
+# Construção das figuras: threads por processo do servidor e, opcionalmente,
+# processos de trabalho para a montagem das figuras Plotly (0 = desligado)
+THREADS_GRAFICOS = int(os.environ.get('DASHBOARD_THREADS_GRAFICOS', THREADS_PADRAO))
+PROCESSOS_GRAFICOS = int(os.environ.get('DASHBOARD_PROCESSOS_GRAFICOS', 0))
+
+# Instrumentação opcional: tempos, linhas, cache e payload de cada execução,
+# no painel "Performance" do sidebar e, com um arquivo, em JSON lines
+INSTRUMENTACAO = os.environ.get('DASHBOARD_INSTRUMENTACAO', '0') == '1'
+ARQUIVO_INSTRUMENTACAO = os.environ.get('DASHBOARD_INSTRUMENTACAO_ARQUIVO') or None
+
+# Exportações da seleção geradas ao mesmo tempo por processo do servidor
+EXPORTACOES_SIMULTANEAS = int(os.environ.get('DASHBOARD_EXPORTACOES_SIMULTANEAS', EXPORTACOES_SIMULTANEAS_PADRAO))
+# Máximo de linhas da exportação pelo navegador (o arquivo passa pela memória do servidor)
+LIMITE_EXPORTACAO = int(os.environ.get('DASHBOARD_EXPORTACAO_MAX_LINHAS', LIMITE_EXPORTACAO_NAVEGADOR_PADRAO))
+
+# Base de dados no Google Drive (download direto, sem a página de confirmação)
+url = os.environ.get(
+    'DASHBOARD_URL_DADOS',
+    "https://drive.usercontent.google.com/download?id=1kUYPvgu-HCIdvdWVDYGCbbfEjEvOetzH&export=download&confirm=t"
+)
+output = ARQUIVO_CSV
+
+@st.cache_resource
+def obter_download():
+    """
+    Gerenciador do download da base, compartilhado entre as sessões. O
+    arquivo é conferido pelo tamanho anunciado pelo servidor e, quando
+    informado em DASHBOARD_SHA256_DADOS, pelo SHA-256.
+    """
+    return GerenciadorDownload(url, output, sha256=os.environ.get('DASHBOARD_SHA256_DADOS'))
+
+def dataset_disponivel():
+    """Indica se a base real já está no disco (o CSV só aparece após o download completo)."""
+    return dataset_existe(DIRETORIO_PARQUET) or os.path.exists(ARQUIVO_CSV)
 
-if not os.path.exists(output):
-    st.info("Baixando base de dados do Google Drive...")
-    gdown.download(url, output, quiet=False)
-    st.success("Base de dados carregada com sucesso!")
+@st.cache_resource
+def converter_dataset():
+    """Conversão única (por processo) do CSV baixado para o dataset Parquet particionado."""
+    if not dataset_existe(DIRETORIO_PARQUET):
+        converter_csv_para_parquet(ARQUIVO_CSV, DIRETORIO_PARQUET)
+
+def obter_catalogo(disponivel=True):
+    """
+    Partições (anos) do dataset com suas estatísticas. A cada rerun só as
+    peças são conferidas com stat; apenas as novas têm o rodapé lido.
+    """
+    if not disponivel:
+        return []
+    try:
+        converter_dataset()
+        return carregar_catalogo(DIRETORIO_PARQUET)
+    except Exception:
+        # Sem dataset legível, carregar_dados cai nos dados de demonstração
+        return []
 
 # Agora sim, chama a função que usa o arquivo
-@st.cache_data
-def carregar_dados():
-    """Carrega o dataset tratado para análise ou usa dados de demonstração."""
+def carregar_dados(disponivel=True, particoes=None):
+    """
+    Carrega o dataset tratado para análise ou usa dados de demonstração.
+    Com `particoes` do catálogo, lê apenas as peças delas.
+    Chamada apenas por carregar_base, que mantém uma única instância por processo.
+    """
     try:
-        df = pd.read_csv('extrato_bancario_DASHBOARD.csv', encoding='utf-8')
-        df['DT_LANCAMENTO'] = pd.to_datetime(df['DT_LANCAMENTO'], errors='coerce')
+        if not disponivel:
+            raise FileNotFoundError(ARQUIVO_CSV)
+        converter_dataset()
+        arquivos, versao, caminho_arrow = None, None, ARQUIVO_ARROW
+        if particoes:
+            arquivos = arquivos_particoes(particoes, DIRETORIO_PARQUET)
+            versao = versao_particoes(particoes)
+            caminho_arrow = arquivo_arrow_anos([particao['nome'] for particao in particoes])
+        if MODO_COMPARTILHADO:
+            df = ler_dataset_compartilhado(DIRETORIO_PARQUET, caminho_arrow, filtro=filtro_sem_nao_informado(),
+                                           arquivos=arquivos, versao=versao)
+        else:
+            df = preparar_dados(ler_dataset(DIRETORIO_PARQUET, filtro=filtro_sem_nao_informado(), arquivos=arquivos))
+        df.attrs['versao'] = versao or versao_dataset(DIRETORIO_PARQUET)
     except Exception as e:
-        st.warning(f"Usando dados de demonstração. O arquivo não foi encontrado. Erro: {e}")
+        if disponivel:
+            st.warning(f"Usando dados de demonstração. O arquivo não foi encontrado. Erro: {e}")
         data = {
             'DT_LANCAMENTO': pd.to_datetime([
                 '2020-01-15', '2020-02-20', '2020-03-10',
@@ -35,47 +152,336 @@ def carregar_dados():
             'NM_CONTRAPARTE': ['A', 'B', 'C', 'D', 'E', 'F'],
             'VR_LANCAMENTO_NUM': [500000.00, 200000.00, 50000.00, 300000.00, 150000.00, 75000.00]
         }
-        df = pd.DataFrame(data)
+        df = preparar_dados(pd.DataFrame(data))
+        df.attrs['versao'] = 'demonstracao'
 
     return df
 
-# E aqui, de fato, chama a função:
-df = carregar_dados()
+def particoes_selecionadas(anos=None, catalogo=None):
+    """Partições do catálogo dos anos escolhidos (todas, com None)."""
+    catalogo = carregar_catalogo(DIRETORIO_PARQUET) if catalogo is None else catalogo
+    return selecionar_particoes(catalogo, anos)
+
+@st.cache_resource
+def carregar_base(disponivel=True, anos=None):
+    """
+    Prepara, uma única vez por processo e seleção de anos, o frame limpo
+    (ordenado por data) e as estruturas derivadas dele: o cubo esfera ×
+    partido × categoria e seus agregados diário e mensal, o índice bitmap
+    dos filtros do sidebar e o objeto de consultas sobre as transações.
+    Só as partições dos `anos` são lidas.
+    """
+    particoes = particoes_selecionadas(anos) if disponivel else []
+    if MOTOR == 'duckdb' and disponivel:
+        return carregar_base_duckdb(particoes)
+
+    # Lotes registrados antes da leitura: os seguintes entram por atualizar_base
+    lotes = {lote['id'] for lote in carregar_lotes(DIRETORIO_PARQUET)} if disponivel else set()
+    with obter_rastreador().trecho('carregar_dados', anos=",".join(anos or [])) as atributos:
+        dados = carregar_dados(disponivel, particoes)
+        atributos['linhas_saida'] = len(dados)
+    versao = dados.attrs.get('versao', 'demonstracao')
+    sketches = None
+    if FORNECEDORES_APROXIMADOS:
+        sketches = SketchesCelulas.de_transacoes(dados, DIMENSOES_CUBO, precisao=PRECISAO_HLL)
+    base = {
+        'versao': versao,
+        'lotes': lotes,
+        'cubo': construir_cubo(dados),
+    }
+    base.update(agregados_temporais(construir_cubo_diario(dados)))
+    base.update(estruturas_consulta(dados, sketches))
+    return base
+
+def agregados_temporais(cubo_diario):
+    """Cubos diário (para períodos) e mensal (para a evolução mensal) da base."""
+    return {
+        'cubo_diario': cubo_diario,
+        'cubo_mensal': agregar_mensal(cubo_diario),
+    }
+
+def estruturas_consulta(dados, sketches=None):
+    """Índice bitmap e objeto de consultas sobre o frame de transações."""
+    indice = IndiceBitmap(dados, DIMENSOES_FILTRO)
+    return {
+        'dados': dados,
+        'indice': indice,
+        'consultas': ConsultasPandas(dados, indice, sketches),
+    }
+
+# Uma única atualização incremental por vez no processo
+TRAVA_ATUALIZACAO = threading.Lock()
+
+def obter_base(disponivel=True, anos=None, catalogo=None):
+    """
+    Base compartilhada do processo para os anos escolhidos, conferindo a
+    cada rerun, pelo catálogo, se as partições deles mudaram: ingerir ou
+    anexar outro ano não afeta esta base. Lotes anexados por atualizacao.py
+    são aplicados por delta; qualquer outra mudança recarrega a base
+    inteira. As figuras em cache são invalidadas pela nova versão na chave.
+    """
+    base = carregar_base(disponivel, anos)
+    if base['versao'] in ('demonstracao', 'inexistente'):
+        return base
+
+    if versao_particoes(particoes_selecionadas(anos, catalogo)) == base['versao']:
+        return base
+
+    with TRAVA_ATUALIZACAO:
+        with obter_rastreador().trecho('atualizar_base') as atributos:
+            particoes = particoes_selecionadas(anos)
+            atualizada = versao_particoes(particoes) == base['versao'] or atualizar_base(base, particoes)
+            atributos['incremental'] = atualizada
+        if not atualizada:
+            carregar_base.clear(disponivel, anos)
+            base = carregar_base(disponivel, anos)
+    return base
+
+def atualizar_base(base, particoes):
+    """
+    Aplica à base em memória apenas os lotes novos das `particoes` da base:
+    lê só as peças deles, soma o cubo do lote ao cubo existente, mescla os
+    sketches e refaz o índice bitmap. Retorna False quando a mudança não é
+    incremental.
+    """
+    # Versão lida antes dos lotes: um lote que chegue no meio muda a versão de novo
+    versao = versao_particoes(particoes)
+    lotes = carregar_lotes(DIRETORIO_PARQUET)
+    novos = [lote for lote in lotes if lote['id'] not in base['lotes']]
+    if MODO_COMPARTILHADO or not novos or not base['lotes'] <= {lote['id'] for lote in lotes}:
+        return False
+
+    # Peças dos lotes novos que caem nos anos da base (lotes de outros anos são ignorados)
+    selecionadas = {os.path.normpath(arquivo) for particao in particoes for arquivo in particao['arquivos']}
+    arquivos = [
+        os.path.join(DIRETORIO_PARQUET, arquivo)
+        for lote in novos for arquivo in lote['arquivos'] if os.path.normpath(arquivo) in selecionadas
+    ]
+    if not arquivos:
+        return False
+
+    if MOTOR == 'duckdb':
+        base['cubo'] = base['consultas'].recarregar(arquivos_particoes(particoes, DIRETORIO_PARQUET))
+        base.update(agregados_temporais(base['consultas'].cubo_diario()))
+    else:
+        tabela = abrir_arquivos(arquivos, DIRETORIO_PARQUET).to_table(
+            columns=list(base['dados'].columns), filter=filtro_sem_nao_informado()
+        )
+        delta = remover_nao_informado(compactar_dados(tabela.to_pandas(strings_to_categorical=True)))
+
+        sketches = base['consultas'].sketches
+        if sketches is not None:
+            sketches = sketches.mesclar(
+                SketchesCelulas.de_transacoes(delta, DIMENSOES_CUBO, precisao=sketches.precisao)
+            )
+        dados = remover_categorias_vazias(concatenar_dados(base['dados'], delta), DIMENSOES_FILTRO)
+        base.update(estruturas_consulta(ordenar_por_data(dados), sketches))
+        base['cubo'] = somar_cubos(base['cubo'], construir_cubo(delta))
+        base.update(agregados_temporais(
+            somar_cubos_diarios(base['cubo_diario'], construir_cubo_diario(delta))
+        ))
+
+    base['lotes'] = base['lotes'] | {lote['id'] for lote in novos}
+    base['versao'] = versao
+    return True
+
+def carregar_base_duckdb(particoes=None):
+    """
+    Base do motor DuckDB: apenas o cubo é trazido para a memória, e as
+    consultas leem só as peças das `particoes` do catálogo.
+    """
+    converter_dataset()
+    motor = MotorDuckDB(
+        DIRETORIO_PARQUET,
+        threads=os.environ.get('DASHBOARD_DUCKDB_THREADS'),
+        memoria=os.environ.get('DASHBOARD_DUCKDB_MEMORIA'),
+        diretorio_temporario=os.environ.get('DASHBOARD_DUCKDB_TEMP'),
+        aproximado=FORNECEDORES_APROXIMADOS,
+        precisao=PRECISAO_HLL,
+        arquivos=arquivos_particoes(particoes, DIRETORIO_PARQUET) if particoes else None
+    )
+    base = {
+        'versao': versao_particoes(particoes) if particoes else versao_dataset(DIRETORIO_PARQUET),
+        'lotes': {lote['id'] for lote in carregar_lotes(DIRETORIO_PARQUET)},
+        'cubo': motor.cubo(),
+        'consultas': motor,
+    }
+    base.update(agregados_temporais(motor.cubo_diario()))
+    return base
+
+@st.cache_resource
+def ler_instantaneo(caminho, modificado):
+    """Instantâneo da visão padrão, lido uma vez por processo (e de novo se o arquivo mudar)."""
+    return carregar_instantaneo(caminho)
+
+def obter_instantaneo(disponivel=True, anos=None, catalogo=None):
+    """
+    Instantâneo gerado na ingestão, se ele é dos `anos` escolhidos,
+    corresponde à versão atual das partições deles e ao modo de contagem de
+    fornecedores e traz todas as figuras do dashboard; senão None. Com ele,
+    a visão padrão é exibida sem carregar as transações.
+    """
+    if not disponivel or not anos or not os.path.exists(ARQUIVO_INSTANTANEO):
+        return None
+    instantaneo = ler_instantaneo(ARQUIVO_INSTANTANEO, os.path.getmtime(ARQUIVO_INSTANTANEO))
+    modo = modo_fornecedores(PRECISAO_HLL if FORNECEDORES_APROXIMADOS else None)
+    if (instantaneo is None or instantaneo['fornecedores'] != modo
+            or instantaneo.get('anos') != list(anos)
+            or instantaneo['versao'] != versao_particoes(particoes_selecionadas(anos, catalogo))
+            or any(construtor.__name__ not in instantaneo['figuras'] for construtor in FONTES_GRAFICOS)):
+        return None
+    return instantaneo
+
+@st.cache_resource
+def obter_cache_graficos():
+    """
+    Cache de figuras compartilhado entre as sessões do processo. O orçamento
+    de memória e a camada opcional em disco vêm das variáveis de ambiente
+    DASHBOARD_CACHE_MB, DASHBOARD_CACHE_DISCO e DASHBOARD_CACHE_DISCO_MB.
+    """
+    return CacheGraficos(
+        orcamento_bytes=int(os.environ.get('DASHBOARD_CACHE_MB', 256)) * 1024 * 1024,
+        diretorio_disco=os.environ.get('DASHBOARD_CACHE_DISCO') or None,
+        orcamento_disco_bytes=int(os.environ.get('DASHBOARD_CACHE_DISCO_MB', 1024)) * 1024 * 1024
+    )
+
+@st.cache_resource
+def obter_construtor_figuras():
+    """Pool de construção de figuras compartilhado entre as sessões do processo."""
+    return ConstrutorFiguras(obter_cache_graficos(), THREADS_GRAFICOS, PROCESSOS_GRAFICOS)
+
+@st.cache_resource
+def obter_vagas_exportacao():
+    """Semáforo das exportações, compartilhado entre as sessões do processo."""
+    return threading.BoundedSemaphore(max(EXPORTACOES_SIMULTANEAS, 1))
+
+def gerar_exportacao(consultas, selecao, colunas, formato, comprimir):
+    """
+    Bytes do arquivo da exportação: os blocos vão para um arquivo
+    temporário em disco à medida que são produzidos, e só o arquivo pronto
+    é lido. O Streamlit serve downloads a partir da memória, por isso a
+    tela só chama esta função até LIMITE_EXPORTACAO linhas.
+    """
+    with tempfile.TemporaryFile() as arquivo:
+        exportar(consultas, arquivo, selecao, colunas, formato, comprimir, obter_vagas_exportacao())
+        arquivo.seek(0)
+        return arquivo.read()
+
+def construir_graficos(pedidos, chave):
+    """
+    Constrói em paralelo (ou recupera do cache) as figuras de `pedidos`,
+    {construtor: dados}, usando como chave o nome do gráfico e a chave da
+    seleção. `dados` pode ser uma função, chamada apenas quando a figura
+    precisa ser construída. Retorna {construtor: figura} e registra o
+    tamanho do JSON de cada figura para o relatório de payload.
+    """
+    cache = obter_cache_graficos()
+    chaves = [(construtor.__name__,) + chave for construtor in pedidos]
+    figuras = obter_construtor_figuras().construir(
+        [(construtor, dados, chave) for (construtor, dados), chave in zip(pedidos.items(), chaves)],
+        CORES,
+        obter_rastreador()
+    )
+    tamanhos = st.session_state.setdefault('tamanhos_graficos', {})
+    for construtor, chave in zip(pedidos, chaves):
+        tamanhos[construtor.__name__] = cache.tamanho(chave)
+    return dict(zip(pedidos, figuras))
+
+def exibir_grafico(figuras, construtor):
+    """st.plotly_chart de uma figura já construída, medido pela instrumentação."""
+    nome = construtor.__name__
+    with obter_rastreador().trecho('plotly_chart', grafico=nome,
+                                   payload_bytes=st.session_state.get('tamanhos_graficos', {}).get(nome)):
+        st.plotly_chart(figuras[construtor], use_container_width=True)
+
+def obter_rastreador():
+    """
+    Rastreador da sessão. A instrumentação é opcional: é ligada para todos
+    com DASHBOARD_INSTRUMENTACAO=1, ou só para a sessão com ?perf=1 na URL.
+    """
+    if 'rastreador' not in st.session_state:
+        ativo = INSTRUMENTACAO or st.query_params.get('perf') == '1'
+        st.session_state['rastreador'] = Rastreador(arquivo=ARQUIVO_INSTRUMENTACAO) if ativo else INATIVO
+    return st.session_state['rastreador']
+
+def exibir_painel_desempenho(rastreador):
+    """Painel "Performance" do sidebar, presente só com a instrumentação ligada."""
+    if not rastreador.ativo:
+        return
+    with st.sidebar.expander("Performance"):
+        duracao = (time.time_ns() - rastreador.execucao['inicio_ns']) / 1e6
+        st.caption(f"Última execução: {duracao:,.0f} ms")
+        st.dataframe(pd.DataFrame(rastreador.tabela()), hide_index=True)
+        st.download_button("Exportar JSON lines", rastreador.jsonl(),
+                           file_name="desempenho.jsonl", mime="application/jsonl")
+        st.download_button("Exportar OpenTelemetry", json.dumps(rastreador.otel()),
+                           file_name="desempenho-otel.json", mime="application/json")
+
+def formatar_fornecedores(quantidade):
+    """Contagem de fornecedores, marcada com ≈ quando vem dos sketches."""
+    return f"≈{quantidade}" if FORNECEDORES_APROXIMADOS else quantidade
+
+def ajuda_fornecedores():
+    if not FORNECEDORES_APROXIMADOS:
+        return "Contagem exata de fornecedores distintos."
+    erro = erro_padrao(PRECISAO_HLL)
+    return (
+        f"Estimativa HyperLogLog: erro padrão de ±{erro:.1%} "
+        f"(cerca de 95% das contagens ficam em ±{2 * erro:.1%})."
+    )
+
+def selecionar_anos(catalogo):
+    """
+    Seletor de anos do sidebar (só com mais de uma partição no catálogo) e
+    o resumo de cada partição. Retorna os anos escolhidos, em ordem, ou
+    None sem dataset.
+    """
+    if not catalogo:
+        return None
+    nomes = [particao['nome'] for particao in catalogo]
+    padrao = anos_padrao(catalogo)
+    anos = nomes
+    if len(nomes) > 1:
+        escolhidos = st.multiselect("Selecione os Anos:", nomes, default=padrao)
+        # Sem nenhum ano marcado, vale o mais recente
+        anos = [nome for nome in nomes if nome in escolhidos] or padrao
+
+    with st.expander("Catálogo de dados"):
+        st.dataframe(pd.DataFrame([
+            {
+                'Ano': particao['nome'],
+                'Linhas': particao['linhas'],
+                'Início': particao['inicio'],
+                'Fim': particao['fim'],
+                'Partidos': len(particao['partidos']),
+            }
+            for particao in catalogo
+        ]), hide_index=True, column_config={
+            'Início': st.column_config.DateColumn(format="DD/MM/YYYY"),
+            'Fim': st.column_config.DateColumn(format="DD/MM/YYYY"),
+        })
+    return tuple(anos)
+
+@st.fragment(run_every=5)
+def acompanhar_download(download):
+    """Mostra o progresso do download e recarrega a página quando a base chega."""
+    if dataset_disponivel():
+        st.rerun()
+
+    if download.estado == 'erro':
+        st.warning(f"Falha ao baixar a base de dados: {download.erro}. Exibindo dados de demonstração.")
+        if st.button("Tentar novamente"):
+            download.iniciar()
+        return
+
+    progresso = download.progresso()
+    texto = f"{progresso:.0%}" if progresso is not None else f"{download.baixados / 1e6:,.1f} MB"
+    st.info(f"Baixando base de dados do Google Drive em segundo plano ({texto}). Exibindo dados de demonstração.")
 
 
 # =============================================
 # CONFIGURAÇÃO DE ESTILO CORPORATIVO
 # =============================================
-CORES = {
-    'azul_escuro': '#0F4C75',
-    'azul_medio': '#3282B8',
-    'azul_claro': '#BBE1FA',
-    'azul_muito_escuro': '#1B262C',
-    'cinza_escuro': '#393E46',
-    'cinza_medio': '#686D76',
-    'cinza_claro': '#EEEEEE',
-    'branco': '#FFFFFF',
-    'amarelo_mostarda': "#FFC400",
-    'laranja': "#FF9900",
-    'gradiente_principal': ['#0F4C75', '#2E72A2', '#5D99C6', '#89CFF0', '#BBE1FA', '#FF9900', '#FFC400'],
-    'gradiente_secundario': ['#1B262C', '#0F4C75', '#3282B8'],
-    'mapa_cores_esferas': {
-        'NACIONAL': '#0F4C75', # Azul Escuro
-        'ESTADUAL': '#FF9900', # Laranja para contraste
-        'MUNICIPAL': '#5D99C6', # Azul Médio-claro
-        'DISTRITAL': '#3282B8', # Outro tom de azul
-        'NAO INFORMADO': '#393E46' # Cinza Escuro
-    }
-}
-TEMA_PLOTLY = {
-    'plot_bgcolor': CORES['branco'],
-    'paper_bgcolor': CORES['branco'],
-    'font_color': '#333333',
-    'font_family': "Inter, sans-serif",
-    'titulo_cor': CORES['azul_escuro'],
-    'legenda_cor': CORES['azul_escuro']
-}
-
 def configurar_estilo_azul_profissional():
     """Configura estilo visual com tema azul profissional e retorna cores."""
     
@@ -127,601 +533,11 @@ def configurar_estilo_azul_profissional():
     return CORES
 
 # =============================================
-# CARREGAMENTO DE DADOS
+# SEÇÃO P1 - COMPARAÇÃO ENTRE ESFERAS
 # =============================================
 
-
-# =============================================
-# CONFIGURAÇÃO DO TEMA PLOTLY
-# =============================================
-
-TEMA_PLOTLY = {
-    'title_color': CORES['azul_escuro'],
-    'font_color': CORES['azul_muito_escuro'], 
-    'height': 500,
-    'plot_bg': CORES['branco'],
-    'paper_bg': CORES['branco']
-}
-
-@st.cache_data
-def configurar_layout(fig, titulo):
-    """
-    Aplica um layout padrão (tema e centralização de título) à figura do Plotly.
-    """
-    titulo_cor = TEMA_PLOTLY.get('title_color', '#0F4C75')
-    fonte_cor = TEMA_PLOTLY.get('font_color', 'black')
-    paper_cor = TEMA_PLOTLY.get('paper_bg', 'white')
-    plot_cor = TEMA_PLOTLY.get('plot_bg', 'white')
-
-    fig.update_layout(
-        title={
-            'text': titulo,
-            'y': 0.95, 
-            'x': 0.5, 
-            'xanchor': 'center',
-            'yanchor': 'top',
-            'font': dict(
-                size=20,
-                color=titulo_cor
-            )
-        },
-        paper_bgcolor=paper_cor,
-        plot_bgcolor=plot_cor,
-        font=dict(
-            color=fonte_cor
-        ),
-        height=TEMA_PLOTLY.get('height', 500),
-        margin=dict(t=80, b=50, l=50, r=50) 
-    )
-
-    return fig
-
-# =============================================
-# FUNÇÕES ESPECÍFICAS PARA P1
-# =============================================
-
-@st.cache_data
-def criar_grafico_barras_agrupadas_esferas(dados, cores):
-    """GRÁFICO 1: Barras agrupadas - Gastos por categoria × esfera"""
-    
-    esfera_categoria = dados.groupby(['NM_ESFERA', 'CATEGORIA_GASTO'])['VR_LANCAMENTO_NUM'].sum().reset_index()
-    
-    top_categorias = dados.groupby('CATEGORIA_GASTO')['VR_LANCAMENTO_NUM'].sum().nlargest(6).index
-    dados_filtrados = esfera_categoria[esfera_categoria['CATEGORIA_GASTO'].isin(top_categorias)]
-    
-    fig = px.bar(
-        dados_filtrados,
-        x='CATEGORIA_GASTO',
-        y='VR_LANCAMENTO_NUM',
-        color='NM_ESFERA',
-        barmode='group',
-        color_discrete_sequence=cores['gradiente_principal']
-    )
-    
-    fig = configurar_layout(fig, 'COMPARAÇÃO DE GASTOS POR CATEGORIA ENTRE ESFERAS')
-    
-    fig.update_layout(
-        xaxis=dict(
-            title_text='CATEGORIA DE GASTO',
-            linecolor=TEMA_PLOTLY['font_color'],
-            gridcolor=TEMA_PLOTLY['font_color'],
-            tickcolor=TEMA_PLOTLY['font_color'],
-            tickfont=dict(color=TEMA_PLOTLY['font_color']),
-            title_font=dict(color=TEMA_PLOTLY['font_color'])
-        ),
-        yaxis=dict(
-            title_text='VALOR TOTAL (R$)',
-            linecolor=TEMA_PLOTLY['font_color'],
-            gridcolor=TEMA_PLOTLY['font_color'],
-            tickcolor=TEMA_PLOTLY['font_color'],
-            tickfont=dict(color=TEMA_PLOTLY['font_color']),
-            title_font=dict(color=TEMA_PLOTLY['font_color'])
-        ),
-        legend=dict(
-            font=dict(color=TEMA_PLOTLY['font_color']),
-            title_text='Esfera',
-            title=dict(
-                font=dict(
-                    color=TEMA_PLOTLY['font_color'],
-                    weight='bold'   
-                )
-            )
-        )
-    )
-    
-    fig.update_xaxes(tickangle=45)
-    fig.update_yaxes(tickformat=",.0f")
-    
-    return fig
-
-@st.cache_data
-def criar_grafico_treemap_esferas(dados, cores):
-    """GRÁFICO 2: Treemap hierárquico - Esfera → Partido → Categoria"""
-
-    hierarquia = dados.groupby(['NM_ESFERA', 'SG_PARTIDO', 'CATEGORIA_GASTO'])['VR_LANCAMENTO_NUM'].sum().reset_index()
-
-    partidos_top_por_esfera = []
-    for esfera in dados['NM_ESFERA'].unique():
-        top_partidos = (
-            dados[dados['NM_ESFERA'] == esfera]
-            .groupby('SG_PARTIDO')['VR_LANCAMENTO_NUM'].sum()
-            .nlargest(3).index
-        )
-        for partido in top_partidos:
-            partidos_top_por_esfera.append((esfera, partido))
-
-    mask = hierarquia.apply(lambda x: (x['NM_ESFERA'], x['SG_PARTIDO']) in partidos_top_por_esfera, axis=1)
-    dados_filtrados = hierarquia[hierarquia['SG_PARTIDO'].isin(dados['SG_PARTIDO'].unique())]
-  
-
-    gradiente_laranja = [
-        "#FF6F00",  # Esfera
-        "#FFA726",  # Partido
-        "#FFE082"   # Categoria
-    ]
-
-    fig = px.treemap(
-        dados_filtrados,
-        path=['NM_ESFERA', 'SG_PARTIDO', 'CATEGORIA_GASTO'],
-        values='VR_LANCAMENTO_NUM',
-        color='NM_ESFERA',
-        color_discrete_sequence=gradiente_laranja
-    )
-
-    fig.data[0].marker.colors = [
-        gradiente_laranja[min(len(p.split('/')) - 1, 2)]
-        for p in fig.data[0].ids
-    ]
-
-    fig = configurar_layout(fig, 'Mapa de Árvore: Estrutura Hierárquica de Gastos (Esfera / Partido / Categoria)')
-
-    fig.update_traces(
-        textinfo='label+value',
-        hovertemplate='<b>%{label}</b><br>R$ %{value:,.2f}<extra></extra>',
-        marker=dict(line=dict(color=cores['cinza_medio'], width=1))
-    )
-
-    fig.update_layout(
-        margin=dict(t=80, l=0, r=0, b=0)
-    )
-
-    fig.add_trace(go.Scatter(
-        x=[None], y=[None],
-        mode='markers',
-        marker=dict(size=10, color=gradiente_laranja[0]),
-        name='Esfera'
-    ))
-    fig.add_trace(go.Scatter(
-        x=[None], y=[None],
-        mode='markers',
-        marker=dict(size=10, color=gradiente_laranja[1]),
-        name='Partido'
-    ))
-    fig.add_trace(go.Scatter(
-        x=[None], y=[None],
-        mode='markers',
-        marker=dict(size=10, color=gradiente_laranja[2]),
-        name='Categoria'
-    ))
-
-    fig.update_layout(
-        legend=dict(
-            title=dict(
-                text='<b>NÍVEL HIERÁRQUICO</b>',
-                font=dict(size=13, color=cores['azul_escuro']),
-                side='top'
-            ),
-            font=dict(color=cores['azul_muito_escuro'], size=12),
-            orientation='h',
-            yanchor='bottom',
-            y=-0.25,
-            xanchor='center',
-            x=0.5,
-            valign='middle',
-            itemsizing='constant',
-            itemwidth=50,
-            traceorder='normal'
-        )
-    )
-    
-    fig.update_xaxes(
-        showgrid=False,
-        zeroline=False,
-        color='black',
-        title_font=dict(color='black', size=12),
-        tickfont=dict(color='black', size=11)
-    )
-
-    fig.update_yaxes(
-        showgrid=False,
-        zeroline=False,
-        color='black',
-        title_font=dict(color='black', size=12),
-        tickfont=dict(color='black', size=11)
-    )
-
-    return fig
-
-@st.cache_data
-def criar_grafico_comparacao_percentual(dados, cores):
-    """GRÁFICO 3: Comparação percentual entre esferas"""
-    
-    total_por_esfera = dados.groupby('NM_ESFERA')['VR_LANCAMENTO_NUM'].sum()
-    percentual_esfera = dados.groupby(['NM_ESFERA', 'CATEGORIA_GASTO'])['VR_LANCAMENTO_NUM'].sum().reset_index()
-    percentual_esfera['PERCENTUAL'] = percentual_esfera.apply(
-        lambda x: (x['VR_LANCAMENTO_NUM'] / total_por_esfera[x['NM_ESFERA']]) * 100, 
-        axis=1
-    )
-    
-    top_categorias = dados.groupby('CATEGORIA_GASTO')['VR_LANCAMENTO_NUM'].sum().nlargest(5).index
-    dados_filtrados = percentual_esfera[percentual_esfera['CATEGORIA_GASTO'].isin(top_categorias)]
-    
-    fig = px.bar(
-        dados_filtrados,
-        x='NM_ESFERA',
-        y='PERCENTUAL',
-        color='CATEGORIA_GASTO',
-        barmode='stack',
-        color_discrete_sequence=cores['gradiente_principal']
-    )
-    
-    fig = configurar_layout(fig, 'Composição Percentual: DISTRIBUIÇÃO DAS CATEGORIAS DE GASTOS POR ESFERA')
-    
-    fig.update_layout(
-        xaxis=dict(
-            title_text='ESFERA PARTIDÁRIA',
-            linecolor=TEMA_PLOTLY['font_color'],
-            gridcolor=TEMA_PLOTLY['font_color'],
-            tickcolor=TEMA_PLOTLY['font_color'],
-            tickfont=dict(color=TEMA_PLOTLY['font_color']),
-            title_font=dict(color=TEMA_PLOTLY['font_color'])
-        ),
-        yaxis=dict(
-            title_text='PERCENTUAL (%)',
-            linecolor=TEMA_PLOTLY['font_color'],
-            gridcolor=TEMA_PLOTLY['font_color'],
-            tickcolor=TEMA_PLOTLY['font_color'],
-            tickfont=dict(color=TEMA_PLOTLY['font_color']),
-            title_font=dict(color=TEMA_PLOTLY['font_color'])
-        ),
-        legend=dict(
-            title=dict(
-                text='<b>CATEGORIAS DE GASTOS</b>',
-                font=dict(size=13, color='black')
-            ),
-            font=dict(color='black', size=12),
-            orientation='v',
-            yanchor='middle',
-            y=0.5,
-            xanchor='left',
-            x=1.02,
-            bgcolor='rgba(255,255,255,0)',
-            bordercolor='rgba(0,0,0,0)',
-            traceorder='normal'
-        )
-    )
-    
-    fig.update_yaxes(ticksuffix="%")
-    
-    return fig
-
-# =============================================
-# FUNÇÕES ESPECÍFICAS PARA P2 - VERSÃO CORRIGIDA
-# =============================================
-
-@st.cache_data
-def criar_scatter_tarifas_vs_gastos(dados, cores):
-    """GRÁFICO 4: Scatter plot - Tarifas bancárias vs Gastos totais por partido (EM MILHÕES)"""
-
-    # Agrupa por partido
-    dados_agrupados = dados.groupby('SG_PARTIDO').agg({
-        'VR_LANCAMENTO_NUM': 'sum'
-    }).reset_index()
-    dados_agrupados.columns = ['SG_PARTIDO', 'GASTO_TOTAL']
-
-    # Calcula tarifas por partido
-    tarifas_partido = dados[dados['CATEGORIA_GASTO'] == 'TARIFAS BANCÁRIAS'].groupby('SG_PARTIDO')['VR_LANCAMENTO_NUM'].sum().reset_index()
-    tarifas_partido.columns = ['SG_PARTIDO', 'VALOR_TARIFAS']
-
-    # Merge
-    dados_agrupados = dados_agrupados.merge(tarifas_partido, on='SG_PARTIDO', how='left')
-    dados_agrupados['VALOR_TARIFAS'] = dados_agrupados['VALOR_TARIFAS'].fillna(0)
-
-    # Calcula percentual corretamente
-    dados_agrupados['PERC_TARIFAS'] = (dados_agrupados['VALOR_TARIFAS'] / dados_agrupados['GASTO_TOTAL']) * 100
-
-    # Filtra partidos com gastos significativos
-    dados_agrupados = dados_agrupados[dados_agrupados['GASTO_TOTAL'] > 10000]
-
-    # Converte para milhões
-    dados_agrupados['GASTO_TOTAL_M'] = dados_agrupados['GASTO_TOTAL'] / 1_000_000
-    dados_agrupados['VALOR_TARIFAS_M'] = dados_agrupados['VALOR_TARIFAS'] / 1_000_000
-
-    # Cria scatter plot
-    fig = px.scatter(
-        dados_agrupados,
-        x='GASTO_TOTAL_M',
-        y='PERC_TARIFAS',
-        size='PERC_TARIFAS',
-        color='PERC_TARIFAS',
-        hover_name='SG_PARTIDO',
-        hover_data={
-            'GASTO_TOTAL': ':.2f',
-            'VALOR_TARIFAS': ':.2f',
-            'PERC_TARIFAS': ':.2f',
-        },
-        color_continuous_scale=cores['gradiente_secundario'],
-        size_max=40
-    )
-
-    fig = configurar_layout(fig, 'EFICIÊNCIA: TARIFAS BANCÁRIAS vs GASTOS TOTAIS POR PARTIDO')
-
-    # ----------------------------- FAIXAS DE EFICIÊNCIA (fundo) -----------------------------
-    fig.add_hrect(y0=0, y1=1, fillcolor="green", opacity=0.07, layer="below", line_width=0)
-    fig.add_hrect(y0=1, y1=2, fillcolor="orange", opacity=0.07, layer="below", line_width=0)
-    fig.add_hrect(y0=2, y1=3, fillcolor="red", opacity=0.07, layer="below", line_width=0)
-
-    # ----------------------------- LINHAS DE REFERÊNCIA -----------------------------
-    fig.add_hline(y=1, line=dict(color='green', width=2, dash='dash'), name='1% (Excelente)')
-    fig.add_hline(y=2, line=dict(color='orange', width=2, dash='dash'), name='2% (Boa)')
-    fig.add_hline(y=3, line=dict(color='red', width=2, dash='dash'), name='3% (Alerta)')
-
-    # ----------------------------- AJUSTE DOS EIXOS -----------------------------
-    fig.update_xaxes(
-        title_text='GASTOS TOTAIS (Milhões de R$)',
-        type="log",
-        tickformat=",.1f",
-        showline=True,
-        linewidth=2,
-        linecolor="black",
-        tickfont=dict(color="black"),
-        title_font=dict(color="black")
-    )
-
-    fig.update_yaxes(
-        title_text='PERCENTUAL DE TARIFAS BANCÁRIAS (%)',
-        ticksuffix="%",
-        range=[0, dados_agrupados['PERC_TARIFAS'].max() * 1.25],  # Aumenta limite e evita ponto cortado
-        showline=True,
-        linewidth=2,
-        linecolor="black",
-        tickfont=dict(color="black"),
-        title_font=dict(color="black")
-    )
-    fig.update_coloraxes(
-        colorbar=dict(
-            title="% Tarifas",
-            tickfont=dict(color="black")
-        )
-    )
-    return fig
-
-
-@st.cache_data
-def criar_ranking_eficiencia(dados, cores):
-    """GRÁFICO 5: Ranking de eficiência - Menor % em tarifas bancárias"""
-    
-    # Calcula totais por partido
-    totais_partido = dados.groupby('SG_PARTIDO')['VR_LANCAMENTO_NUM'].sum().reset_index()
-    totais_partido.columns = ['SG_PARTIDO', 'TOTAL_GASTO']
-    
-    # Calcula tarifas por partido
-    tarifas_partido = dados[dados['CATEGORIA_GASTO'] == 'TARIFAS BANCÁRIAS'].groupby('SG_PARTIDO')['VR_LANCAMENTO_NUM'].sum().reset_index()
-    tarifas_partido.columns = ['SG_PARTIDO', 'TOTAL_TARIFAS']
-    
-    # Merge e cálculo de percentual
-    eficiencia = totais_partido.merge(tarifas_partido, on='SG_PARTIDO', how='left')
-    eficiencia['TOTAL_TARIFAS'] = eficiencia['TOTAL_TARIFAS'].fillna(0)
-    eficiencia['PERC_TARIFAS'] = (eficiencia['TOTAL_TARIFAS'] / eficiencia['TOTAL_GASTO']) * 100
-    
-    # Ordena por eficiência (menor percentual primeiro)
-    eficiencia = eficiencia.sort_values('PERC_TARIFAS', ascending=True)
-    
-    # Filtra partidos com gastos significativos (pelo menos R$ 50.000)
-    eficiencia = eficiencia[eficiencia['TOTAL_GASTO'] > 50000]
-    
-    # Seleciona top 15 mais eficientes
-    eficiencia = eficiencia.head(15)
-    
-    fig = px.bar(
-        eficiencia,
-        y='SG_PARTIDO',
-        x='PERC_TARIFAS',
-        orientation='h',
-        color='PERC_TARIFAS',
-        color_continuous_scale=['#00A86B', '#32CD32', '#90EE90'],  # Tons de verde para eficiência
-        hover_data={
-            'TOTAL_GASTO': ':.2f',
-            'TOTAL_TARIFAS': ':.2f',
-            'PERC_TARIFAS': ':.2f'
-        }
-    )
-    
-    fig = configurar_layout(fig, 'RANKING DE EFICIÊNCIA: MENOR % DE TARIFAS BANCÁRIAS')
-    
-    fig.update_layout(
-        yaxis=dict(
-            title_text='PARTIDO',
-            linecolor=TEMA_PLOTLY['font_color'],
-            gridcolor=TEMA_PLOTLY['font_color'],
-            tickcolor=TEMA_PLOTLY['font_color'],
-            tickfont=dict(color=TEMA_PLOTLY['font_color']),
-            title_font=dict(color=TEMA_PLOTLY['font_color']),
-            categoryorder='array',
-            categoryarray=eficiencia['SG_PARTIDO'].tolist()[::-1]
-        ),
-        xaxis=dict(
-            title_text='PERCENTUAL DE TARIFAS BANCÁRIAS (%)',
-            linecolor=TEMA_PLOTLY['font_color'],
-            gridcolor=TEMA_PLOTLY['font_color'],
-            tickcolor=TEMA_PLOTLY['font_color'],
-            tickfont=dict(color=TEMA_PLOTLY['font_color']),
-            title_font=dict(color=TEMA_PLOTLY['font_color'])
-        ),
-        coloraxis_colorbar=dict(
-            title="% Tarifas"
-        )
-    )
-    
-    fig.update_xaxes(ticksuffix="%")
-    
-    return fig
-@st.cache_data
-def criar_indice_diversificacao_fornecedores(dados, cores):
-    """GRÁFICO 6: Índice de diversificação de fornecedores por partido"""
-    
-    # Calcula métricas por partido
-    diversificacao = dados.groupby('SG_PARTIDO').agg({
-        'NM_CONTRAPARTE': 'nunique',  # Número único de fornecedores
-        'VR_LANCAMENTO_NUM': 'sum',   # Total gasto
-        'DT_LANCAMENTO': 'count'      # Número de transações
-    }).reset_index()
-    
-    diversificacao.columns = ['SG_PARTIDO', 'QTD_FORNECEDORES', 'TOTAL_GASTO', 'QTD_TRANSACOES']
-    
-    # Calcula o índice de diversificação (fornecedores por milhão de reais)
-    diversificacao['INDICE_DIVERSIFICACAO'] = (diversificacao['QTD_FORNECEDORES'] / diversificacao['TOTAL_GASTO']) * 1_000_000
-    
-    # Filtra partidos com gastos significativos (pelo menos R$ 100.000)
-    diversificacao = diversificacao[diversificacao['TOTAL_GASTO'] > 100000]
-    
-    # Ordena por índice de diversificação (maior = mais diversificado)
-    diversificacao = diversificacao.sort_values('INDICE_DIVERSIFICACAO', ascending=False)
-    
-    # Seleciona top 15 partidos mais diversificados
-    diversificacao = diversificacao.head(15)
-    
-    fig = px.bar(
-        diversificacao,
-        y='SG_PARTIDO',
-        x='INDICE_DIVERSIFICACAO',
-        orientation='h',
-        color='INDICE_DIVERSIFICACAO',
-        color_continuous_scale=cores['gradiente_principal'],
-        hover_data={
-            'QTD_FORNECEDORES': True,
-            'TOTAL_GASTO': ':.2f',
-            'QTD_TRANSACOES': True,
-            'INDICE_DIVERSIFICACAO': ':.2f'
-        }
-    )
-    
-    fig = configurar_layout(fig, 'DIVERSIFICAÇÃO: ÍNDICE DE FORNECEDORES POR PARTIDO')
-    
-    fig.update_layout(
-        yaxis=dict(
-            title_text='PARTIDO',
-            linecolor=TEMA_PLOTLY['font_color'],
-            gridcolor=TEMA_PLOTLY['font_color'],
-            tickcolor=TEMA_PLOTLY['font_color'],
-            tickfont=dict(color=TEMA_PLOTLY['font_color']),
-            title_font=dict(color=TEMA_PLOTLY['font_color']),
-            categoryorder='total ascending'
-        ),
-        xaxis=dict(
-            title_text='ÍNDICE DE DIVERSIFICAÇÃO (Fornecedores por Milhão de R$)',
-            linecolor=TEMA_PLOTLY['font_color'],
-            gridcolor=TEMA_PLOTLY['font_color'],
-            tickcolor=TEMA_PLOTLY['font_color'],
-            tickfont=dict(color=TEMA_PLOTLY['font_color']),
-            title_font=dict(color=TEMA_PLOTLY['font_color'])
-        ),
-        coloraxis_colorbar=dict(
-            title="Índice"
-        )
-    )
-    
-    return fig
-
-# =============================================
-# LAYOUT PRINCIPAL
-# =============================================
-
-def main():
-    global CORES 
-    CORES = configurar_estilo_azul_profissional()
-    
-    TEMA_PLOTLY.update({
-        'title_color': CORES['azul_escuro'],
-        'font_color': CORES['azul_muito_escuro'],
-        'plot_bg': CORES['branco'],
-        'paper_bg': CORES['branco']
-    })
-    
-    # Carrega dados dentro do main (garante que 'dados' exista antes de usar)
-    dados = carregar_dados()
-    if dados is None:
-        return
-
-    
-# REMOVE TODOS OS "NÃO INFORMADO" DO DATAFRAME
-    dados = dados[
-        ~dados['NM_ESFERA'].str.contains("NÃO INFORMADO", case=False, na=False) &
-        ~dados['CATEGORIA_GASTO'].str.contains("NÃO INFORMADO", case=False, na=False) &
-        ~dados['SG_PARTIDO'].str.contains("NÃO INFORMADO", case=False, na=False)
-    ]
-    
-    if dados is None:
-        return
-    # Sidebar
-    with st.sidebar:
-        st.markdown("### CONTROLES DE ANÁLISE")
-        
-        # ---- Filtro Esferas ----
-        lista_esferas = sorted(dados['NM_ESFERA'].unique())
-        opcoes_esferas = ["Todas as esferas"] + lista_esferas
-
-        esferas_sel = st.multiselect("Selecione as Esferas:", opcoes_esferas, default=["Todas as esferas"])
-        esferas = lista_esferas if "Todas as esferas" in esferas_sel else esferas_sel
-        
-        # ---- Filtro Categorias ----
-        lista_categorias = sorted(dados['CATEGORIA_GASTO'].unique())
-        opcoes_categorias = ["Todas as categorias"] + lista_categorias
-
-        categorias_sel = st.multiselect("Selecione as Categorias:", opcoes_categorias, default=["Todas as categorias"])
-        categorias = lista_categorias if "Todas as categorias" in categorias_sel else categorias_sel
-
-        # ---- Filtro Partidos ----
-        lista_partidos = sorted(dados['SG_PARTIDO'].unique())
-        opcoes_partidos = ["Todos os partidos"] + lista_partidos
-
-        partidos_sel = st.multiselect("Selecione os Partidos:", opcoes_partidos, default=["Todos os partidos"])
-        partidos = lista_partidos if "Todos os partidos" in partidos_sel else partidos_sel
-
-        st.markdown("---")
-        st.markdown("### RESUMO GERAL")
-        col1, col2 = st.columns(2)
-        with col1:
-            st.metric("Valor Total", f"R$ {dados['VR_LANCAMENTO_NUM'].sum():,.2f}")
-            st.metric("Partidos", dados['SG_PARTIDO'].nunique())
-        with col2:
-            st.metric("Transações", f"{len(dados):,}")
-            st.metric("Fornecedores", dados['NM_CONTRAPARTE'].nunique())
-
-
-        # Filtragem de dados
-        dados_filt = dados.copy()
-        dados_filt = dados_filt[dados_filt['NM_ESFERA'].isin(esferas)]
-        dados_filt = dados_filt[dados_filt['CATEGORIA_GASTO'].isin(categorias)]
-        dados_filt = dados_filt[dados_filt['SG_PARTIDO'].isin(partidos)]
-            
-
-    # Conteúdo principal
-    st.title("ANÁLISE FINANCEIRA DE PARTIDOS POLÍTICOS")
-    st.markdown("Dashboard de Transparência - Dados TSE 2020")
-    
-    st.markdown("### VISÃO GERAL FILTRADA")
-    st.metric(
-        "VALOR TOTAL ANALISADO", 
-        f"R$ {dados_filt['VR_LANCAMENTO_NUM'].sum():,.2f}",
-        delta=f"{len(dados_filt):,} transações"
-    )
-
-    # =============================================
-    # SEÇÃO P1 - COMPARAÇÃO ENTRE ESFERAS
-    # =============================================
-    
-    st.markdown("---")
+def secao_p1(figuras):
+    """P1: comparação dos gastos entre esferas (gráficos 1 a 3)"""
     st.markdown("### P1: Como os padrões de gastos diferem entre as esferas partidárias?")
     
     st.markdown("""
@@ -735,7 +551,7 @@ def main():
     col1, col2 = st.columns([3, 1])
     
     with col1:
-        st.plotly_chart(criar_grafico_barras_agrupadas_esferas(dados_filt, CORES), use_container_width=True)
+        exibir_grafico(figuras, criar_grafico_barras_agrupadas_esferas)
     
     with col2:
         st.markdown("**Insights:**")
@@ -755,7 +571,7 @@ def main():
     col1, col2 = st.columns([3, 1])
 
     with col1:
-        st.plotly_chart(criar_grafico_treemap_esferas(dados_filt, CORES), use_container_width=True)
+        exibir_grafico(figuras, criar_grafico_treemap_esferas)
 
     with col2:
         st.markdown("**Insights:**")
@@ -777,7 +593,7 @@ def main():
     col1, col2 = st.columns([3, 1])
     
     with col1:
-        st.plotly_chart(criar_grafico_comparacao_percentual(dados_filt, CORES), use_container_width=True)
+        exibir_grafico(figuras, criar_grafico_comparacao_percentual)
     
     with col2:
         st.markdown("**Insights:**")
@@ -792,11 +608,21 @@ def main():
     "Cada barra representa 100% dos gastos da esfera, segmentada por categoria (cores)." \
     "Os tons de azul indicam o peso relativo de cada despesa, permitindo comparar estruturas de gasto e prioridades financeiras entre as esferas Distrital, Estadual, Municipal e Nacional.")
 
-    # =============================================
-    # SEÇÃO P2 - EFICIÊNCIA NA GESTÃO
-    # =============================================
-    
-    st.markdown("---")
+    # GRÁFICO 7
+    st.markdown("#### Evolução Mensal: GASTOS POR ESFERA AO LONGO DO PERÍODO")
+
+    exibir_grafico(figuras, criar_grafico_evolucao_mensal)
+
+    st.markdown("***Gráfico 7: Evolução Mensal dos Gastos por Esfera***")
+    st.markdown("Soma mensal dos gastos de cada esfera dentro dos filtros e do período selecionados no sidebar, " \
+    "destacando os meses de campanha em que os desembolsos se concentram.")
+
+# =============================================
+# SEÇÃO P2 - EFICIÊNCIA NA GESTÃO
+# =============================================
+
+def secao_p2(figuras):
+    """P2: eficiência na gestão, tarifas bancárias (gráficos 4 e 5)"""
     st.markdown("### P2: Quais partidos são mais eficientes na gestão (menos tarifas bancárias, mais gastos diretos)?")
     
     st.markdown("""
@@ -810,7 +636,7 @@ def main():
     col1, col2 = st.columns([3, 1])
     
     with col1:
-        st.plotly_chart(criar_scatter_tarifas_vs_gastos(dados_filt, CORES), use_container_width=True)
+        exibir_grafico(figuras, criar_scatter_tarifas_vs_gastos)
     
     with col2:
         # No lugar dos insights atuais, use:
@@ -843,7 +669,7 @@ def main():
     col1, col2 = st.columns([3, 1])
     
     with col1:
-        st.plotly_chart(criar_ranking_eficiencia(dados_filt, CORES), use_container_width=True)
+        exibir_grafico(figuras, criar_ranking_eficiencia)
     
     with col2:
         # No lugar dos insights atuais do ranking, use:
@@ -864,11 +690,12 @@ def main():
     - **Filtro aplicado** = apenas partidos com gastos superiores a R$ 50.000
     """)
 
-    # =============================================
-    # SEÇÃO P3 - DIVERSIFICAÇÃO DE FORNECEDORES
-    # =============================================
+# =============================================
+# SEÇÃO P3 - DIVERSIFICAÇÃO DE FORNECEDORES
+# =============================================
 
-    st.markdown("---")
+def secao_p3(figuras):
+    """P3: diversificação de fornecedores (gráfico 6)"""
     st.markdown("### P3: Como a concentração de gastos por fornecedor varia entre os partidos (análise de diversificação)?")
 
     st.markdown("""
@@ -882,7 +709,7 @@ def main():
     col1, col2 = st.columns([3, 1])
 
     with col1:
-        st.plotly_chart(criar_indice_diversificacao_fornecedores(dados_filt, CORES), use_container_width=True)
+        exibir_grafico(figuras, criar_indice_diversificacao_fornecedores)
 
     with col2:
         st.markdown("**Insights:**")
@@ -900,6 +727,334 @@ def main():
     - **Cores** = Intensidade do índice de diversificação
     """)
 
+# Seções da análise e os gráficos de cada uma (a origem dos dados de cada
+# gráfico está em graficos.FONTES_GRAFICOS)
+SECOES = {
+    "P1: Esferas": (secao_p1, [
+        criar_grafico_barras_agrupadas_esferas,
+        criar_grafico_treemap_esferas,
+        criar_grafico_comparacao_percentual,
+        criar_grafico_evolucao_mensal,
+    ]),
+    "P2: Eficiência": (secao_p2, [
+        criar_scatter_tarifas_vs_gastos,
+        criar_ranking_eficiencia,
+    ]),
+    "P3: Fornecedores": (secao_p3, [
+        criar_indice_diversificacao_fornecedores,
+    ]),
+}
+TODAS_AS_SECOES = "Todas"
+
+@st.fragment
+def exibir_secoes(fontes, chave, instantaneo=None):
+    """
+    Mostra apenas a seção escolhida: só as figuras dela são construídas, e
+    trocar de seção reexecuta este fragmento, não a página inteira. Todas as
+    figuras visíveis são construídas em paralelo antes de a página ser
+    montada, na ordem das seções, a partir das `fontes` de dados de cada
+    tipo de gráfico. Com o `instantaneo` da visão padrão, as figuras vêm
+    prontas dele.
+    """
+    st.markdown("---")
+    escolha = st.segmented_control(
+        "Seção da análise",
+        list(SECOES) + [TODAS_AS_SECOES],
+        default=next(iter(SECOES)),
+        key='secao_analise'
+    ) or next(iter(SECOES))
+
+    st.session_state['tamanhos_graficos'] = {}
+    visiveis = list(SECOES) if escolha == TODAS_AS_SECOES else [escolha]
+    construtores = [construtor for nome in visiveis for construtor in SECOES[nome][1]]
+    if instantaneo is not None:
+        figuras = {construtor: instantaneo['figuras'][construtor.__name__] for construtor in construtores}
+        st.session_state['tamanhos_graficos'] = {
+            construtor.__name__: instantaneo['tamanhos'][construtor.__name__] for construtor in construtores
+        }
+    else:
+        figuras = construir_graficos(
+            {construtor: fontes[FONTES_GRAFICOS[construtor]] for construtor in construtores}, chave
+        )
+
+    for indice, nome in enumerate(visiveis):
+        if indice:
+            st.markdown("---")
+        SECOES[nome][0](figuras)
+
+    # Payload das figuras enviadas ao navegador nesta visualização
+    tamanhos = st.session_state['tamanhos_graficos']
+    total_payload = sum(tamanhos.values())
+    st.caption(f"Payload dos gráficos: {total_payload / 1024:,.0f} KB de {ORCAMENTO_PAGINA / 1024:,.0f} KB")
+    if total_payload > ORCAMENTO_PAGINA:
+        st.warning("Os gráficos desta página excedem o orçamento de payload: "
+                   + ", ".join(f"{nome}: {tamanho / 1024:,.0f} KB" for nome, tamanho in tamanhos.items()))
+
+# Colunas da grade de transações e seus rótulos
+COLUNAS_GRADE = {
+    'DT_LANCAMENTO': "Data",
+    'NM_ESFERA': "Esfera",
+    'CATEGORIA_GASTO': "Categoria",
+    'SG_PARTIDO': "Partido",
+    'NM_CONTRAPARTE': "Fornecedor",
+    'VR_LANCAMENTO_NUM': "Valor (R$)",
+}
+OPCOES_LINHAS_POR_PAGINA = [25, LINHAS_POR_PAGINA, 100, 250]
+
+@st.fragment
+def exibir_transacoes(selecao, obter_consultas):
+    """
+    Grade das transações por trás dos gráficos, paginada no servidor: o
+    motor de consultas ordena a seleção e devolve só a página visível, com
+    as colunas escolhidas, e apenas ela é enviada ao navegador. Detalhar
+    por esfera, categoria ou partido, ordenar ou paginar reexecuta só este
+    fragmento. A seleção detalhada, até LIMITE_EXPORTACAO linhas, pode ser
+    exportada inteira.
+    """
+    st.markdown("---")
+    st.markdown("### TRANSAÇÕES DA SELEÇÃO")
+    if not st.toggle("Detalhar transações", key='detalhar_transacoes'):
+        return
+    consultas = obter_consultas()
+
+    # ---- Detalhamento dentro da seleção do sidebar ----
+    detalhe = dict(selecao)
+    colunas_detalhe = st.columns(3)
+    for coluna, (dimensao, todos) in zip(colunas_detalhe, [
+        ('NM_ESFERA', "Todas as esferas"),
+        ('CATEGORIA_GASTO', "Todas as categorias"),
+        ('SG_PARTIDO', "Todos os partidos"),
+    ]):
+        escolha = coluna.selectbox(COLUNAS_GRADE[dimensao], [todos] + list(selecao[dimensao]),
+                                   key=f"detalhe_{dimensao}")
+        if escolha != todos:
+            detalhe[dimensao] = [escolha]
+
+    # ---- Ordenação, projeção e tamanho da página ----
+    col1, col2, col3 = st.columns([2, 1, 1])
+    ordem = col1.selectbox("Ordenar por", list(COLUNAS_GRADE), format_func=COLUNAS_GRADE.get,
+                           key='ordem_transacoes')
+    decrescente = col2.toggle("Decrescente", key='ordem_decrescente')
+    linhas = col3.selectbox("Linhas por página", OPCOES_LINHAS_POR_PAGINA,
+                            index=OPCOES_LINHAS_POR_PAGINA.index(LINHAS_POR_PAGINA), key='linhas_pagina')
+    colunas = st.multiselect("Colunas", list(COLUNAS_GRADE), default=list(COLUNAS_GRADE),
+                             format_func=COLUNAS_GRADE.get, key='colunas_transacoes') or list(COLUNAS_GRADE)
+
+    # Outro detalhamento ou outra ordem voltam à primeira página; uma página
+    # além do fim (a seleção encolheu) passa a ser a última
+    consulta = (chave_metricas(detalhe), ordem, decrescente, linhas)
+    if st.session_state.get('consulta_transacoes') != consulta:
+        st.session_state['consulta_transacoes'] = consulta
+        st.session_state['pagina_transacoes'] = 1
+    pagina = st.session_state.setdefault('pagina_transacoes', 1)
+    with obter_rastreador().trecho('pagina_transacoes', ordem=ordem) as atributos:
+        tabela, total = consultas.pagina(detalhe, colunas, ordem, decrescente, (pagina - 1) * linhas, linhas)
+        paginas = max(1, -(-total // linhas))
+        if pagina > paginas:
+            pagina = st.session_state['pagina_transacoes'] = paginas
+            tabela, total = consultas.pagina(detalhe, colunas, ordem, decrescente, (pagina - 1) * linhas, linhas)
+        atributos['linhas_entrada'] = total
+        atributos['linhas_saida'] = len(tabela)
+
+    st.dataframe(
+        tabela.rename(columns=COLUNAS_GRADE), hide_index=True, use_container_width=True,
+        column_config={
+            COLUNAS_GRADE['DT_LANCAMENTO']: st.column_config.DatetimeColumn(format="DD/MM/YYYY"),
+            COLUNAS_GRADE['VR_LANCAMENTO_NUM']: st.column_config.NumberColumn(format="%.2f"),
+        }
+    )
+    col1, col2 = st.columns([1, 3])
+    col1.number_input("Página", min_value=1, max_value=paginas, key='pagina_transacoes')
+    inicio = (pagina - 1) * linhas
+    col2.caption(f"Linhas {min(inicio + 1, total):,} a {inicio + len(tabela):,} de {total:,} "
+                 f"(página {pagina:,} de {paginas:,})")
+
+    # ---- Exportação da seleção detalhada, com as colunas escolhidas ----
+    # Em dois passos: o arquivo só é gerado ao clicar em "Exportar" e fica na
+    # sessão até ser baixado ou até a exportação pedida mudar
+    col1, col2, col3 = st.columns([1, 1, 2])
+    formato = col1.radio("Formato", list(FORMATOS_EXPORTACAO), format_func=str.upper,
+                         horizontal=True, key='formato_exportacao')
+    comprimir = col2.toggle("Compactar (gzip)", key='exportacao_gzip')
+    nome, tipo = nome_exportacao(formato, comprimir)
+    pedido = (chave_metricas(detalhe), tuple(colunas), formato, comprimir)
+    pronta = st.session_state.get('exportacao')
+    if pronta is not None and pronta['pedido'] != pedido:
+        pronta = st.session_state['exportacao'] = None
+
+    botao = col3.empty()
+    if total > LIMITE_EXPORTACAO:
+        botao.button(f"Exportar {total:,} transações", disabled=True, key='exportar_transacoes')
+    elif pronta is None and botao.button(f"Exportar {total:,} transações", key='exportar_transacoes'):
+        with st.spinner("Gerando a exportação..."):
+            dados = gerar_exportacao(consultas, detalhe, colunas, formato, comprimir)
+        pronta = st.session_state['exportacao'] = {'pedido': pedido, 'dados': dados}
+    if pronta is not None and total <= LIMITE_EXPORTACAO:
+        botao.download_button(f"Baixar {nome}", data=pronta['dados'], file_name=nome, mime=tipo,
+                              on_click=lambda: st.session_state.pop('exportacao', None))
+    st.caption(
+        f"A exportação pelo navegador é limitada a {LIMITE_EXPORTACAO:,} transações "
+        "(DASHBOARD_EXPORTACAO_MAX_LINHAS). Para seleções maiores, use "
+        "`python exportacao.py destino.csv --partidos ...`, que grava em disco sem limite."
+    )
+
+# =============================================
+# LAYOUT PRINCIPAL
+# =============================================
+
+def main():
+    global CORES 
+    CORES = configurar_estilo_azul_profissional()
+    rastreador = obter_rastreador()
+    rastreador.iniciar_execucao()
+    
+    TEMA_PLOTLY.update({
+        'title_color': CORES['azul_escuro'],
+        'font_color': CORES['azul_muito_escuro'],
+        'plot_bg': CORES['branco'],
+        'paper_bg': CORES['branco']
+    })
+    
+    # Enquanto a base não chega, o download segue em segundo plano
+    disponivel = dataset_disponivel()
+    if not disponivel:
+        download = obter_download()
+        download.iniciar()
+        acompanhar_download(download)
+
+    # Anos escolhidos no catálogo: só as partições deles são lidas
+    catalogo = obter_catalogo(disponivel)
+    with st.sidebar:
+        st.markdown("### CONTROLES DE ANÁLISE")
+        if MOTOR != MOTOR_CONFIGURADO:
+            st.warning("Motor DuckDB desligado: o pacote 'duckdb' não está instalado "
+                       "(pip install duckdb). Usando o motor pandas.")
+        anos = selecionar_anos(catalogo)
+    rotulo_anos = ", ".join(anos) if anos else "2020"
+
+    # A visão padrão sai do instantâneo gerado na ingestão, quando ele está em
+    # dia; a base (já sem os "NÃO INFORMADO") só é carregada se for necessária
+    instantaneo = obter_instantaneo(disponivel, anos, catalogo)
+    base = None
+    if instantaneo is None:
+        base = obter_base(disponivel, anos, catalogo)
+        if base['cubo'] is None:
+            return
+        opcoes = {dimensao: sorted(base['cubo'][dimensao].dropna().unique()) for dimensao in DIMENSOES_CUBO}
+        dias = base['cubo_diario']['DIA']
+        limites = (dias.min(), dias.max())
+    else:
+        opcoes = instantaneo['opcoes']
+        limites = tuple(instantaneo['periodo'])
+    # Sidebar
+    with st.sidebar:
+        # ---- Filtro Esferas ----
+        lista_esferas = opcoes['NM_ESFERA']
+        opcoes_esferas = ["Todas as esferas"] + lista_esferas
+
+        esferas_sel = st.multiselect("Selecione as Esferas:", opcoes_esferas, default=["Todas as esferas"])
+        esferas = lista_esferas if "Todas as esferas" in esferas_sel else esferas_sel
+        
+        # ---- Filtro Categorias ----
+        lista_categorias = opcoes['CATEGORIA_GASTO']
+        opcoes_categorias = ["Todas as categorias"] + lista_categorias
+
+        categorias_sel = st.multiselect("Selecione as Categorias:", opcoes_categorias, default=["Todas as categorias"])
+        categorias = lista_categorias if "Todas as categorias" in categorias_sel else categorias_sel
+
+        # ---- Filtro Partidos ----
+        lista_partidos = opcoes['SG_PARTIDO']
+        opcoes_partidos = ["Todos os partidos"] + lista_partidos
+
+        partidos_sel = st.multiselect("Selecione os Partidos:", opcoes_partidos, default=["Todos os partidos"])
+        partidos = lista_partidos if "Todos os partidos" in partidos_sel else partidos_sel
+
+        # ---- Filtro Período ----
+        # O intervalo completo não restringe nada (inclui transações sem data)
+        periodo = None
+        if pd.notna(limites[0]) and limites[0] < limites[1]:
+            intervalo = (limites[0].date(), limites[1].date())
+            periodo_sel = st.slider("Período:", min_value=intervalo[0], max_value=intervalo[1],
+                                    value=intervalo, format="DD/MM/YYYY")
+            if tuple(periodo_sel) != intervalo:
+                periodo = (pd.Timestamp(periodo_sel[0]), pd.Timestamp(periodo_sel[1]))
+
+        st.markdown("---")
+        st.markdown("### RESUMO GERAL")
+        resumo = instantaneo['resumo'] if instantaneo is not None else base['consultas'].resumo()
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric("Valor Total", f"R$ {resumo['valor_total']:,.2f}")
+            st.metric("Partidos", resumo['partidos'])
+        with col2:
+            st.metric("Transações", f"{resumo['transacoes']:,}")
+            st.metric("Fornecedores", formatar_fornecedores(resumo['fornecedores']),
+                      help=ajuda_fornecedores())
+
+
+        # Seleção aplicada pelo motor de consultas (índice bitmap no pandas, WHERE no DuckDB)
+        selecao = {
+            'NM_ESFERA': esferas,
+            'CATEGORIA_GASTO': categorias,
+            'SG_PARTIDO': partidos
+        }
+        if periodo is not None:
+            selecao[COLUNA_DATA] = periodo
+
+    # Fora da visão padrão, as figuras dependem da base
+    padrao = (esferas == lista_esferas and categorias == lista_categorias and partidos == lista_partidos
+              and periodo is None)
+    if instantaneo is not None and not padrao:
+        instantaneo = None
+        base = obter_base(disponivel, anos, catalogo)
+
+    fontes = consultas = chave = None
+    if instantaneo is None:
+        consultas = base['consultas']
+        # Com período, o cubo sai da fatia do cubo diário localizada por busca binária
+        if periodo is None:
+            cubo, mensal = base['cubo'], base['cubo_mensal']
+        else:
+            cubo = cubo_no_periodo(base['cubo_diario'], *periodo)
+            mensal = lambda: agregar_mensal(fatiar_cubo_diario(base['cubo_diario'], *periodo))
+        with rastreador.trecho('filtro', linhas_entrada=len(cubo)) as atributos:
+            cubo_filt = filtrar_cubo(cubo, esferas, categorias, partidos)
+            chave = chave_selecao(base['versao'], esferas, categorias, partidos, periodo)
+            if consultas.aproximado and periodo is None:
+                # Figuras com contagens estimadas não se misturam às exatas no cache
+                chave += (f"hll-{consultas.sketches.precisao}",)
+            atributos['linhas_saida'] = len(cubo_filt)
+        fontes = {
+            'cubo': cubo_filt,
+            'metricas': lambda: consultas.metricas_partido(selecao),
+            'mensal': lambda: filtrar_cubo(mensal() if callable(mensal) else mensal,
+                                           esferas, categorias, partidos),
+        }
+
+    # Conteúdo principal
+    st.title("ANÁLISE FINANCEIRA DE PARTIDOS POLÍTICOS")
+    st.markdown(f"Dashboard de Transparência - Dados TSE {rotulo_anos}")
+    
+    st.markdown("### VISÃO GERAL FILTRADA")
+    with rastreador.trecho('resumo', instantaneo=instantaneo is not None) as atributos:
+        resumo_filt = instantaneo['resumo'] if instantaneo is not None else consultas.resumo(selecao)
+        atributos['linhas_saida'] = resumo_filt['transacoes']
+    st.metric(
+        "VALOR TOTAL ANALISADO", 
+        f"R$ {resumo_filt['valor_total']:,.2f}",
+        delta=f"{resumo_filt['transacoes']:,} transações"
+    )
+
+    # =============================================
+    # SEÇÕES P1, P2 e P3 (SOB DEMANDA)
+    # =============================================
+
+    exibir_secoes(fontes, chave, instantaneo)
+
+    # A grade precisa da base: na visão do instantâneo, ela só é carregada
+    # quando as transações são detalhadas
+    exibir_transacoes(selecao, lambda: obter_base(disponivel, anos, catalogo)['consultas'])
+
     # =============================================
     # INFORMAÇÕES TÉCNICAS - P1, P2 & P3
     # =============================================
@@ -918,30 +1073,32 @@ def main():
 
     with col2:
         st.markdown("**GRÁFICOS UTILIZADOS:**")
-        st.markdown("- P1: Barras Agrupadas, Treemap, Composição")
+        st.markdown("- P1: Barras Agrupadas, Treemap, Composição, Evolução Mensal")
         st.markdown("- P2: Scatter Plot, Ranking Horizontal") 
         st.markdown("- P3: Índice de Diversificação")
 
     with col3:
         st.markdown("**DADOS DA ANÁLISE:**")
-        if not dados_filt.empty and pd.notna(dados_filt['DT_LANCAMENTO']).any():
-            st.markdown(f"- Período: {dados_filt['DT_LANCAMENTO'].min().strftime('%d/%m/%Y')} a {dados_filt['DT_LANCAMENTO'].max().strftime('%d/%m/%Y')}")
+        if pd.notna(resumo_filt['inicio']):
+            st.markdown(f"- Período: {resumo_filt['inicio'].strftime('%d/%m/%Y')} a {resumo_filt['fim'].strftime('%d/%m/%Y')}")
         else:
             st.markdown("- Período: N/A")
             
-        st.markdown(f"- Transações: {len(dados_filt):,}")
-        st.markdown(f"- Partidos analisados: {dados_filt['SG_PARTIDO'].nunique()}")
-        st.markdown(f"- Fornecedores únicos: {dados_filt['NM_CONTRAPARTE'].nunique()}")
+        st.markdown(f"- Transações: {resumo_filt['transacoes']:,}")
+        st.markdown(f"- Partidos analisados: {resumo_filt['partidos']}")
+        st.markdown(f"- Fornecedores únicos: {formatar_fornecedores(resumo_filt['fornecedores'])}")
 
     # Rodapé
     st.markdown("---")
     st.markdown(
         "<div style='text-align: center; color: #393E46;'>"
-        "Fonte: TSE — Dados Abertos 2020"
+        f"Fonte: TSE — Dados Abertos {rotulo_anos}"
         #f"Gerado em: {pd.Timestamp.now().strftime('%d/%m/%Y às %H:%M')}"
         "</div>", 
         unsafe_allow_html=True
     )
 
+    exibir_painel_desempenho(rastreador)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
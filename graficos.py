@@ -0,0 +1,549 @@
+import os
+
+import plotly.express as px
+
+from cubo import agrupar_cauda
+from orcamento_figuras import ORCAMENTO_FIGURA_PADRAO, construir_no_orcamento
+
+# =============================================
+# GRÁFICOS DO DASHBOARD
+# =============================================
+# Os construtores ficam fora de final.py para que possam ser enviados a
+# processos de trabalho: recebem apenas (dados, cores) e devolvem a figura.
+
+# Orçamento de payload (JSON enviado ao navegador) por figura
+ORCAMENTO_FIGURA = int(os.environ.get('DASHBOARD_ORCAMENTO_FIGURA_KB', ORCAMENTO_FIGURA_PADRAO // 1024)) * 1024
+
+# Folhas do treemap (partidos por esfera, categorias por partido), do mais
+# detalhado ao mais enxuto; o excedente de cada nível vira "Outros"
+LIMITES_TREEMAP = [
+    {'max_partidos': 3, 'max_categorias': 7},
+    {'max_partidos': 3, 'max_categorias': 4},
+    {'max_partidos': 2, 'max_categorias': 3},
+    {'max_partidos': 1, 'max_categorias': 2},
+]
+
+# =============================================
+# PALETA CORPORATIVA
+# =============================================
+
+CORES = {
+    'azul_escuro': '#0F4C75',
+    'azul_medio': '#3282B8',
+    'azul_claro': '#BBE1FA',
+    'azul_muito_escuro': '#1B262C',
+    'cinza_escuro': '#393E46',
+    'cinza_medio': '#686D76',
+    'cinza_claro': '#EEEEEE',
+    'branco': '#FFFFFF',
+    'amarelo_mostarda': "#FFC400",
+    'laranja': "#FF9900",
+    'gradiente_principal': ['#0F4C75', '#2E72A2', '#5D99C6', '#89CFF0', '#BBE1FA', '#FF9900', '#FFC400'],
+    'gradiente_secundario': ['#1B262C', '#0F4C75', '#3282B8'],
+    'mapa_cores_esferas': {
+        'NACIONAL': '#0F4C75', # Azul Escuro
+        'ESTADUAL': '#FF9900', # Laranja para contraste
+        'MUNICIPAL': '#5D99C6', # Azul Médio-claro
+        'DISTRITAL': '#3282B8', # Outro tom de azul
+        'NAO INFORMADO': '#393E46' # Cinza Escuro
+    }
+}
+
+# =============================================
+# CONFIGURAÇÃO DO TEMA PLOTLY
+# =============================================
+
+TEMA_PLOTLY = {
+    'title_color': CORES['azul_escuro'],
+    'font_color': CORES['azul_muito_escuro'], 
+    'height': 500,
+    'plot_bg': CORES['branco'],
+    'paper_bg': CORES['branco']
+}
+
+def configurar_layout(fig, titulo):
+    """
+    Aplica um layout padrão (tema e centralização de título) à figura do Plotly.
+    """
+    titulo_cor = TEMA_PLOTLY.get('title_color', '#0F4C75')
+    fonte_cor = TEMA_PLOTLY.get('font_color', 'black')
+    paper_cor = TEMA_PLOTLY.get('paper_bg', 'white')
+    plot_cor = TEMA_PLOTLY.get('plot_bg', 'white')
+
+    fig.update_layout(
+        title={
+            'text': titulo,
+            'y': 0.95, 
+            'x': 0.5, 
+            'xanchor': 'center',
+            'yanchor': 'top',
+            'font': dict(
+                size=20,
+                color=titulo_cor
+            )
+        },
+        paper_bgcolor=paper_cor,
+        plot_bgcolor=plot_cor,
+        font=dict(
+            color=fonte_cor
+        ),
+        height=TEMA_PLOTLY.get('height', 500),
+        margin=dict(t=80, b=50, l=50, r=50) 
+    )
+
+    return fig
+
+def descategorizar(dados):
+    """Converte as colunas categóricas em texto antes de enviar ao Plotly Express."""
+    colunas = dados.select_dtypes('category').columns
+    return dados.astype({col: object for col in colunas})
+
+# =============================================
+# FUNÇÕES ESPECÍFICAS PARA P1
+# =============================================
+
+def criar_grafico_barras_agrupadas_esferas(dados, cores):
+    """GRÁFICO 1: Barras agrupadas - Gastos por categoria × esfera"""
+    
+    esfera_categoria = dados.groupby(['NM_ESFERA', 'CATEGORIA_GASTO'], observed=True)['VR_LANCAMENTO_NUM'].sum().reset_index()
+    
+    top_categorias = dados.groupby('CATEGORIA_GASTO', observed=True)['VR_LANCAMENTO_NUM'].sum().nlargest(6).index
+    dados_filtrados = esfera_categoria[esfera_categoria['CATEGORIA_GASTO'].isin(top_categorias)]
+    
+    fig = px.bar(
+        descategorizar(dados_filtrados),
+        x='CATEGORIA_GASTO',
+        y='VR_LANCAMENTO_NUM',
+        color='NM_ESFERA',
+        barmode='group',
+        color_discrete_sequence=cores['gradiente_principal']
+    )
+    
+    fig = configurar_layout(fig, 'COMPARAÇÃO DE GASTOS POR CATEGORIA ENTRE ESFERAS')
+    
+    fig.update_layout(
+        xaxis=dict(
+            title_text='CATEGORIA DE GASTO',
+            linecolor=TEMA_PLOTLY['font_color'],
+            gridcolor=TEMA_PLOTLY['font_color'],
+            tickcolor=TEMA_PLOTLY['font_color'],
+            tickfont=dict(color=TEMA_PLOTLY['font_color']),
+            title_font=dict(color=TEMA_PLOTLY['font_color'])
+        ),
+        yaxis=dict(
+            title_text='VALOR TOTAL (R$)',
+            linecolor=TEMA_PLOTLY['font_color'],
+            gridcolor=TEMA_PLOTLY['font_color'],
+            tickcolor=TEMA_PLOTLY['font_color'],
+            tickfont=dict(color=TEMA_PLOTLY['font_color']),
+            title_font=dict(color=TEMA_PLOTLY['font_color'])
+        ),
+        legend=dict(
+            font=dict(color=TEMA_PLOTLY['font_color']),
+            title_text='Esfera',
+            title=dict(
+                font=dict(
+                    color=TEMA_PLOTLY['font_color'],
+                    weight='bold'   
+                )
+            )
+        )
+    )
+    
+    fig.update_xaxes(tickangle=45)
+    fig.update_yaxes(tickformat=",.0f")
+    
+    return fig
+
+def criar_grafico_treemap_esferas(dados, cores):
+    """
+    GRÁFICO 2: Treemap hierárquico - Esfera → Partido → Categoria.
+    As folhas de cada nível são limitadas (o excedente vira "Outros") até
+    que a figura caiba no orçamento de payload.
+    """
+    hierarquia = dados.groupby(['NM_ESFERA', 'SG_PARTIDO', 'CATEGORIA_GASTO'], observed=True)['VR_LANCAMENTO_NUM'].sum().reset_index()
+
+    return construir_no_orcamento(
+        lambda max_partidos, max_categorias: _figura_treemap(hierarquia, cores, max_partidos, max_categorias),
+        LIMITES_TREEMAP,
+        ORCAMENTO_FIGURA
+    )
+
+def _figura_treemap(hierarquia, cores, max_partidos, max_categorias):
+    # Os maiores partidos de cada esfera e as maiores categorias de cada partido;
+    # os demais são somados em "Outros"
+    dados_filtrados = agrupar_cauda(hierarquia, 'NM_ESFERA', 'SG_PARTIDO', 'VR_LANCAMENTO_NUM', max_partidos)
+    dados_filtrados = agrupar_cauda(dados_filtrados, ['NM_ESFERA', 'SG_PARTIDO'], 'CATEGORIA_GASTO',
+                                    'VR_LANCAMENTO_NUM', max_categorias)
+
+    gradiente_laranja = [
+        "#FF6F00",  # Esfera
+        "#FFA726",  # Partido
+        "#FFE082"   # Categoria
+    ]
+
+    fig = px.treemap(
+        descategorizar(dados_filtrados),
+        path=['NM_ESFERA', 'SG_PARTIDO', 'CATEGORIA_GASTO'],
+        values='VR_LANCAMENTO_NUM',
+        color='NM_ESFERA',
+        color_discrete_sequence=gradiente_laranja
+    )
+
+    fig.data[0].marker.colors = [
+        gradiente_laranja[min(len(p.split('/')) - 1, 2)]
+        for p in fig.data[0].ids
+    ]
+
+    fig = configurar_layout(fig, 'Mapa de Árvore: Estrutura Hierárquica de Gastos (Esfera / Partido / Categoria)')
+
+    fig.update_traces(
+        textinfo='label+value',
+        hovertemplate='<b>%{label}</b><br>R$ %{value:,.2f}<extra></extra>',
+        marker=dict(line=dict(color=cores['cinza_medio'], width=1))
+    )
+
+    fig.update_layout(
+        margin=dict(t=80, l=0, r=0, b=60),
+        showlegend=False
+    )
+
+    # Legenda dos níveis como anotação (sem traces fictícios nem eixos)
+    niveis = ['Esfera', 'Partido', 'Categoria']
+    legenda = "&nbsp;&nbsp;&nbsp;".join(
+        f"<span style='color:{cor}'>■</span> {nivel}"
+        for cor, nivel in zip(gradiente_laranja, niveis)
+    )
+    fig.add_annotation(
+        text=f"<b>NÍVEL HIERÁRQUICO</b><br>{legenda}",
+        showarrow=False,
+        xref='paper', yref='paper',
+        x=0.5, y=-0.02,
+        xanchor='center', yanchor='top',
+        font=dict(color=cores['azul_muito_escuro'], size=12)
+    )
+
+    return fig
+
+def criar_grafico_comparacao_percentual(dados, cores):
+    """GRÁFICO 3: Comparação percentual entre esferas"""
+    
+    percentual_esfera = dados.groupby(['NM_ESFERA', 'CATEGORIA_GASTO'], observed=True)['VR_LANCAMENTO_NUM'].sum().reset_index()
+    total_por_esfera = percentual_esfera.groupby('NM_ESFERA', observed=True)['VR_LANCAMENTO_NUM'].transform('sum')
+    percentual_esfera = percentual_esfera.assign(
+        PERCENTUAL=(percentual_esfera['VR_LANCAMENTO_NUM'] / total_por_esfera) * 100
+    )
+    
+    top_categorias = dados.groupby('CATEGORIA_GASTO', observed=True)['VR_LANCAMENTO_NUM'].sum().nlargest(5).index
+    dados_filtrados = percentual_esfera[percentual_esfera['CATEGORIA_GASTO'].isin(top_categorias)]
+    
+    fig = px.bar(
+        descategorizar(dados_filtrados),
+        x='NM_ESFERA',
+        y='PERCENTUAL',
+        color='CATEGORIA_GASTO',
+        barmode='stack',
+        color_discrete_sequence=cores['gradiente_principal']
+    )
+    
+    fig = configurar_layout(fig, 'Composição Percentual: DISTRIBUIÇÃO DAS CATEGORIAS DE GASTOS POR ESFERA')
+    
+    fig.update_layout(
+        xaxis=dict(
+            title_text='ESFERA PARTIDÁRIA',
+            linecolor=TEMA_PLOTLY['font_color'],
+            gridcolor=TEMA_PLOTLY['font_color'],
+            tickcolor=TEMA_PLOTLY['font_color'],
+            tickfont=dict(color=TEMA_PLOTLY['font_color']),
+            title_font=dict(color=TEMA_PLOTLY['font_color'])
+        ),
+        yaxis=dict(
+            title_text='PERCENTUAL (%)',
+            linecolor=TEMA_PLOTLY['font_color'],
+            gridcolor=TEMA_PLOTLY['font_color'],
+            tickcolor=TEMA_PLOTLY['font_color'],
+            tickfont=dict(color=TEMA_PLOTLY['font_color']),
+            title_font=dict(color=TEMA_PLOTLY['font_color'])
+        ),
+        legend=dict(
+            title=dict(
+                text='<b>CATEGORIAS DE GASTOS</b>',
+                font=dict(size=13, color='black')
+            ),
+            font=dict(color='black', size=12),
+            orientation='v',
+            yanchor='middle',
+            y=0.5,
+            xanchor='left',
+            x=1.02,
+            bgcolor='rgba(255,255,255,0)',
+            bordercolor='rgba(0,0,0,0)',
+            traceorder='normal'
+        )
+    )
+    
+    fig.update_yaxes(ticksuffix="%")
+    
+    return fig
+
+# =============================================
+# FUNÇÕES ESPECÍFICAS PARA P2 - VERSÃO CORRIGIDA
+# =============================================
+
+def criar_scatter_tarifas_vs_gastos(metricas, cores):
+    """GRÁFICO 4: Scatter plot - Tarifas bancárias vs Gastos totais por partido (EM MILHÕES)"""
+
+    # Totais, tarifas e percentual por partido vêm da tabela de métricas
+    dados_agrupados = metricas.rename(columns={
+        'TOTAL_GASTO': 'GASTO_TOTAL',
+        'TOTAL_TARIFAS': 'VALOR_TARIFAS'
+    })[['SG_PARTIDO', 'GASTO_TOTAL', 'VALOR_TARIFAS', 'PERC_TARIFAS']]
+
+    # Filtra partidos com gastos significativos
+    dados_agrupados = dados_agrupados[dados_agrupados['GASTO_TOTAL'] > 10000]
+
+    # Converte para milhões
+    dados_agrupados = dados_agrupados.assign(
+        GASTO_TOTAL_M=dados_agrupados['GASTO_TOTAL'] / 1_000_000,
+        VALOR_TARIFAS_M=dados_agrupados['VALOR_TARIFAS'] / 1_000_000
+    )
+
+    # Cria scatter plot
+    fig = px.scatter(
+        descategorizar(dados_agrupados),
+        x='GASTO_TOTAL_M',
+        y='PERC_TARIFAS',
+        size='PERC_TARIFAS',
+        color='PERC_TARIFAS',
+        hover_name='SG_PARTIDO',
+        hover_data={
+            'GASTO_TOTAL': ':.2f',
+            'VALOR_TARIFAS': ':.2f',
+            'PERC_TARIFAS': ':.2f',
+        },
+        color_continuous_scale=cores['gradiente_secundario'],
+        size_max=40
+    )
+
+    fig = configurar_layout(fig, 'EFICIÊNCIA: TARIFAS BANCÁRIAS vs GASTOS TOTAIS POR PARTIDO')
+
+    # ----------------------------- FAIXAS DE EFICIÊNCIA (fundo) -----------------------------
+    fig.add_hrect(y0=0, y1=1, fillcolor="green", opacity=0.07, layer="below", line_width=0)
+    fig.add_hrect(y0=1, y1=2, fillcolor="orange", opacity=0.07, layer="below", line_width=0)
+    fig.add_hrect(y0=2, y1=3, fillcolor="red", opacity=0.07, layer="below", line_width=0)
+
+    # ----------------------------- LINHAS DE REFERÊNCIA -----------------------------
+    fig.add_hline(y=1, line=dict(color='green', width=2, dash='dash'), name='1% (Excelente)')
+    fig.add_hline(y=2, line=dict(color='orange', width=2, dash='dash'), name='2% (Boa)')
+    fig.add_hline(y=3, line=dict(color='red', width=2, dash='dash'), name='3% (Alerta)')
+
+    # ----------------------------- AJUSTE DOS EIXOS -----------------------------
+    fig.update_xaxes(
+        title_text='GASTOS TOTAIS (Milhões de R$)',
+        type="log",
+        tickformat=",.1f",
+        showline=True,
+        linewidth=2,
+        linecolor="black",
+        tickfont=dict(color="black"),
+        title_font=dict(color="black")
+    )
+
+    fig.update_yaxes(
+        title_text='PERCENTUAL DE TARIFAS BANCÁRIAS (%)',
+        ticksuffix="%",
+        range=[0, dados_agrupados['PERC_TARIFAS'].max() * 1.25],  # Aumenta limite e evita ponto cortado
+        showline=True,
+        linewidth=2,
+        linecolor="black",
+        tickfont=dict(color="black"),
+        title_font=dict(color="black")
+    )
+    fig.update_coloraxes(
+        colorbar=dict(
+            title="% Tarifas",
+            tickfont=dict(color="black")
+        )
+    )
+    return fig
+
+
+def criar_ranking_eficiencia(metricas, cores):
+    """GRÁFICO 5: Ranking de eficiência - Menor % em tarifas bancárias"""
+    
+    # Totais, tarifas e percentual por partido vêm da tabela de métricas
+    eficiencia = metricas[['SG_PARTIDO', 'TOTAL_GASTO', 'TOTAL_TARIFAS', 'PERC_TARIFAS']]
+    
+    # Ordena por eficiência (menor percentual primeiro)
+    eficiencia = eficiencia.sort_values('PERC_TARIFAS', ascending=True)
+    
+    # Filtra partidos com gastos significativos (pelo menos R$ 50.000)
+    eficiencia = eficiencia[eficiencia['TOTAL_GASTO'] > 50000]
+    
+    # Seleciona top 15 mais eficientes
+    eficiencia = eficiencia.head(15)
+    
+    fig = px.bar(
+        descategorizar(eficiencia),
+        y='SG_PARTIDO',
+        x='PERC_TARIFAS',
+        orientation='h',
+        color='PERC_TARIFAS',
+        color_continuous_scale=['#00A86B', '#32CD32', '#90EE90'],  # Tons de verde para eficiência
+        hover_data={
+            'TOTAL_GASTO': ':.2f',
+            'TOTAL_TARIFAS': ':.2f',
+            'PERC_TARIFAS': ':.2f'
+        }
+    )
+    
+    fig = configurar_layout(fig, 'RANKING DE EFICIÊNCIA: MENOR % DE TARIFAS BANCÁRIAS')
+    
+    fig.update_layout(
+        yaxis=dict(
+            title_text='PARTIDO',
+            linecolor=TEMA_PLOTLY['font_color'],
+            gridcolor=TEMA_PLOTLY['font_color'],
+            tickcolor=TEMA_PLOTLY['font_color'],
+            tickfont=dict(color=TEMA_PLOTLY['font_color']),
+            title_font=dict(color=TEMA_PLOTLY['font_color']),
+            categoryorder='array',
+            categoryarray=eficiencia['SG_PARTIDO'].tolist()[::-1]
+        ),
+        xaxis=dict(
+            title_text='PERCENTUAL DE TARIFAS BANCÁRIAS (%)',
+            linecolor=TEMA_PLOTLY['font_color'],
+            gridcolor=TEMA_PLOTLY['font_color'],
+            tickcolor=TEMA_PLOTLY['font_color'],
+            tickfont=dict(color=TEMA_PLOTLY['font_color']),
+            title_font=dict(color=TEMA_PLOTLY['font_color'])
+        ),
+        coloraxis_colorbar=dict(
+            title="% Tarifas"
+        )
+    )
+    
+    fig.update_xaxes(ticksuffix="%")
+    
+    return fig
+def criar_indice_diversificacao_fornecedores(metricas, cores):
+    """GRÁFICO 6: Índice de diversificação de fornecedores por partido"""
+    
+    diversificacao = metricas[['SG_PARTIDO', 'QTD_FORNECEDORES', 'TOTAL_GASTO', 'QTD_TRANSACOES']]
+    
+    # Calcula o índice de diversificação (fornecedores por milhão de reais)
+    diversificacao = diversificacao.assign(
+        INDICE_DIVERSIFICACAO=(diversificacao['QTD_FORNECEDORES'] / diversificacao['TOTAL_GASTO']) * 1_000_000
+    )
+    
+    # Filtra partidos com gastos significativos (pelo menos R$ 100.000)
+    diversificacao = diversificacao[diversificacao['TOTAL_GASTO'] > 100000]
+    
+    # Ordena por índice de diversificação (maior = mais diversificado)
+    diversificacao = diversificacao.sort_values('INDICE_DIVERSIFICACAO', ascending=False)
+    
+    # Seleciona top 15 partidos mais diversificados
+    diversificacao = diversificacao.head(15)
+    
+    fig = px.bar(
+        descategorizar(diversificacao),
+        y='SG_PARTIDO',
+        x='INDICE_DIVERSIFICACAO',
+        orientation='h',
+        color='INDICE_DIVERSIFICACAO',
+        color_continuous_scale=cores['gradiente_principal'],
+        hover_data={
+            'QTD_FORNECEDORES': True,
+            'TOTAL_GASTO': ':.2f',
+            'QTD_TRANSACOES': True,
+            'INDICE_DIVERSIFICACAO': ':.2f'
+        }
+    )
+    
+    fig = configurar_layout(fig, 'DIVERSIFICAÇÃO: ÍNDICE DE FORNECEDORES POR PARTIDO')
+    
+    fig.update_layout(
+        yaxis=dict(
+            title_text='PARTIDO',
+            linecolor=TEMA_PLOTLY['font_color'],
+            gridcolor=TEMA_PLOTLY['font_color'],
+            tickcolor=TEMA_PLOTLY['font_color'],
+            tickfont=dict(color=TEMA_PLOTLY['font_color']),
+            title_font=dict(color=TEMA_PLOTLY['font_color']),
+            categoryorder='total ascending'
+        ),
+        xaxis=dict(
+            title_text='ÍNDICE DE DIVERSIFICAÇÃO (Fornecedores por Milhão de R$)',
+            linecolor=TEMA_PLOTLY['font_color'],
+            gridcolor=TEMA_PLOTLY['font_color'],
+            tickcolor=TEMA_PLOTLY['font_color'],
+            tickfont=dict(color=TEMA_PLOTLY['font_color']),
+            title_font=dict(color=TEMA_PLOTLY['font_color'])
+        ),
+        coloraxis_colorbar=dict(
+            title="Índice"
+        )
+    )
+    
+    return fig
+
+# =============================================
+# EVOLUÇÃO MENSAL
+# =============================================
+
+def criar_grafico_evolucao_mensal(mensal, cores):
+    """GRÁFICO 7: Linhas - Gastos mensais por esfera (agregado mensal do cubo)"""
+
+    esfera_mes = mensal.groupby(['MES', 'NM_ESFERA'], observed=True)['VR_LANCAMENTO_NUM'].sum().reset_index()
+
+    fig = px.line(
+        descategorizar(esfera_mes),
+        x='MES',
+        y='VR_LANCAMENTO_NUM',
+        color='NM_ESFERA',
+        markers=True,
+        color_discrete_map=cores['mapa_cores_esferas'],
+        color_discrete_sequence=cores['gradiente_principal']
+    )
+
+    fig = configurar_layout(fig, 'EVOLUÇÃO MENSAL DOS GASTOS POR ESFERA')
+
+    fig.update_layout(
+        xaxis=dict(
+            title_text='MÊS',
+            linecolor=TEMA_PLOTLY['font_color'],
+            gridcolor=cores['cinza_claro'],
+            tickcolor=TEMA_PLOTLY['font_color'],
+            tickfont=dict(color=TEMA_PLOTLY['font_color']),
+            title_font=dict(color=TEMA_PLOTLY['font_color'])
+        ),
+        yaxis=dict(
+            title_text='VALOR TOTAL (R$)',
+            linecolor=TEMA_PLOTLY['font_color'],
+            gridcolor=cores['cinza_claro'],
+            tickcolor=TEMA_PLOTLY['font_color'],
+            tickfont=dict(color=TEMA_PLOTLY['font_color']),
+            title_font=dict(color=TEMA_PLOTLY['font_color'])
+        ),
+        legend=dict(
+            font=dict(color=TEMA_PLOTLY['font_color']),
+            title_text='Esfera'
+        )
+    )
+
+    fig.update_xaxes(dtick='M1', tickformat='%m/%Y')
+    fig.update_yaxes(tickformat=",.0f")
+
+    return fig
+
+# Origem dos dados de cada gráfico: 'cubo' (cubo filtrado), 'metricas'
+# (métricas por partido da seleção) ou 'mensal' (cubo mensal filtrado)
+FONTES_GRAFICOS = {
+    criar_grafico_barras_agrupadas_esferas: 'cubo',
+    criar_grafico_treemap_esferas: 'cubo',
+    criar_grafico_comparacao_percentual: 'cubo',
+    criar_scatter_tarifas_vs_gastos: 'metricas',
+    criar_ranking_eficiencia: 'metricas',
+    criar_indice_diversificacao_fornecedores: 'metricas',
+    criar_grafico_evolucao_mensal: 'mensal',
+}
@@ -0,0 +1,61 @@
+import numpy as np
+
+# =============================================
+# ÍNDICE BITMAP PARA OS FILTROS DO SIDEBAR
+# =============================================
+
+DIMENSOES_FILTRO = ['NM_ESFERA', 'CATEGORIA_GASTO', 'SG_PARTIDO']
+
+
+class IndiceBitmap:
+    """
+    Guarda, para cada valor das dimensões de filtro, um bitmap compactado
+    (np.packbits) com as linhas do frame que possuem aquele valor.
+    Os valores selecionados são combinados com OU dentro de cada dimensão
+    e com E entre dimensões.
+    """
+
+    def __init__(self, dados, dimensoes=DIMENSOES_FILTRO):
+        self.linhas = len(dados)
+        self.bitmaps = {}
+        for dimensao in dimensoes:
+            serie = dados[dimensao]
+            codigos = serie.cat.codes.to_numpy()
+            presentes = np.flatnonzero(np.bincount(codigos[codigos >= 0],
+                                                   minlength=len(serie.cat.categories)))
+            self.bitmaps[dimensao] = {
+                serie.cat.categories[codigo]: np.packbits(codigos == codigo)
+                for codigo in presentes
+            }
+
+    def selecionar(self, selecoes):
+        """
+        Retorna as posições das linhas que atendem às seleções
+        ({dimensão: valores}), ou None quando nenhuma dimensão restringe o frame.
+        """
+        resultado = None
+        for dimensao, valores in selecoes.items():
+            bitmaps = self.bitmaps[dimensao]
+            valores = set(valores)
+            if valores.issuperset(bitmaps):
+                continue
+
+            uniao = np.zeros((self.linhas + 7) // 8, dtype=np.uint8)
+            for valor in valores & bitmaps.keys():
+                np.bitwise_or(uniao, bitmaps[valor], out=uniao)
+
+            if resultado is None:
+                resultado = uniao
+            else:
+                np.bitwise_and(resultado, uniao, out=resultado)
+
+        if resultado is None:
+            return None
+        return np.flatnonzero(np.unpackbits(resultado, count=self.linhas))
+
+    def filtrar(self, dados, selecoes):
+        """Aplica as seleções ao frame indexado, sem copiá-lo quando não há filtro."""
+        posicoes = self.selecionar(selecoes)
+        if posicoes is None:
+            return dados
+        return dados.take(posicoes)
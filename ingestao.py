@@ -0,0 +1,256 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from armazenamento import (
+    COLUNA_ANO, COLUNAS_PARTICAO, DIRETORIO_PARQUET, ESQUEMA_DASHBOARD, ano_do_arquivo,
+    blocos_com_ano, esquema_com_ano, substituir_dataset
+)
+from instantaneo import gerar_instantaneo, precisao_configurada
+
+# =============================================
+# INGESTÃO DO EXTRATO BRUTO DO TSE
+# =============================================
+
+ARQUIVO_EXTRATO_BRUTO = "extrato_bancario_partido_2020.csv"
+ARQUIVO_MANIFESTO = "_ingestao.json"
+
+# Índice de hashes das linhas já gravadas (ver atualizacao.py). Ele descreve
+# as peças de uma versão do dataset e não passa para a próxima: a próxima
+# anexação o refaz varrendo a versão nova
+ARQUIVO_HASHES = "_hashes_linhas.npz"
+
+LINHAS_POR_BLOCO = 200_000
+LINHAS_POR_GRUPO = 65_536
+
+# Nomes possíveis da coluna de esfera partidária no extrato bruto
+COLUNAS_ESFERA = ['NM_ESFERA', 'DS_ESFERA_PARTIDARIA', 'NM_ESFERA_PARTIDARIA']
+
+# Regras de categorização do DS_LANCAMENTO, avaliadas em ordem
+REGRAS_CATEGORIA = [
+    ('TARIFAS BANCÁRIAS', r'TARIFA|\bTAR\b|CESTA DE SERV|PACOTE DE SERV|MANUTEN[CÇ][AÃ]O DE CONTA'),
+    ('TRANSFERÊNCIAS', r'TRANSF|\bTED\b|\bDOC\b|\bPIX\b'),
+    ('PESSOAL', r'SAL[AÁ]RIO|FOLHA|\bINSS\b|\bFGTS\b|RESCIS|F[EÉ]RIAS'),
+    ('ALUGUEL', r'ALUGUEL|LOCA[CÇ][AÃ]O|CONDOM[IÍ]NIO'),
+    ('PROPAGANDA', r'PROPAGANDA|PUBLICIDADE|MARKETING|IMPRESS|GR[AÁ]FICA'),
+    ('PAGAMENTOS', r'PAGAMENTO|PAGTO|PGTO|BOLETO|T[IÍ]TULO|CONV[EÊ]NIO'),
+]
+CATEGORIA_PADRAO = 'OUTRAS DESPESAS'
+NAO_INFORMADO = 'NÃO INFORMADO'
+
+
+def hash_arquivo(caminho, tamanho_bloco=1 << 20):
+    """Calcula o SHA-256 do arquivo lendo-o em blocos."""
+    sha = hashlib.sha256()
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(tamanho_bloco), b''):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+
+def converter_valor_brasileiro(valores):
+    """
+    Converte valores no formato brasileiro ('1.234,56') para float. Só os
+    valores com vírgula decimal têm os pontos de milhar removidos: os que
+    já vêm com ponto decimal ('1234.56') são lidos como estão.
+    """
+    texto = valores.astype(str).str.strip()
+    brasileiro = texto.str.contains(',', regex=False)
+    texto = texto.where(~brasileiro, texto.str.replace('.', '', regex=False).str.replace(',', '.', regex=False))
+    return pd.to_numeric(texto, errors='coerce')
+
+
+def categorizar_lancamentos(descricoes):
+    """
+    Classifica cada DS_LANCAMENTO numa CATEGORIA_GASTO. As regras são
+    aplicadas apenas sobre as descrições distintas do bloco.
+    """
+    codigos, distintas = pd.factorize(descricoes)
+    texto = pd.Series(distintas, dtype=str).str.upper()
+
+    condicoes = [texto.str.contains(padrao, regex=True) for _, padrao in REGRAS_CATEGORIA]
+    nomes = [nome for nome, _ in REGRAS_CATEGORIA]
+    categorias = np.select(condicoes, nomes, default=CATEGORIA_PADRAO)
+
+    # factorize marca valores ausentes com -1
+    categorias = np.append(categorias, NAO_INFORMADO)
+    return pd.Series(categorias[codigos], index=descricoes.index)
+
+
+def transformar_bloco(bloco):
+    """Transforma um bloco do extrato bruto nas colunas do DASHBOARD."""
+    coluna_esfera = next((c for c in COLUNAS_ESFERA if c in bloco.columns), None)
+    esfera = bloco[coluna_esfera] if coluna_esfera else pd.Series(NAO_INFORMADO, index=bloco.index)
+
+    saida = pd.DataFrame({
+        'DT_LANCAMENTO': pd.to_datetime(bloco['DT_LANCAMENTO'], format='%d/%m/%Y', errors='coerce'),
+        'NM_ESFERA': esfera.fillna(NAO_INFORMADO).str.upper(),
+        'CATEGORIA_GASTO': categorizar_lancamentos(bloco['DS_LANCAMENTO']),
+        'SG_PARTIDO': bloco['SG_PARTIDO'].fillna(NAO_INFORMADO),
+        'NM_CONTRAPARTE': bloco['NM_CONTRAPARTE'],
+        'VR_LANCAMENTO_NUM': converter_valor_brasileiro(bloco['VR_LANCAMENTO']),
+    })
+    return pa.RecordBatch.from_pandas(saida, schema=ESQUEMA_DASHBOARD, preserve_index=False)
+
+
+def _blocos_extrato(caminho, linhas_por_bloco):
+    """Lê o extrato bruto em blocos de tamanho limitado."""
+    leitor = pd.read_csv(
+        caminho, encoding='latin-1', sep=';', dtype=str,
+        chunksize=linhas_por_bloco
+    )
+    for bloco in leitor:
+        yield transformar_bloco(bloco)
+
+
+def chave_manifesto(caminho, ano=None):
+    """
+    Entrada do extrato no manifesto: o caminho absoluto e, quando a
+    partição é forçada com `ano`, o ano. Extratos com o mesmo nome em
+    pastas diferentes, ou o mesmo extrato em anos diferentes, são fontes
+    distintas.
+    """
+    chave = os.path.realpath(caminho)
+    return f"{chave}|{COLUNA_ANO}={ano}" if ano else chave
+
+
+def prefixo_pecas(chave, conteudo):
+    """Prefixo das peças geradas de uma versão da fonte: depende da fonte e do conteúdo."""
+    return hashlib.sha256(f"{chave}\0{conteudo}".encode('utf-8')).hexdigest()[:16]
+
+
+def carregar_manifesto(diretorio):
+    """Lê o manifesto com o hash de cada arquivo já ingerido."""
+    caminho = os.path.join(diretorio, ARQUIVO_MANIFESTO)
+    if not os.path.exists(caminho):
+        return {}
+    with open(caminho, encoding='utf-8') as arquivo:
+        return json.load(arquivo)
+
+
+def salvar_manifesto(diretorio, manifesto):
+    """Grava o manifesto de forma atômica."""
+    caminho = os.path.join(diretorio, ARQUIVO_MANIFESTO)
+    temporario = caminho + ".tmp"
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        json.dump(manifesto, arquivo, indent=2, ensure_ascii=False)
+    os.replace(temporario, caminho)
+
+
+def _preparar_versao(diretorio, temporario, descartar):
+    """
+    Monta em `temporario` a próxima versão do dataset: links para as peças
+    atuais (sem copiar os dados), exceto as geradas das versões da fonte
+    com prefixo em `descartar` e o índice de hashes das linhas, que deixa
+    de valer. As peças dos lotes anexados e o registro deles seguem.
+    """
+    shutil.rmtree(temporario, ignore_errors=True)
+    os.makedirs(temporario)
+    if not os.path.isdir(diretorio):
+        return
+    for raiz, _, nomes in os.walk(diretorio):
+        for nome in nomes:
+            if nome.endswith(".parquet") and nome.split("-", 1)[0] in descartar:
+                continue
+            if raiz == diretorio and nome == ARQUIVO_HASHES:
+                continue
+            origem = os.path.join(raiz, nome)
+            destino = os.path.join(temporario, os.path.relpath(origem, diretorio))
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            try:
+                os.link(origem, destino)
+            except OSError:
+                # Sistema de arquivos sem links: copia a peça
+                shutil.copy2(origem, destino)
+
+
+def ingerir_arquivo(caminho, diretorio=DIRETORIO_PARQUET, linhas_por_bloco=LINHAS_POR_BLOCO,
+                    manifesto=None, ano=None):
+    """
+    Processa um extrato bruto em blocos e grava o resultado no dataset
+    Parquet particionado, na partição do ano do extrato (`ano`, o do nome
+    do arquivo ou o predominante nas datas). As peças novas e o manifesto
+    são gravados numa cópia do dataset ao lado dele, que o substitui só ao
+    final. Retorna False se o arquivo não mudou desde a última ingestão.
+
+    Uma nova versão da fonte substitui só as peças geradas dela. Os lotes
+    anexados por atualizacao.py são outra fonte e continuam no dataset:
+    se a nova versão também traz as linhas de um lote (um extrato
+    cumulativo republicado), elas passam a contar duas vezes. Um extrato
+    assim deve ser anexado, o que descarta as linhas já gravadas.
+    """
+    manifesto = carregar_manifesto(diretorio) if manifesto is None else manifesto
+    chave = chave_manifesto(caminho, ano)
+    conteudo = hash_arquivo(caminho)
+    prefixo = prefixo_pecas(chave, conteudo)
+
+    # Manifestos antigos usavam o nome do arquivo como chave e o início do
+    # hash do conteúdo como prefixo das peças
+    legado = os.path.basename(caminho)
+    if chave not in manifesto and legado in manifesto:
+        anterior = dict(manifesto[legado], prefixo=manifesto[legado]['hash'][:16])
+    else:
+        anterior, legado = manifesto.get(chave), None
+    if anterior and anterior['hash'] == conteudo:
+        return False
+
+    temporario = os.path.normpath(diretorio) + ".tmp"
+    descartar = {prefixo} | ({anterior['prefixo']} if anterior else set())
+    _preparar_versao(diretorio, temporario, descartar)
+
+    ds.write_dataset(
+        blocos_com_ano(_blocos_extrato(caminho, linhas_por_bloco), ano or ano_do_arquivo(caminho)),
+        temporario,
+        schema=esquema_com_ano(ESQUEMA_DASHBOARD),
+        format='parquet',
+        partitioning=COLUNAS_PARTICAO,
+        partitioning_flavor='hive',
+        basename_template=prefixo + "-{i}.parquet",
+        max_rows_per_group=LINHAS_POR_GRUPO,
+        existing_data_behavior='overwrite_or_ignore'
+    )
+
+    if legado:
+        del manifesto[legado]
+    manifesto[chave] = {'hash': conteudo, 'prefixo': prefixo}
+    salvar_manifesto(temporario, manifesto)
+    substituir_dataset(temporario, diretorio)
+    return True
+
+
+def ingerir_arquivos(caminhos, diretorio=DIRETORIO_PARQUET, linhas_por_bloco=LINHAS_POR_BLOCO, ano=None):
+    """Ingere vários extratos, processando apenas os que mudaram."""
+    manifesto = carregar_manifesto(diretorio)
+    processados = []
+    for caminho in caminhos:
+        if ingerir_arquivo(caminho, diretorio, linhas_por_bloco, manifesto, ano):
+            processados.append(caminho)
+    return processados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingestão dos extratos bancários brutos do TSE.")
+    parser.add_argument('arquivos', nargs='*', default=[ARQUIVO_EXTRATO_BRUTO])
+    parser.add_argument('--destino', default=DIRETORIO_PARQUET)
+    parser.add_argument('--linhas-por-bloco', type=int, default=LINHAS_POR_BLOCO)
+    parser.add_argument('--ano', default=None,
+                        help="partição dos arquivos (padrão: o ano no nome de cada arquivo)")
+    parser.add_argument('--sem-instantaneo', action='store_true',
+                        help="não regenera o instantâneo da visão padrão")
+    args = parser.parse_args()
+
+    processados = ingerir_arquivos(args.arquivos, args.destino, args.linhas_por_bloco, args.ano)
+    for caminho in args.arquivos:
+        situacao = "processado" if caminho in processados else "sem alterações"
+        print(f"{caminho}: {situacao}")
+
+    # Visão padrão pré-renderizada para o primeiro acesso após a ingestão
+    if processados and not args.sem_instantaneo:
+        gerar_instantaneo(args.destino, precisao=precisao_configurada())
@@ -0,0 +1,158 @@
+import argparse
+import json
+import os
+
+import pandas as pd
+import plotly.io as pio
+
+from armazenamento import (
+    DIRETORIO_PARQUET, filtro_sem_nao_informado, ler_dataset, preparar_dados
+)
+from catalogo import arquivos_particoes, carregar_catalogo, selecionar_particoes, versao_particoes
+from construcao_paralela import construir_figura
+from consultas import ConsultasPandas
+from contagem_aproximada import PRECISAO_PADRAO, SketchesCelulas
+from cubo import DIMENSOES_CUBO, construir_cubo
+from graficos import CORES, FONTES_GRAFICOS
+from indice_bitmap import DIMENSOES_FILTRO, IndiceBitmap
+from serie_temporal import agregar_mensal, construir_cubo_diario
+
+# =============================================
+# INSTANTÂNEO DA VISÃO PADRÃO (TODOS OS FILTROS MARCADOS)
+# =============================================
+
+def caminho_instantaneo(diretorio=DIRETORIO_PARQUET):
+    """Arquivo do instantâneo, ao lado do dataset (dentro dele mudaria a versão)."""
+    return os.path.splitext(os.path.normpath(diretorio))[0] + ".instantaneo.json"
+
+
+ARQUIVO_INSTANTANEO = caminho_instantaneo(DIRETORIO_PARQUET)
+
+
+def precisao_configurada():
+    """
+    Precisão HyperLogLog do dashboard segundo DASHBOARD_FORNECEDORES e
+    DASHBOARD_HLL_PRECISAO, ou None no modo exato.
+    """
+    if os.environ.get('DASHBOARD_FORNECEDORES', 'exato') != 'aproximado':
+        return None
+    return int(os.environ.get('DASHBOARD_HLL_PRECISAO', PRECISAO_PADRAO))
+
+
+def modo_fornecedores(precisao=None):
+    """Identifica como as contagens de fornecedores foram feitas ('exato' ou 'hll-p')."""
+    return 'exato' if precisao is None else f"hll-{precisao}"
+
+
+def _data_iso(data):
+    return None if pd.isna(data) else pd.Timestamp(data).isoformat()
+
+
+def anos_padrao(catalogo):
+    """Anos da visão padrão: a partição mais recente do catálogo."""
+    return [catalogo[-1]['nome']] if catalogo else []
+
+
+def gerar_instantaneo(diretorio=DIRETORIO_PARQUET, destino=None, precisao=None, anos=None):
+    """
+    Constrói a visão padrão do dashboard (as figuras, as opções dos
+    filtros, os limites do período e o resumo do sidebar) sobre os `anos`
+    do catálogo (padrão: o mais recente) e a grava como JSON do Plotly,
+    marcada com a versão das partições lidas. Com `precisao`, as contagens
+    de fornecedores são as estimativas HyperLogLog do modo aproximado.
+    Retorna a versão, ou None se as partições mudaram durante a geração.
+    """
+    destino = destino or caminho_instantaneo(diretorio)
+    catalogo = carregar_catalogo(diretorio)
+    anos = anos or anos_padrao(catalogo)
+    particoes = selecionar_particoes(catalogo, anos)
+    versao = versao_particoes(particoes)
+    dados = preparar_dados(ler_dataset(diretorio, filtro=filtro_sem_nao_informado(),
+                                       arquivos=arquivos_particoes(particoes, diretorio)))
+
+    sketches = None
+    if precisao is not None:
+        sketches = SketchesCelulas.de_transacoes(dados, DIMENSOES_CUBO, precisao=precisao)
+    consultas = ConsultasPandas(dados, IndiceBitmap(dados, DIMENSOES_FILTRO), sketches)
+    metricas = consultas.metricas()
+    cubo_diario = construir_cubo_diario(dados)
+    fontes = {
+        'cubo': construir_cubo(dados),
+        'metricas': metricas['partidos'],
+        'mensal': agregar_mensal(cubo_diario),
+    }
+
+    figuras = {
+        construtor.__name__: pio.to_json(construir_figura(construtor, fontes[fonte], CORES), validate=False)
+        for construtor, fonte in FONTES_GRAFICOS.items()
+    }
+    resumo = metricas['resumo']
+    instantaneo = {
+        'versao': versao,
+        'anos': [particao['nome'] for particao in particoes],
+        'fornecedores': modo_fornecedores(precisao),
+        'opcoes': {
+            dimensao: sorted(str(valor) for valor in fontes['cubo'][dimensao].dropna().unique())
+            for dimensao in DIMENSOES_CUBO
+        },
+        'periodo': [_data_iso(cubo_diario['DIA'].min()), _data_iso(cubo_diario['DIA'].max())],
+        'resumo': {
+            'valor_total': float(resumo['valor_total']),
+            'transacoes': int(resumo['transacoes']),
+            'partidos': int(resumo['partidos']),
+            'fornecedores': int(resumo['fornecedores']),
+            'inicio': _data_iso(resumo['inicio']),
+            'fim': _data_iso(resumo['fim']),
+        },
+        'figuras': figuras,
+    }
+
+    # Um lote anexado durante a geração deixaria o instantâneo defasado
+    if versao_particoes(selecionar_particoes(carregar_catalogo(diretorio), anos)) != versao:
+        return None
+
+    temporario = destino + ".tmp"
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        json.dump(instantaneo, arquivo, ensure_ascii=False)
+    os.replace(temporario, destino)
+    return versao
+
+
+def carregar_instantaneo(caminho=ARQUIVO_INSTANTANEO):
+    """
+    Lê o instantâneo gravado por gerar_instantaneo, com as figuras já
+    reconstruídas e o tamanho do JSON de cada uma. Retorna None se ele não existe.
+    """
+    try:
+        with open(caminho, encoding='utf-8') as arquivo:
+            instantaneo = json.load(arquivo)
+    except (OSError, ValueError):
+        return None
+
+    resumo = instantaneo['resumo']
+    resumo['inicio'] = pd.Timestamp(resumo['inicio']) if resumo['inicio'] else pd.NaT
+    resumo['fim'] = pd.Timestamp(resumo['fim']) if resumo['fim'] else pd.NaT
+    instantaneo['periodo'] = [pd.Timestamp(data) if data else pd.NaT for data in instantaneo.get('periodo', [None, None])]
+    instantaneo['tamanhos'] = {nome: len(figura) for nome, figura in instantaneo['figuras'].items()}
+    instantaneo['figuras'] = {
+        nome: pio.from_json(figura, skip_invalid=True) for nome, figura in instantaneo['figuras'].items()
+    }
+    return instantaneo
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera o instantâneo da visão padrão do dashboard.")
+    parser.add_argument('--origem', default=DIRETORIO_PARQUET)
+    parser.add_argument('--destino', default=None,
+                        help="padrão: ao lado do dataset, com extensão .instantaneo.json")
+    parser.add_argument('--precisao-hll', type=int, default=precisao_configurada(),
+                        help="contagens de fornecedores aproximadas (modo HyperLogLog)")
+    parser.add_argument('--anos', nargs='+', default=None,
+                        help="partições da visão padrão (padrão: a mais recente)")
+    args = parser.parse_args()
+
+    versao = gerar_instantaneo(args.origem, args.destino, args.precisao_hll, args.anos)
+    if versao is None:
+        print("O dataset mudou durante a geração; execute novamente.")
+    else:
+        print(f"Instantâneo da versão {versao} gravado em: {args.destino or caminho_instantaneo(args.origem)}")
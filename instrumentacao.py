@@ -0,0 +1,177 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# =============================================
+# INSTRUMENTAÇÃO DOS TRECHOS QUENTES (OPCIONAL)
+# =============================================
+
+NOME_SERVICO = "dashboard-partidos"
+
+# Trechos guardados por sessão (os mais antigos são descartados)
+MAX_TRECHOS = 2000
+
+
+def _novo_id(bytes_):
+    return os.urandom(bytes_).hex()
+
+
+class Rastreador:
+    """
+    Registra trechos (spans) de cada execução do script: nome, início e
+    duração, e atributos como linhas de entrada e saída, acerto ou falha de
+    cache e bytes de payload. É seguro entre threads (os gráficos são
+    construídos em paralelo); trechos abertos em outra thread ficam sob a
+    raiz da execução. Inativo, `trecho` não mede nada e custa quase zero.
+    Com `arquivo`, cada trecho concluído é acrescentado a ele em JSON lines.
+    """
+
+    def __init__(self, ativo=True, arquivo=None):
+        self.ativo = ativo
+        self.arquivo = arquivo
+        self.execucao = None
+        self.trechos = []
+        self._trava = threading.Lock()
+        self._pilha = threading.local()
+
+    def iniciar_execucao(self, nome='rerun'):
+        """Começa um novo trace; os trechos da execução anterior são descartados."""
+        if not self.ativo:
+            return
+        with self._trava:
+            self.execucao = {
+                'trace_id': _novo_id(16),
+                'span_id': _novo_id(8),
+                'nome': nome,
+                'inicio_ns': time.time_ns(),
+            }
+            self.trechos = []
+
+    @contextmanager
+    def trecho(self, nome, **atributos):
+        """
+        Mede o bloco e registra o trecho ao sair. Retorna o dicionário de
+        atributos, que o bloco pode completar (ex.: linhas de saída).
+        """
+        if not self.ativo or self.execucao is None:
+            yield atributos
+            return
+
+        pilha = self._pilha.__dict__.setdefault('trechos', [])
+        registro = {
+            'trace_id': self.execucao['trace_id'],
+            'span_id': _novo_id(8),
+            'pai_id': pilha[-1] if pilha else self.execucao['span_id'],
+            'nome': nome,
+            'thread': threading.current_thread().name,
+            'atributos': atributos,
+        }
+        pilha.append(registro['span_id'])
+        registro['inicio_ns'] = time.time_ns()
+        inicio = time.perf_counter()
+        try:
+            yield atributos
+        except BaseException as erro:
+            atributos['erro'] = type(erro).__name__
+            raise
+        finally:
+            registro['duracao_ms'] = (time.perf_counter() - inicio) * 1000
+            registro['fim_ns'] = registro['inicio_ns'] + int(registro['duracao_ms'] * 1e6)
+            pilha.pop()
+            self._registrar(registro)
+
+    def _registrar(self, registro):
+        with self._trava:
+            self.trechos.append(registro)
+            del self.trechos[:-MAX_TRECHOS]
+        if self.arquivo:
+            linha = json.dumps(registro, ensure_ascii=False, default=str)
+            with self._trava, open(self.arquivo, 'a', encoding='utf-8') as arquivo:
+                arquivo.write(linha + "\n")
+
+    # ---------------------------------------------
+    # Exportação
+    # ---------------------------------------------
+
+    def tabela(self):
+        """Trechos da execução atual, um por linha, para exibição."""
+        with self._trava:
+            trechos = list(self.trechos)
+        return [
+            {'trecho': registro['nome'], 'ms': round(registro['duracao_ms'], 2), **registro['atributos']}
+            for registro in sorted(trechos, key=lambda registro: registro['inicio_ns'])
+        ]
+
+    def jsonl(self):
+        """Trechos da execução atual em JSON lines."""
+        with self._trava:
+            trechos = list(self.trechos)
+        return "".join(json.dumps(registro, ensure_ascii=False, default=str) + "\n" for registro in trechos)
+
+    def otel(self):
+        """
+        Trechos da execução atual no formato JSON do OTLP (resourceSpans),
+        aceito por coletores OpenTelemetry, incluindo o trecho raiz.
+        """
+        with self._trava:
+            trechos = list(self.trechos)
+            execucao = dict(self.execucao or {})
+        if not execucao:
+            return {'resourceSpans': []}
+
+        raiz = {
+            'trace_id': execucao['trace_id'],
+            'span_id': execucao['span_id'],
+            'pai_id': None,
+            'nome': execucao['nome'],
+            'inicio_ns': execucao['inicio_ns'],
+            'fim_ns': max([registro['fim_ns'] for registro in trechos], default=execucao['inicio_ns']),
+            'atributos': {},
+        }
+        return {
+            'resourceSpans': [{
+                'resource': {'attributes': _atributos_otel({'service.name': NOME_SERVICO})},
+                'scopeSpans': [{
+                    'scope': {'name': 'instrumentacao'},
+                    'spans': [_trecho_otel(registro) for registro in [raiz] + trechos],
+                }],
+            }]
+        }
+
+
+def _valor_otel(valor):
+    if isinstance(valor, bool):
+        return {'boolValue': valor}
+    if isinstance(valor, int):
+        return {'intValue': str(valor)}
+    if isinstance(valor, float):
+        return {'doubleValue': valor}
+    return {'stringValue': str(valor)}
+
+
+def _atributos_otel(atributos):
+    return [
+        {'key': chave, 'value': _valor_otel(valor)}
+        for chave, valor in atributos.items() if valor is not None
+    ]
+
+
+def _trecho_otel(registro):
+    trecho = {
+        'traceId': registro['trace_id'],
+        'spanId': registro['span_id'],
+        'name': registro['nome'],
+        'kind': 1,
+        'startTimeUnixNano': str(registro['inicio_ns']),
+        'endTimeUnixNano': str(registro['fim_ns']),
+        'attributes': _atributos_otel(registro['atributos']),
+    }
+    if registro['pai_id']:
+        trecho['parentSpanId'] = registro['pai_id']
+    return trecho
+
+
+# Rastreador usado quando a instrumentação está desligada
+INATIVO = Rastreador(ativo=False)
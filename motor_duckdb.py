@@ -0,0 +1,253 @@
+import os
+
+import pandas as pd
+
+try:
+    import duckdb
+except ImportError:  # dependência opcional
+    duckdb = None
+
+DUCKDB_DISPONIVEL = duckdb is not None
+
+from armazenamento import ARQUIVO_CSV, COLUNAS_DASHBOARD, DIRETORIO_PARQUET, dataset_existe
+from consultas import CATEGORIA_TARIFAS, COLUNAS_METRICAS, LINHAS_POR_LOTE, LINHAS_POR_PAGINA, Consultas
+from contagem_aproximada import BITS_POSTO, PRECISAO_PADRAO, SketchesCelulas
+from cubo import DIMENSOES_CUBO
+from serie_temporal import COLUNA_DATA
+
+# =============================================
+# MOTOR DUCKDB (CONSULTAS SQL FORA DA MEMÓRIA)
+# =============================================
+
+FILTRO_INFORMADO = " AND ".join(
+    f"NOT coalesce({coluna} ILIKE '%NÃO INFORMADO%', false)"
+    for coluna in ['NM_ESFERA', 'CATEGORIA_GASTO', 'SG_PARTIDO']
+)
+
+
+class MotorDuckDB(Consultas):
+    """
+    Executa as agregações do dashboard em SQL, com uma conexão DuckDB
+    embutida, diretamente sobre o dataset Parquet (ou o CSV). O frame de
+    transações nunca é materializado no pandas: as consultas rodam em
+    paralelo e, com `memoria` definida, usam o disco quando não cabem na RAM.
+    Com `arquivos` (as peças dos anos escolhidos no catálogo), a view lê
+    apenas eles.
+    """
+
+    def __init__(self, diretorio=DIRETORIO_PARQUET, caminho_csv=ARQUIVO_CSV,
+                 threads=None, memoria=None, diretorio_temporario=None,
+                 aproximado=False, precisao=PRECISAO_PADRAO, arquivos=None):
+        if duckdb is None:
+            raise ImportError("O motor DuckDB requer o pacote 'duckdb' (pip install duckdb).")
+        super().__init__()
+
+        self.conexao = duckdb.connect()
+        if threads:
+            self.conexao.execute(f"SET threads = {int(threads)}")
+        if memoria:
+            self.conexao.execute("SET memory_limit = ?", [memoria])
+        if diretorio_temporario:
+            self.conexao.execute("SET temp_directory = ?", [diretorio_temporario])
+
+        self.diretorio = diretorio
+        self.caminho_csv = caminho_csv
+        self._criar_view(arquivos)
+        self.opcoes = {}
+        if aproximado:
+            self.sketches = self.construir_sketches(precisao)
+
+    def _criar_view(self, arquivos=None):
+        if arquivos:
+            lista = ", ".join("'" + arquivo.replace("'", "''") + "'" for arquivo in arquivos)
+            origem = f"read_parquet([{lista}], hive_partitioning = true, union_by_name = true)"
+        elif dataset_existe(self.diretorio):
+            padrao = os.path.join(self.diretorio, "**", "*.parquet").replace("'", "''")
+            origem = f"read_parquet('{padrao}', hive_partitioning = true, union_by_name = true)"
+        else:
+            caminho = self.caminho_csv.replace("'", "''")
+            origem = f"read_csv_auto('{caminho}')"
+
+        self.conexao.execute(f"""
+            CREATE OR REPLACE VIEW transacoes AS
+            SELECT
+                CAST(DT_LANCAMENTO AS TIMESTAMP) AS DT_LANCAMENTO,
+                CAST(NM_ESFERA AS VARCHAR) AS NM_ESFERA,
+                CAST(CATEGORIA_GASTO AS VARCHAR) AS CATEGORIA_GASTO,
+                CAST(SG_PARTIDO AS VARCHAR) AS SG_PARTIDO,
+                CAST(NM_CONTRAPARTE AS VARCHAR) AS NM_CONTRAPARTE,
+                CAST(VR_LANCAMENTO_NUM AS DOUBLE) AS VR_LANCAMENTO_NUM
+            FROM {origem}
+            WHERE {FILTRO_INFORMADO}
+        """)
+
+    def recarregar(self, arquivos=None):
+        """
+        Descarta as métricas guardadas e refaz cubo e sketches depois que o
+        dataset recebeu lotes novos (a view lê os arquivos a cada consulta;
+        com `arquivos`, ela passa a ler a nova lista de peças).
+        """
+        if arquivos:
+            self._criar_view(arquivos)
+        with self._trava:
+            self._metricas.clear()
+        cubo = self.cubo()
+        if self.aproximado:
+            self.sketches = self.construir_sketches(self.sketches.precisao)
+        return cubo
+
+    def _consultar(self, sql, parametros=None):
+        # Um cursor por consulta: a conexão é compartilhada entre as sessões
+        with self.conexao.cursor() as cursor:
+            return cursor.execute(sql, parametros or []).df()
+
+    def _onde(self, selecao):
+        """
+        Cláusula WHERE da seleção, ignorando dimensões com todos os valores
+        marcados. O período (início, fim) de COLUNA_DATA inclui os dois dias.
+        """
+        condicoes, parametros = [], []
+        for dimensao, valores in (selecao or {}).items():
+            if dimensao == COLUNA_DATA:
+                condicoes.append(f"{COLUNA_DATA} >= ? AND {COLUNA_DATA} < ? + INTERVAL 1 DAY")
+                parametros.extend(pd.Timestamp(data).normalize().to_pydatetime() for data in valores)
+                continue
+            # Sem as opções da dimensão (o cubo ainda não foi consultado), o filtro vale
+            opcoes = self.opcoes.get(dimensao)
+            if opcoes and set(valores).issuperset(opcoes):
+                continue
+            condicoes.append(f"list_contains(?, {dimensao})")
+            parametros.append(list(valores))
+        clausula = "WHERE " + " AND ".join(condicoes) if condicoes else ""
+        return clausula, parametros
+
+    def _colunas(self, colunas, *extras):
+        """Colunas pedidas (todas, por padrão), validadas contra as da view, pois entram no SQL."""
+        colunas = list(colunas or COLUNAS_DASHBOARD)
+        desconhecidas = set(colunas).union(extra for extra in extras if extra) - set(COLUNAS_DASHBOARD)
+        if desconhecidas:
+            raise ValueError(f"Colunas inexistentes: {sorted(desconhecidas)}")
+        return colunas
+
+    def pagina(self, selecao=None, colunas=None, ordem=None, decrescente=False,
+               inicio=0, linhas=LINHAS_POR_PAGINA):
+        colunas = self._colunas(colunas, ordem)
+        onde, parametros = self._onde(selecao)
+        total = int(self._consultar(f"SELECT COUNT(*) AS N FROM transacoes {onde}", parametros)['N'].iloc[0])
+        # As demais colunas desempatam: sem uma ordem total, as páginas de
+        # uma varredura paralela poderiam repetir ou pular linhas
+        sentido = "DESC" if decrescente else "ASC"
+        ordenacao = [f"{ordem} {sentido} NULLS LAST"] if ordem else []
+        ordenacao += [f"{coluna} ASC NULLS LAST" for coluna in COLUNAS_DASHBOARD if coluna != ordem]
+        tabela = self._consultar(f"""
+            SELECT {", ".join(colunas)}
+            FROM transacoes {onde}
+            ORDER BY {", ".join(ordenacao)}
+            LIMIT ? OFFSET ?
+        """, parametros + [int(linhas), int(inicio)])
+        return tabela, total
+
+    def lotes(self, selecao=None, colunas=None, linhas=LINHAS_POR_LOTE):
+        colunas = self._colunas(colunas)
+        onde, parametros = self._onde(selecao)
+        # O resultado é lido em RecordBatches à medida que a consulta avança
+        with self.conexao.cursor() as cursor:
+            leitor = cursor.execute(
+                f"SELECT {', '.join(colunas)} FROM transacoes {onde}", parametros
+            ).to_arrow_reader(linhas)
+            for lote in leitor:
+                yield lote.to_pandas()
+
+    def cubo(self):
+        """Cubo esfera × partido × categoria, idêntico ao construir_cubo do pandas."""
+        dimensoes = ", ".join(DIMENSOES_CUBO)
+        cubo = self._consultar(f"""
+            SELECT {dimensoes},
+                   SUM(VR_LANCAMENTO_NUM) AS VR_LANCAMENTO_NUM,
+                   COUNT(*) AS QTD_TRANSACOES
+            FROM transacoes
+            GROUP BY {dimensoes}
+            ORDER BY {dimensoes}
+        """)
+        self.opcoes = {
+            dimensao: set(cubo[dimensao].dropna()) for dimensao in DIMENSOES_CUBO
+        }
+        return cubo
+
+    def cubo_diario(self):
+        """Cubo esfera × partido × categoria × dia, como serie_temporal.construir_cubo_diario."""
+        dimensoes = ", ".join(DIMENSOES_CUBO)
+        return self._consultar(f"""
+            SELECT {dimensoes},
+                   date_trunc('day', {COLUNA_DATA}) AS DIA,
+                   SUM(VR_LANCAMENTO_NUM) AS VR_LANCAMENTO_NUM,
+                   COUNT(*) AS QTD_TRANSACOES
+            FROM transacoes
+            WHERE {COLUNA_DATA} IS NOT NULL
+            GROUP BY ALL
+            ORDER BY DIA, {dimensoes}
+        """)
+
+    def construir_sketches(self, precisao=PRECISAO_PADRAO):
+        """
+        Sketches HyperLogLog de NM_CONTRAPARTE por célula do cubo, reduzidos
+        no próprio DuckDB a (célula, registrador, maior posto): o mesmo
+        algoritmo de contagem_aproximada, sobre a função hash() do DuckDB.
+        """
+        dimensoes = ", ".join(DIMENSOES_CUBO)
+        mascara = (1 << (64 - precisao)) - 1
+        registros = self._consultar(f"""
+            SELECT {dimensoes},
+                   (h >> {64 - precisao}) AS REGISTRADOR,
+                   MAX(CASE WHEN resto = 0 THEN {BITS_POSTO + 1}
+                            ELSE {BITS_POSTO} - CAST(floor(log2(resto)) AS INTEGER) END) AS POSTO
+            FROM (
+                SELECT {dimensoes}, h, (h & CAST({mascara} AS UBIGINT)) >> {64 - precisao - BITS_POSTO} AS resto
+                FROM (SELECT {dimensoes}, hash(NM_CONTRAPARTE) AS h
+                      FROM transacoes WHERE NM_CONTRAPARTE IS NOT NULL)
+            )
+            GROUP BY ALL
+        """)
+        return SketchesCelulas.de_registros(registros, DIMENSOES_CUBO, precisao)
+
+    def _calcular_metricas(self, selecao):
+        """
+        Mesmo resultado de consultas.agregar_metricas_partido, calculado em SQL
+        numa única varredura: GROUPING SETS produz as linhas por partido e a
+        linha do total geral (fornecedores distintos, período) juntas.
+        """
+        onde, parametros = self._onde(selecao)
+        aproximado = self._usar_sketches(selecao)
+        fornecedores = "0" if aproximado else "COUNT(DISTINCT NM_CONTRAPARTE)"
+        linhas = self._consultar(f"""
+            SELECT SG_PARTIDO,
+                   GROUPING(SG_PARTIDO) AS GERAL,
+                   SUM(VR_LANCAMENTO_NUM) AS TOTAL_GASTO,
+                   COALESCE(SUM(VR_LANCAMENTO_NUM) FILTER (WHERE CATEGORIA_GASTO = ?), 0) AS TOTAL_TARIFAS,
+                   {fornecedores} AS QTD_FORNECEDORES,
+                   COUNT(DT_LANCAMENTO) AS QTD_TRANSACOES,
+                   COUNT(*) AS QTD_LINHAS,
+                   MIN(DT_LANCAMENTO) AS INICIO,
+                   MAX(DT_LANCAMENTO) AS FIM
+            FROM transacoes
+            {onde}
+            GROUP BY GROUPING SETS ((SG_PARTIDO), ())
+            ORDER BY GERAL, SG_PARTIDO
+        """, [CATEGORIA_TARIFAS] + parametros)
+
+        geral = linhas[linhas['GERAL'] == 1].iloc[0]
+        partidos = linhas[linhas['GERAL'] == 0].reset_index(drop=True)
+        partidos['PERC_TARIFAS'] = (partidos['TOTAL_TARIFAS'] / partidos['TOTAL_GASTO']) * 100
+
+        resumo = {
+            'valor_total': float(geral['TOTAL_GASTO']) if pd.notna(geral['TOTAL_GASTO']) else 0.0,
+            'transacoes': int(geral['QTD_LINHAS']),
+            'partidos': len(partidos),
+            'fornecedores': int(geral['QTD_FORNECEDORES']),
+            'inicio': pd.Timestamp(geral['INICIO']),
+            'fim': pd.Timestamp(geral['FIM']),
+        }
+        metricas = {'partidos': partidos[COLUNAS_METRICAS], 'resumo': resumo}
+        if aproximado:
+            return self._contar_fornecedores(metricas, selecao)
+        return metricas
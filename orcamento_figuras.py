@@ -0,0 +1,44 @@
+import plotly.io as pio
+
+# =============================================
+# ORÇAMENTO DE PAYLOAD DAS FIGURAS PLOTLY
+# =============================================
+
+# Tamanho máximo do JSON de uma figura e da soma das figuras da página
+ORCAMENTO_FIGURA_PADRAO = 512 * 1024
+ORCAMENTO_PAGINA_PADRAO = 2 * 1024 * 1024
+
+
+def tamanho_figura(fig):
+    """Tamanho, em bytes, do JSON da figura enviado ao navegador."""
+    return len(pio.to_json(fig, validate=False))
+
+
+def enxugar_figura(fig):
+    """
+    Remove dos traces o customdata que nenhum hovertemplate usa (o Plotly
+    Express o preenche com as colunas de cor/hover mesmo quando o template
+    de hover é substituído depois).
+    """
+    for trace in fig.data:
+        customdata = getattr(trace, 'customdata', None)
+        if customdata is None:
+            continue
+        template = getattr(trace, 'hovertemplate', None) or ''
+        textos = str(getattr(trace, 'texttemplate', None) or '')
+        if 'customdata' not in str(template) and 'customdata' not in textos:
+            trace.customdata = None
+    return fig
+
+
+def construir_no_orcamento(construir, limites, orcamento=ORCAMENTO_FIGURA_PADRAO):
+    """
+    Constrói a figura com cada conjunto de `limites` (do mais generoso ao
+    mais restrito) até que o JSON caiba no orçamento. Se nenhum couber,
+    fica com a versão mais restrita.
+    """
+    for limite in limites:
+        fig = enxugar_figura(construir(**limite))
+        if tamanho_figura(fig) <= orcamento:
+            break
+    return fig
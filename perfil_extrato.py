@@ -0,0 +1,366 @@
+import argparse
+import hashlib
+import io
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from contagem_aproximada import hash_valores
+from ingestao import converter_valor_brasileiro, hash_arquivo
+
+# =============================================
+# PERFIL DO EXTRATO BRUTO (UMA PASSADA, EM BLOCOS)
+# =============================================
+
+LINHAS_POR_BLOCO = 200_000
+
+# Linhas mantidas como amostra e exemplos guardados por coluna crítica
+LINHAS_AMOSTRA = 10
+EXEMPLOS_POR_COLUNA = 5
+
+# Erro relativo dos quantis do VR_LANCAMENTO (sketch de buckets logarítmicos)
+ERRO_QUANTIS = 0.01
+
+COLUNA_VALOR = 'VR_LANCAMENTO'
+COLUNA_PARTIDO = 'SG_PARTIDO'
+COLUNA_TIPO = 'TP_LANCAMENTO'
+COLUNAS_CRITICAS = ['DS_LANCAMENTO', 'NM_CONTRAPARTE', 'DS_FONTE_RECURSO', 'DS_TIPO_OPERACAO']
+
+# Versão do formato do perfil gravado: perfis de outra versão são recalculados
+VERSAO_PERFIL = 1
+
+
+def _somar_series(atual, nova):
+    return nova if atual is None else atual.add(nova, fill_value=0)
+
+
+# ---------------------------------------------
+# Acumuladores mescláveis
+# ---------------------------------------------
+
+class Momentos:
+    """
+    Contagem, soma, média, variância (M2), mínimo e máximo de uma coluna
+    numérica. Dois acumuladores se mesclam pela fórmula de Chan et al.,
+    então blocos podem ser resumidos separadamente e combinados depois.
+    """
+
+    def __init__(self, n=0, media=0.0, m2=0.0, minimo=np.inf, maximo=-np.inf):
+        self.n = n
+        self.media = media
+        self.m2 = m2
+        self.minimo = minimo
+        self.maximo = maximo
+
+    @classmethod
+    def de_valores(cls, valores):
+        valores = valores[~np.isnan(valores)]
+        if len(valores) == 0:
+            return cls()
+        media = valores.mean()
+        return cls(len(valores), media, float(((valores - media) ** 2).sum()), valores.min(), valores.max())
+
+    def mesclar(self, outro):
+        if outro.n == 0:
+            return self
+        if self.n == 0:
+            return outro
+        n = self.n + outro.n
+        delta = outro.media - self.media
+        return Momentos(
+            n,
+            self.media + delta * outro.n / n,
+            self.m2 + outro.m2 + delta * delta * self.n * outro.n / n,
+            min(self.minimo, outro.minimo),
+            max(self.maximo, outro.maximo),
+        )
+
+    def resultado(self):
+        return {
+            'count': self.n,
+            'sum': float(self.media * self.n),
+            'mean': float(self.media) if self.n else None,
+            'std': float(np.sqrt(self.m2 / (self.n - 1))) if self.n > 1 else None,
+            'min': float(self.minimo) if self.n else None,
+            'max': float(self.maximo) if self.n else None,
+        }
+
+
+class Quantis:
+    """
+    Sketch de quantis com erro relativo limitado (no estilo do DDSketch):
+    cada valor cai num bucket logarítmico de razão (1 + erro) / (1 - erro),
+    e só as contagens por bucket (separadas por sinal) são guardadas.
+    Mesclar é somar os buckets.
+    """
+
+    def __init__(self, erro=ERRO_QUANTIS, positivos=None, negativos=None, zeros=0):
+        self.erro = erro
+        self.gama = (1 + erro) / (1 - erro)
+        self.positivos = positivos if positivos is not None else pd.Series(dtype='int64')
+        self.negativos = negativos if negativos is not None else pd.Series(dtype='int64')
+        self.zeros = zeros
+
+    @classmethod
+    def de_valores(cls, valores, erro=ERRO_QUANTIS):
+        sketch = cls(erro)
+        valores = valores[~np.isnan(valores)]
+        sketch.positivos = sketch._contar(valores[valores > 0])
+        sketch.negativos = sketch._contar(-valores[valores < 0])
+        sketch.zeros = int((valores == 0).sum())
+        return sketch
+
+    def _contar(self, modulos):
+        return pd.Series(np.ceil(np.log(modulos) / np.log(self.gama)).astype(np.int64)).value_counts()
+
+    def mesclar(self, outro):
+        return Quantis(
+            self.erro,
+            _somar_series(self.positivos, outro.positivos).astype('int64'),
+            _somar_series(self.negativos, outro.negativos).astype('int64'),
+            self.zeros + outro.zeros,
+        )
+
+    def quantis(self, probabilidades):
+        """Estimativas dos quantis, com erro relativo de até `erro`."""
+        # Representante de cada bucket, em ordem crescente de valor
+        negativos = self.negativos.sort_index(ascending=False)
+        positivos = self.positivos.sort_index()
+        representantes = np.concatenate([
+            -2 * self.gama ** negativos.index.to_numpy(dtype=np.float64) / (self.gama + 1),
+            [0.0] if self.zeros else [],
+            2 * self.gama ** positivos.index.to_numpy(dtype=np.float64) / (self.gama + 1),
+        ])
+        contagens = np.concatenate([negativos.to_numpy(), [self.zeros] if self.zeros else [], positivos.to_numpy()])
+        if contagens.sum() == 0:
+            return [None] * len(probabilidades)
+        acumuladas = np.cumsum(contagens)
+        posicoes = np.searchsorted(acumuladas, np.asarray(probabilidades) * (acumuladas[-1] - 1), side='right')
+        return [float(representantes[min(posicao, len(representantes) - 1)]) for posicao in posicoes]
+
+
+class Distintos:
+    """
+    Valores distintos de uma coluna, guardados como hashes de 64 bits
+    ordenados (8 bytes por valor distinto). Mesclar é a união dos hashes.
+    """
+
+    def __init__(self, hashes=None):
+        self.hashes = hashes if hashes is not None else np.empty(0, dtype=np.uint64)
+
+    @classmethod
+    def de_serie(cls, serie):
+        return cls(np.unique(hash_valores(serie)[0]))
+
+    def mesclar(self, outro):
+        return Distintos(np.union1d(self.hashes, outro.hashes))
+
+    def resultado(self):
+        return len(self.hashes)
+
+
+class AcumuladorPerfil:
+    """
+    Todas as estatísticas do perfil de um bloco do extrato: linhas, valores
+    ausentes por coluna, tipos de lançamento, totais por partido, momentos e
+    quantis do valor, distintos e exemplos das colunas críticas e a amostra.
+    Acumuladores de blocos consecutivos se mesclam na ordem do arquivo.
+    """
+
+    def __init__(self):
+        self.colunas = None
+        self.linhas = 0
+        self.amostra = []
+        self.ausentes = None
+        self.tipos = None
+        self.partidos = None
+        self.valores = Momentos()
+        self.quantis = Quantis()
+        self.distintos = {}
+        self.exemplos = {}
+
+    @classmethod
+    def de_bloco(cls, bloco):
+        perfil = cls()
+        perfil.colunas = list(bloco.columns)
+        perfil.linhas = len(bloco)
+        amostra = bloco.head(LINHAS_AMOSTRA)
+        perfil.amostra = amostra.astype(object).where(amostra.notna(), None).to_dict('records')
+        perfil.ausentes = bloco.isna().sum()
+
+        if COLUNA_TIPO in bloco.columns:
+            perfil.tipos = bloco[COLUNA_TIPO].value_counts()
+        if COLUNA_VALOR in bloco.columns:
+            valores = converter_valor_brasileiro(bloco[COLUNA_VALOR])
+            perfil.valores = Momentos.de_valores(valores.to_numpy(dtype=np.float64))
+            perfil.quantis = Quantis.de_valores(valores.to_numpy(dtype=np.float64))
+            if COLUNA_PARTIDO in bloco.columns:
+                perfil.partidos = valores.groupby(bloco[COLUNA_PARTIDO]).agg(['sum', 'count'])
+
+        for coluna in COLUNAS_CRITICAS:
+            if coluna in bloco.columns:
+                perfil.distintos[coluna] = Distintos.de_serie(bloco[coluna])
+                perfil.exemplos[coluna] = bloco[coluna].dropna().head(EXEMPLOS_POR_COLUNA).tolist()
+        return perfil
+
+    def mesclar(self, outro):
+        """Perfil deste bloco seguido de `outro` (a ordem vale para amostra e exemplos)."""
+        if self.colunas is None:
+            return outro
+        mesclado = AcumuladorPerfil()
+        mesclado.colunas = self.colunas
+        mesclado.linhas = self.linhas + outro.linhas
+        mesclado.amostra = (self.amostra + outro.amostra)[:LINHAS_AMOSTRA]
+        mesclado.ausentes = _somar_series(self.ausentes, outro.ausentes)
+        mesclado.tipos = _somar_series(self.tipos, outro.tipos) if outro.tipos is not None else self.tipos
+        mesclado.partidos = _somar_series(self.partidos, outro.partidos) if outro.partidos is not None else self.partidos
+        mesclado.valores = self.valores.mesclar(outro.valores)
+        mesclado.quantis = self.quantis.mesclar(outro.quantis)
+        for coluna in set(self.distintos) | set(outro.distintos):
+            mesclado.distintos[coluna] = self.distintos.get(coluna, Distintos()).mesclar(outro.distintos.get(coluna, Distintos()))
+            mesclado.exemplos[coluna] = (self.exemplos.get(coluna, []) + outro.exemplos.get(coluna, []))[:EXEMPLOS_POR_COLUNA]
+        return mesclado
+
+    def resultado(self):
+        """Perfil final, serializável em JSON."""
+        descricao = self.valores.resultado()
+        quartis = self.quantis.quantis([0.25, 0.5, 0.75])
+        partidos = self.partidos if self.partidos is not None else pd.DataFrame(columns=['sum', 'count'])
+        return {
+            'linhas': self.linhas,
+            'colunas': self.colunas or [],
+            'amostra': self.amostra,
+            'ausentes': {coluna: int(quantidade) for coluna, quantidade in (self.ausentes if self.ausentes is not None else {}).items()},
+            'tipos': {str(tipo): int(quantidade) for tipo, quantidade in (self.tipos.sort_values(ascending=False) if self.tipos is not None else {}).items()},
+            'partidos': {
+                str(partido): {'valor': float(linha['sum']), 'transacoes': int(linha['count'])}
+                for partido, linha in partidos.iterrows()
+            },
+            'valor': {
+                'count': descricao['count'], 'mean': descricao['mean'], 'std': descricao['std'],
+                'min': descricao['min'], '25%': quartis[0], '50%': quartis[1], '75%': quartis[2],
+                'max': descricao['max'],
+            },
+            'valor_total': descricao['sum'],
+            'distintos': {coluna: distintos.resultado() for coluna, distintos in self.distintos.items()},
+            'exemplos': self.exemplos,
+        }
+
+
+# ---------------------------------------------
+# Passada única e persistência
+# ---------------------------------------------
+
+class _LeituraComHash(io.RawIOBase):
+    """Arquivo lido pelo parser do CSV que calcula o SHA-256 dos bytes no caminho."""
+
+    def __init__(self, arquivo):
+        self.arquivo = arquivo
+        self.sha = hashlib.sha256()
+
+    def readable(self):
+        return True
+
+    def readinto(self, destino):
+        lidos = self.arquivo.readinto(destino)
+        self.sha.update(memoryview(destino)[:lidos])
+        return lidos
+
+
+def perfilar_extrato(caminho, linhas_por_bloco=LINHAS_POR_BLOCO, progresso=None):
+    """
+    Perfil do extrato bruto numa única passada em blocos, mesclando os
+    acumuladores de cada bloco; o hash do conteúdo sai da mesma leitura.
+    `progresso(linhas)` é chamado após cada bloco.
+    """
+    with open(caminho, 'rb') as arquivo:
+        fonte = _LeituraComHash(arquivo)
+        leitor = pd.read_csv(io.BufferedReader(fonte), encoding='latin-1', sep=';', dtype=str,
+                             chunksize=linhas_por_bloco)
+        acumulador = AcumuladorPerfil()
+        for bloco in leitor:
+            acumulador = acumulador.mesclar(AcumuladorPerfil.de_bloco(bloco))
+            if progresso:
+                progresso(acumulador.linhas)
+        # Bytes que o parser não chegou a pedir (ex.: linhas em branco finais)
+        while fonte.read(1 << 20):
+            pass
+        conteudo = fonte.sha.hexdigest()
+
+    perfil = acumulador.resultado()
+    perfil['hash'] = conteudo
+    return perfil
+
+
+def caminho_perfil(caminho):
+    """Arquivo do perfil, ao lado do extrato."""
+    return os.path.splitext(caminho)[0] + ".perfil.json"
+
+
+def _assinatura(caminho):
+    info = os.stat(caminho)
+    return {'tamanho': info.st_size, 'modificado': info.st_mtime_ns, 'versao': VERSAO_PERFIL}
+
+
+def _gravar_perfil(caminho, perfil):
+    destino = caminho_perfil(caminho)
+    temporario = f"{destino}.{os.getpid()}.tmp"
+    try:
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            json.dump(perfil, arquivo, ensure_ascii=False)
+        os.replace(temporario, destino)
+    except OSError:
+        # Sem permissão de escrita, o perfil só fica em memória
+        pass
+
+
+def carregar_perfil(caminho):
+    """
+    Perfil gravado do extrato, se ele ainda corresponde ao arquivo: tamanho
+    e data iguais bastam; senão o hash do conteúdo decide (um arquivo só
+    tocado não é perfilado de novo). Retorna None se é preciso recalcular.
+    """
+    try:
+        with open(caminho_perfil(caminho), encoding='utf-8') as arquivo:
+            perfil = json.load(arquivo)
+    except (OSError, ValueError):
+        return None
+
+    assinatura = _assinatura(caminho)
+    if perfil.get('assinatura') == assinatura:
+        return perfil
+    if perfil.get('assinatura', {}).get('versao') != VERSAO_PERFIL or hash_arquivo(caminho) != perfil.get('hash'):
+        return None
+    perfil['assinatura'] = assinatura
+    _gravar_perfil(caminho, perfil)
+    return perfil
+
+
+def gerar_perfil(caminho, linhas_por_bloco=LINHAS_POR_BLOCO, progresso=None):
+    """Calcula o perfil do extrato e o grava ao lado dele."""
+    assinatura = _assinatura(caminho)
+    perfil = perfilar_extrato(caminho, linhas_por_bloco, progresso)
+    perfil['assinatura'] = assinatura
+    _gravar_perfil(caminho, perfil)
+    return perfil
+
+
+def obter_perfil(caminho, linhas_por_bloco=LINHAS_POR_BLOCO, progresso=None):
+    """Perfil do extrato: o gravado, se em dia, ou um novo."""
+    perfil = carregar_perfil(caminho)
+    if perfil is not None:
+        return perfil
+    return gerar_perfil(caminho, linhas_por_bloco, progresso)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera o perfil do extrato bruto usado pela análise exploratória.")
+    parser.add_argument('arquivos', nargs='+')
+    parser.add_argument('--linhas-por-bloco', type=int, default=LINHAS_POR_BLOCO)
+    args = parser.parse_args()
+
+    for caminho in args.arquivos:
+        perfil = obter_perfil(caminho, args.linhas_por_bloco)
+        print(f"{caminho}: {perfil['linhas']:,} linhas perfiladas em {caminho_perfil(caminho)}")
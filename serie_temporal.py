@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+
+from cubo import DIMENSOES_CUBO
+
+# =============================================
+# ÍNDICE DE DATAS E AGREGADOS DIÁRIOS/MENSAIS
+# =============================================
+
+COLUNA_DATA = 'DT_LANCAMENTO'
+
+
+def ordenar_por_data(dados):
+    """
+    Ordena as transações por data (as sem data ao final), de modo que
+    qualquer período seja uma fatia contínua do frame, localizada por busca
+    binária. Um frame já ordenado é devolvido sem cópia.
+    """
+    datas = dados[COLUNA_DATA]
+    validas = int(datas.notna().sum())
+    if datas.iloc[:validas].notna().all() and datas.iloc[:validas].is_monotonic_increasing:
+        return dados
+    return dados.sort_values(COLUNA_DATA, kind='stable', na_position='last', ignore_index=True)
+
+
+def separar_periodo(selecao):
+    """Separa da seleção o período (início, fim) de COLUNA_DATA, se houver."""
+    if not selecao or COLUNA_DATA not in selecao:
+        return selecao, None
+    restante = {dimensao: valores for dimensao, valores in selecao.items() if dimensao != COLUNA_DATA}
+    return restante, selecao[COLUNA_DATA]
+
+
+def limites_periodo(datas, inicio, fim):
+    """
+    Posições [i, j) das datas (ordenadas) entre os dias `inicio` e `fim`,
+    inclusive, por busca binária.
+    """
+    datas = np.asarray(datas, dtype='datetime64[ns]')
+    inicio = np.datetime64(pd.Timestamp(inicio).normalize(), 'ns')
+    fim = np.datetime64(pd.Timestamp(fim).normalize() + pd.Timedelta(days=1), 'ns')
+    return int(np.searchsorted(datas, inicio, 'left')), int(np.searchsorted(datas, fim, 'left'))
+
+
+# ---------------------------------------------
+# Agregados por dia e por mês
+# ---------------------------------------------
+
+def construir_cubo_diario(dados):
+    """Cubo esfera × partido × categoria × dia, ordenado pelo dia."""
+    cubo = dados.assign(DIA=dados[COLUNA_DATA].dt.normalize()).groupby(
+        ['DIA'] + DIMENSOES_CUBO, observed=True
+    ).agg(
+        VR_LANCAMENTO_NUM=('VR_LANCAMENTO_NUM', 'sum'),
+        QTD_TRANSACOES=('VR_LANCAMENTO_NUM', 'size')
+    ).reset_index()
+    return cubo[DIMENSOES_CUBO + ['DIA', 'VR_LANCAMENTO_NUM', 'QTD_TRANSACOES']]
+
+
+def fatiar_cubo_diario(cubo_diario, inicio, fim):
+    """Linhas do cubo diário no período, sem máscara booleana sobre o cubo inteiro."""
+    i, j = limites_periodo(cubo_diario['DIA'].to_numpy(), inicio, fim)
+    return cubo_diario.iloc[i:j]
+
+
+def cubo_no_periodo(cubo_diario, inicio, fim):
+    """Cubo esfera × partido × categoria restrito ao período."""
+    return fatiar_cubo_diario(cubo_diario, inicio, fim).groupby(
+        DIMENSOES_CUBO, observed=True
+    )[['VR_LANCAMENTO_NUM', 'QTD_TRANSACOES']].sum().reset_index()
+
+
+def agregar_mensal(cubo_diario):
+    """Cubo esfera × partido × categoria × mês (primeiro dia do mês) a partir do diário."""
+    mes = cubo_diario['DIA'].dt.to_period('M').dt.to_timestamp()
+    return cubo_diario.assign(MES=mes).groupby(
+        ['MES'] + DIMENSOES_CUBO, observed=True
+    )[['VR_LANCAMENTO_NUM', 'QTD_TRANSACOES']].sum().reset_index()
+
+
+def somar_cubos_diarios(cubo_diario, delta):
+    """Atualiza o cubo diário com o de um lote novo, mantendo a ordem por dia."""
+    cubo = pd.concat([cubo_diario, delta], ignore_index=True)
+    for dimensao in DIMENSOES_CUBO:
+        cubo[dimensao] = cubo[dimensao].astype(object)
+    return cubo.groupby(['DIA'] + DIMENSOES_CUBO, dropna=False).agg(
+        VR_LANCAMENTO_NUM=('VR_LANCAMENTO_NUM', 'sum'),
+        QTD_TRANSACOES=('QTD_TRANSACOES', 'sum')
+    ).reset_index()[DIMENSOES_CUBO + ['DIA', 'VR_LANCAMENTO_NUM', 'QTD_TRANSACOES']]
@@ -0,0 +1,87 @@
+import os
+import sys
+
+# Os módulos do dashboard ficam na raiz do repositório
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Mesmas opções do pandas do servidor (ver final.py)
+pd.set_option('mode.copy_on_write', True)
+
+
+@pytest.fixture(scope='session')
+def dataset(tmp_path_factory):
+    """Dataset Parquet de um extrato sintético, no formato do dashboard."""
+    from armazenamento import converter_csv_para_parquet
+    from benchmark import gerar_extrato
+
+    raiz = tmp_path_factory.mktemp('dataset')
+    caminho_csv = str(raiz / 'extrato.csv')
+    diretorio = str(raiz / 'extrato.parquet')
+    gerar_extrato(caminho_csv, 3000, semente=0)
+    converter_csv_para_parquet(caminho_csv, diretorio)
+    return caminho_csv, diretorio
+
+
+@pytest.fixture(scope='session')
+def consultas_pandas(dataset):
+    from armazenamento import ler_dataset, preparar_dados
+    from consultas import ConsultasPandas
+    from indice_bitmap import IndiceBitmap
+
+    dados = preparar_dados(ler_dataset(dataset[1]))
+    return ConsultasPandas(dados, IndiceBitmap(dados))
+
+
+@pytest.fixture(scope='session')
+def motor_duckdb(dataset):
+    pytest.importorskip('duckdb')
+    from motor_duckdb import MotorDuckDB
+
+    return MotorDuckDB(dataset[1], caminho_csv=dataset[0])
+
+
+def normalizar(quadro):
+    """Frame comparável entre motores e formatos: textos, datas em ns e sem índice."""
+    colunas = {}
+    for coluna in quadro.columns:
+        if coluna == 'DT_LANCAMENTO':
+            colunas[coluna] = pd.to_datetime(quadro[coluna]).astype('datetime64[ns]')
+        elif coluna == 'VR_LANCAMENTO_NUM':
+            colunas[coluna] = quadro[coluna].astype('float64')
+        else:
+            colunas[coluna] = quadro[coluna].astype(str)
+    return pd.DataFrame(colunas).reset_index(drop=True)
+
+
+def mesmas_linhas(quadro, esperado):
+    """As mesmas linhas, em qualquer ordem."""
+    quadro, esperado = normalizar(quadro), normalizar(esperado)
+    ordem = list(esperado.columns)
+    pd.testing.assert_frame_equal(
+        quadro.sort_values(ordem, kind='stable').reset_index(drop=True),
+        esperado.sort_values(ordem, kind='stable').reset_index(drop=True)
+    )
+
+
+def extrato_bruto(linhas, semente=0, ano=2020):
+    """Extrato no formato original do TSE, com valores em formato brasileiro."""
+    gerador = np.random.default_rng(semente)
+    valores = gerador.integers(1, 1_000_000, linhas) / 100
+    return pd.DataFrame({
+        'DT_LANCAMENTO': (pd.Timestamp(f'{ano}-01-01') + pd.to_timedelta(gerador.integers(0, 365, linhas), unit='D'))
+        .strftime('%d/%m/%Y'),
+        'DS_ESFERA_PARTIDARIA': gerador.choice(['Nacional', 'Estadual', 'Municipal'], linhas),
+        'SG_PARTIDO': gerador.choice(['PT', 'PSL', 'MDB', 'PSOL'], linhas),
+        'NM_CONTRAPARTE': [f'FORNECEDOR {i}' for i in gerador.integers(0, linhas // 4 + 1, linhas)],
+        'VR_LANCAMENTO': [f'{valor:,.2f}'.replace(',', '_').replace('.', ',').replace('_', '.') for valor in valores],
+        'DS_LANCAMENTO': gerador.choice(['PAGTO BOLETO', 'TARIFA BANCARIA', 'TED ENVIADA', 'SALARIO'], linhas),
+    })
+
+
+def gravar_extrato_bruto(caminho, extrato):
+    extrato.to_csv(caminho, sep=';', index=False, encoding='latin-1')
+    return str(caminho)
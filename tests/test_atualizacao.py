@@ -0,0 +1,92 @@
+import pandas as pd
+import pytest
+
+from armazenamento import DIRETORIO_PARQUET, abrir_dataset, ler_dataset
+from atualizacao import anexar_lote, carregar_lotes
+from conftest import extrato_bruto, gravar_extrato_bruto, mesmas_linhas
+from ingestao import ingerir_arquivo
+
+
+def contar_linhas(diretorio):
+    return abrir_dataset(diretorio).count_rows()
+
+
+def test_anexar_depois_de_reingerir(tmp_path):
+    diretorio = str(tmp_path / 'dataset')
+    extrato = extrato_bruto(1000)
+    caminho = gravar_extrato_bruto(tmp_path / 'extrato_bancario_partido_2020.csv', extrato)
+
+    ingerir_arquivo(caminho, diretorio)
+    # Anexar o próprio extrato não acrescenta nada, mas monta o índice de hashes
+    assert anexar_lote(caminho, diretorio, bruto=True)['linhas_novas'] == 0
+
+    # Nova versão da fonte sem 200 linhas, que depois chegam num lote
+    gravar_extrato_bruto(caminho, extrato.iloc[200:])
+    ingerir_arquivo(caminho, diretorio)
+    assert contar_linhas(diretorio) == 800
+    lote = gravar_extrato_bruto(tmp_path / 'lote_2020.csv', extrato.iloc[:200])
+
+    assert anexar_lote(lote, diretorio, bruto=True)['linhas_novas'] == 200
+    assert contar_linhas(diretorio) == 1000
+
+
+def test_lotes_continuam_depois_de_reingerir(tmp_path):
+    diretorio = str(tmp_path / 'dataset')
+    caminho = gravar_extrato_bruto(tmp_path / 'extrato_bancario_partido_2020.csv', extrato_bruto(300))
+    ingerir_arquivo(caminho, diretorio)
+    lote = anexar_lote(gravar_extrato_bruto(tmp_path / 'lote_2020.csv', extrato_bruto(50, semente=7)),
+                       diretorio, bruto=True)
+
+    gravar_extrato_bruto(caminho, extrato_bruto(100, semente=8))
+    ingerir_arquivo(caminho, diretorio)
+
+    assert [registro['id'] for registro in carregar_lotes(diretorio)] == [lote['id']]
+    assert contar_linhas(diretorio) == 150
+
+
+def test_anexar_igual_a_reconstruir(tmp_path):
+    extrato, novas = extrato_bruto(400, semente=1), extrato_bruto(150, semente=2)
+    # O lote repete 100 linhas já gravadas e traz 150 novas
+    lote = pd.concat([extrato.iloc[:100], novas], ignore_index=True)
+    diretorio = str(tmp_path / 'dataset')
+    ingerir_arquivo(gravar_extrato_bruto(tmp_path / 'extrato_bancario_partido_2020.csv', extrato), diretorio)
+    caminho_lote = gravar_extrato_bruto(tmp_path / 'lote_2020.csv', lote)
+
+    registro = anexar_lote(caminho_lote, diretorio, bruto=True)
+    assert (registro['linhas_lidas'], registro['linhas_novas']) == (250, 150)
+
+    reconstruido = str(tmp_path / 'reconstruido')
+    (tmp_path / 'completo').mkdir()
+    completo = pd.concat([extrato, novas], ignore_index=True)
+    ingerir_arquivo(gravar_extrato_bruto(tmp_path / 'completo' / 'extrato_bancario_partido_2020.csv', completo),
+                    reconstruido)
+    mesmas_linhas(ler_dataset(diretorio), ler_dataset(reconstruido))
+
+    # O mesmo lote de novo não acrescenta nada
+    repetido = anexar_lote(caminho_lote, diretorio, bruto=True)
+    assert (repetido['linhas_novas'], repetido['arquivos']) == (0, [])
+    assert contar_linhas(diretorio) == 550
+
+
+def test_atualizar_base_igual_a_carregar_de_novo(tmp_path, monkeypatch):
+    final = pytest.importorskip('final')
+    monkeypatch.chdir(tmp_path)
+    ingerir_arquivo(gravar_extrato_bruto(tmp_path / 'extrato_bancario_partido_2020.csv', extrato_bruto(500)),
+                    DIRETORIO_PARQUET)
+    final.carregar_base.clear()
+    base = dict(final.carregar_base(True))
+
+    anexar_lote(gravar_extrato_bruto(tmp_path / 'lote_2020.csv', extrato_bruto(120, semente=9)),
+                DIRETORIO_PARQUET, bruto=True)
+    assert final.atualizar_base(base, final.particoes_selecionadas())
+    final.carregar_base.clear()
+    completa = final.carregar_base(True)
+    final.carregar_base.clear()
+
+    mesmas_linhas(base['dados'], completa['dados'])
+    for cubo in ['cubo', 'cubo_diario', 'cubo_mensal']:
+        mesmas_linhas(base[cubo], completa[cubo])
+    resumo, esperado = base['consultas'].resumo(), completa['consultas'].resumo()
+    assert resumo.keys() == esperado.keys()
+    for chave, valor in esperado.items():
+        assert resumo[chave] == (pytest.approx(valor) if isinstance(valor, float) else valor)
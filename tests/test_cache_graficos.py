@@ -0,0 +1,128 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import plotly.graph_objects as go
+import pytest
+
+from cache_graficos import USOS_PARA_DISCO, CacheGraficos, chave_selecao
+
+
+def figura(pontos=3):
+    return go.Figure(go.Bar(y=list(range(pontos))))
+
+
+class Contador:
+    """Construtor de figuras que conta as chamadas."""
+
+    def __init__(self, pontos=3, espera=0.0):
+        self.pontos = pontos
+        self.espera = espera
+        self.chamadas = 0
+
+    def __call__(self):
+        self.chamadas += 1
+        time.sleep(self.espera)
+        return figura(self.pontos)
+
+
+def test_chave_selecao_ignora_a_ordem():
+    assert chave_selecao('v1', ['B', 'A'], ['X'], ['PT', 'MDB']) == chave_selecao('v1', ['A', 'B'], ['X'], ['MDB', 'PT'])
+    assert chave_selecao('v1', ['A'], [], []) != chave_selecao('v2', ['A'], [], [])
+
+
+def test_despeja_o_menos_usado_recentemente():
+    cache = CacheGraficos(max_entradas=2)
+    construtores = {chave: Contador() for chave in 'abc'}
+    cache.obter('a', construtores['a'])
+    cache.obter('b', construtores['b'])
+    cache.obter('a', construtores['a'])
+    cache.obter('c', construtores['c'])
+
+    assert cache.tamanho('b') == 0
+    assert cache.tamanho('a') > 0 and cache.tamanho('c') > 0
+    cache.obter('a', construtores['a'])
+    assert construtores['a'].chamadas == 1
+    cache.obter('b', construtores['b'])
+    assert construtores['b'].chamadas == 2
+    assert cache.estatisticas()['despejos'] == 2
+
+
+def test_orcamento_de_bytes():
+    cache = CacheGraficos()
+    cache.obter('pequena', Contador(3))
+    cache.orcamento_bytes = cache.tamanho('pequena') * 2
+    cache.obter('grande', Contador(500))
+
+    estatisticas = cache.estatisticas()
+    assert cache.tamanho('pequena') == 0
+    # A entrada mais recente fica mesmo acima do orçamento
+    assert estatisticas['entradas'] == 1 and estatisticas['bytes'] == cache.tamanho('grande')
+
+
+def test_camada_em_disco_sobrevive_ao_reinicio(tmp_path):
+    diretorio = str(tmp_path / 'figuras')
+    construir = Contador()
+    cache = CacheGraficos(diretorio_disco=diretorio)
+    original = cache.obter('a', construir)
+    assert os.listdir(diretorio) == []
+    for _ in range(USOS_PARA_DISCO - 1):
+        cache.obter('a', construir)
+    assert [nome for nome in os.listdir(diretorio) if not nome.endswith('.json')] == []
+
+    # Outro processo: a figura vem do disco, sem construir
+    reiniciado = CacheGraficos(diretorio_disco=diretorio)
+    recuperada = reiniciado.obter('a', construir)
+    assert construir.chamadas == 1
+    assert recuperada.to_plotly_json() == original.to_plotly_json()
+    assert reiniciado.estatisticas()['acertos_disco'] == 1
+
+
+def test_disco_podado_pelo_orcamento(tmp_path):
+    diretorio = str(tmp_path / 'figuras')
+    cache = CacheGraficos(diretorio_disco=diretorio)
+    for chave in 'ab':
+        for _ in range(USOS_PARA_DISCO):
+            cache.obter(chave, Contador())
+    assert len(os.listdir(diretorio)) == 2
+
+    cache.orcamento_disco_bytes = cache.tamanho('a')
+    for _ in range(USOS_PARA_DISCO):
+        cache.obter('c', Contador())
+    assert len(os.listdir(diretorio)) == 1
+
+
+def test_falhas_simultaneas_constroem_uma_vez():
+    cache = CacheGraficos()
+    construir = Contador(espera=0.2)
+    with ThreadPoolExecutor(8) as executor:
+        figuras = list(executor.map(lambda _: cache.obter('a', construir), range(8)))
+
+    assert construir.chamadas == 1
+    assert all(figura is figuras[0] for figura in figuras)
+    estatisticas = cache.estatisticas()
+    assert (estatisticas['falhas'], estatisticas['esperas']) == (1, 7)
+
+
+def test_erro_repassado_a_quem_espera():
+    cache = CacheGraficos()
+    iniciada = threading.Event()
+
+    def falhar():
+        iniciada.set()
+        time.sleep(0.2)
+        raise ValueError('falhou')
+
+    with ThreadPoolExecutor(2) as executor:
+        primeiro = executor.submit(cache.obter, 'a', falhar)
+        iniciada.wait()
+        segundo = executor.submit(cache.obter, 'a', Contador())
+        for futuro in [primeiro, segundo]:
+            with pytest.raises(ValueError):
+                futuro.result()
+
+    # Nada ficou em construção: o próximo pedido constrói de novo
+    construir = Contador()
+    cache.obter('a', construir)
+    assert construir.chamadas == 1
@@ -0,0 +1,102 @@
+import os
+
+import pandas as pd
+import pytest
+
+import catalogo
+from armazenamento import abrir_dataset, ler_dataset
+from atualizacao import anexar_lote
+from catalogo import caminho_catalogo, carregar_catalogo, selecionar_particoes, versao_particoes
+from conftest import extrato_bruto, gravar_extrato_bruto
+from ingestao import ingerir_arquivo
+
+
+@pytest.fixture
+def diretorio(tmp_path):
+    diretorio = str(tmp_path / 'dataset')
+    for ano in [2020, 2021]:
+        caminho = gravar_extrato_bruto(tmp_path / f'extrato_bancario_partido_{ano}.csv',
+                                       extrato_bruto(400, semente=ano, ano=ano))
+        ingerir_arquivo(caminho, diretorio)
+    return diretorio
+
+
+@pytest.fixture
+def leituras(monkeypatch):
+    """Peças cujo rodapé foi lido a cada carregamento do catálogo."""
+    lidas = []
+    original = catalogo._estatisticas_peca
+
+    def contar(caminho, relativo, info):
+        lidas.append(relativo)
+        return original(caminho, relativo, info)
+
+    monkeypatch.setattr(catalogo, '_estatisticas_peca', contar)
+    return lidas
+
+
+def por_nome(particoes):
+    return {particao['nome']: particao for particao in particoes}
+
+
+def test_catalogo_igual_ao_dataset(diretorio):
+    dados = ler_dataset(diretorio)
+    particoes = carregar_catalogo(diretorio)
+    assert [particao['nome'] for particao in particoes] == ['2020', '2021']
+    for particao in particoes:
+        do_ano = dados[dados['DT_LANCAMENTO'].dt.year == int(particao['ano'])]
+        assert particao['linhas'] == len(do_ano)
+        assert particao['inicio'] == do_ano['DT_LANCAMENTO'].min()
+        assert particao['fim'] == do_ano['DT_LANCAMENTO'].max()
+        assert particao['partidos'] == sorted(do_ano['SG_PARTIDO'].astype(str).unique())
+    assert sum(particao['linhas'] for particao in particoes) == abrir_dataset(diretorio).count_rows()
+
+
+def test_rodapes_lidos_uma_vez(diretorio, leituras):
+    primeiro = carregar_catalogo(diretorio)
+    assert os.path.exists(caminho_catalogo(diretorio))
+    assert len(leituras) == sum(len(particao['arquivos']) for particao in primeiro)
+
+    leituras.clear()
+    assert carregar_catalogo(diretorio) == primeiro
+    assert leituras == []
+
+
+def test_lote_invalida_so_a_particao_alterada(tmp_path, diretorio, leituras):
+    antes = por_nome(carregar_catalogo(diretorio))
+    leituras.clear()
+
+    lote = gravar_extrato_bruto(tmp_path / 'lote_2021.csv', extrato_bruto(60, semente=5, ano=2021))
+    registro = anexar_lote(lote, diretorio, bruto=True)
+    depois = por_nome(carregar_catalogo(diretorio))
+
+    # Só as peças do lote têm o rodapé lido
+    assert sorted(leituras) == sorted(os.path.normpath(arquivo) for arquivo in registro['arquivos'])
+    assert depois['2020'] == antes['2020']
+    assert depois['2021']['versao'] != antes['2021']['versao']
+    assert depois['2021']['linhas'] == antes['2021']['linhas'] + registro['linhas_novas']
+    assert versao_particoes(selecionar_particoes(list(depois.values()), ['2020'])) == \
+        versao_particoes(selecionar_particoes(list(antes.values()), ['2020']))
+
+
+def test_peca_alterada_ou_removida(diretorio, leituras):
+    antes = por_nome(carregar_catalogo(diretorio))
+    leituras.clear()
+    relativo = antes['2020']['arquivos'][0]
+    arquivo = os.path.join(diretorio, relativo)
+
+    # Regravar a peça com menos linhas muda tamanho e mtime
+    pd.read_parquet(arquivo).iloc[:1].to_parquet(arquivo, index=False)
+    alterado = por_nome(carregar_catalogo(diretorio))
+    assert leituras == [relativo]
+    assert alterado['2020']['versao'] != antes['2020']['versao']
+    assert alterado['2020']['linhas'] < antes['2020']['linhas']
+    assert alterado['2021'] == antes['2021']
+
+    leituras.clear()
+    os.remove(arquivo)
+    removido = por_nome(carregar_catalogo(diretorio))
+    assert leituras == []
+    assert relativo not in removido['2020']['arquivos']
+    assert removido['2020']['versao'] not in {antes['2020']['versao'], alterado['2020']['versao']}
+    assert removido['2021'] == antes['2021']
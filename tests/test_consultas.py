@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import mesmas_linhas, normalizar
+from consultas import Consultas, menores_primeiro
+
+PERIODO = (pd.Timestamp('2020-03-01'), pd.Timestamp('2020-08-31'))
+
+SELECOES = [
+    None,
+    {'SG_PARTIDO': ['PT', 'PSL']},
+    {'NM_ESFERA': ['ESTADUAL'], 'DT_LANCAMENTO': PERIODO},
+]
+
+ORDENS = ['VR_LANCAMENTO_NUM', 'DT_LANCAMENTO', 'SG_PARTIDO', 'NM_CONTRAPARTE']
+
+
+def paginas(consultas, selecao, ordem, decrescente, linhas=500):
+    """Todas as páginas da seleção, na ordem, e o total informado."""
+    primeira, total = consultas.pagina(selecao, None, ordem, decrescente, 0, linhas)
+    resto = [consultas.pagina(selecao, None, ordem, decrescente, inicio, linhas)[0]
+             for inicio in range(linhas, total, linhas)]
+    return [primeira] + resto, total
+
+
+@pytest.mark.parametrize('selecao', SELECOES)
+@pytest.mark.parametrize('ordem', ORDENS)
+@pytest.mark.parametrize('decrescente', [False, True])
+def test_pagina_igual_nos_dois_motores(consultas_pandas, motor_duckdb, selecao, ordem, decrescente):
+    # Os empates podem sair em ordens diferentes (frame x demais colunas):
+    # a coluna ordenada é igual página a página e as linhas, no conjunto
+    paginas_pandas, total = paginas(consultas_pandas, selecao, ordem, decrescente)
+    paginas_duckdb, total_duckdb = paginas(motor_duckdb, selecao, ordem, decrescente)
+
+    assert total_duckdb == total == len(consultas_pandas.filtrar(selecao))
+    assert [len(pagina) for pagina in paginas_duckdb] == [len(pagina) for pagina in paginas_pandas]
+    for pagina_pandas, pagina_duckdb in zip(paginas_pandas, paginas_duckdb):
+        pd.testing.assert_series_equal(normalizar(pagina_duckdb)[ordem], normalizar(pagina_pandas)[ordem])
+    mesmas_linhas(pd.concat(paginas_duckdb), pd.concat(paginas_pandas))
+
+
+def test_pagina_ordenada_como_sort_values(consultas_pandas):
+    selecao = SELECOES[1]
+    esperado = consultas_pandas.filtrar(selecao).sort_values(
+        'VR_LANCAMENTO_NUM', ascending=False, kind='stable', na_position='last'
+    )
+    pagina, total = consultas_pandas.pagina(selecao, None, 'VR_LANCAMENTO_NUM', True, 100, 50)
+    assert total == len(esperado)
+    assert pagina.index.equals(esperado.index[100:150])
+
+
+def test_pagina_alem_do_fim(consultas_pandas, motor_duckdb):
+    for consultas in (consultas_pandas, motor_duckdb):
+        pagina, total = consultas.pagina(None, None, 'VR_LANCAMENTO_NUM', False, 10_000, 50)
+        assert len(pagina) == 0 and total > 0
+
+
+@pytest.mark.parametrize('quantidade', [0, 1, 7, 50, 200])
+def test_menores_primeiro_como_ordenacao_estavel(quantidade):
+    chave = np.random.default_rng(0).integers(0, 20, 200).astype(np.float64)
+    esperado = np.argsort(chave, kind='stable')[:quantidade]
+    np.testing.assert_array_equal(menores_primeiro(chave, quantidade), esperado)
+
+
+def test_motor_incompleto_nao_e_instanciado():
+    class SemLotes(Consultas):
+        def _calcular_metricas(self, selecao):
+            return {}
+
+        def pagina(self, selecao=None, colunas=None, ordem=None, decrescente=False, inicio=0, linhas=50):
+            return None, 0
+
+    with pytest.raises(TypeError, match='lotes'):
+        SemLotes()
+    with pytest.raises(TypeError):
+        Consultas()
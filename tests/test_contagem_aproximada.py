@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from contagem_aproximada import PRECISAO_PADRAO, SketchesCelulas, _posicoes, erro_padrao, hash_valores
+
+CARDINALIDADES = [10, 100, 1_000, 5_000, 20_000, 100_000]
+
+
+def fornecedores(quantidade, semente):
+    return pd.Series([f'FORNECEDOR {semente}-{i}' for i in range(quantidade)])
+
+
+def contar(valores, precisao=PRECISAO_PADRAO):
+    dados = pd.DataFrame({'CELULA': 'unica', 'NM_CONTRAPARTE': valores})
+    return SketchesCelulas.de_transacoes(dados, ['CELULA'], precisao=precisao).contar()
+
+
+@pytest.mark.parametrize('precisao', [10, PRECISAO_PADRAO])
+def test_erro_dentro_do_limite(precisao):
+    erro = erro_padrao(precisao)
+    relativos = []
+    for quantidade in CARDINALIDADES:
+        for semente in range(4):
+            # Repetições não mudam a contagem de distintos
+            valores = pd.concat([fornecedores(quantidade, semente)] * 2, ignore_index=True)
+            estimativa = contar(valores, precisao)
+            assert abs(estimativa - quantidade) <= max(3 * erro * quantidade, 2)
+            relativos.append(abs(estimativa - quantidade) / quantidade)
+    # Cerca de 95% das contagens ficam a até dois erros padrão
+    assert np.mean(np.array(relativos) <= 2 * erro) >= 0.9
+
+
+def test_categoricas_e_texto_contam_igual():
+    valores = fornecedores(3_000, 0)
+    assert contar(valores) == contar(valores.astype('category'))
+    assert contar(pd.Series([None, None], dtype=object)) == 0
+
+
+@pytest.fixture(scope='module')
+def dados(consultas_pandas):
+    return consultas_pandas.dados
+
+
+@pytest.fixture(scope='module')
+def sketches(dados):
+    return SketchesCelulas.de_transacoes(dados, ['NM_ESFERA', 'CATEGORIA_GASTO', 'SG_PARTIDO'])
+
+
+def test_contar_selecao(dados, sketches):
+    erro = erro_padrao()
+    selecoes = [None, {'SG_PARTIDO': ['PT', 'PSL']}, {'NM_ESFERA': ['ESTADUAL'], 'CATEGORIA_GASTO': ['PESSOAL']}]
+    for selecao in selecoes:
+        mascara = np.ones(len(dados), dtype=bool)
+        for dimensao, valores in (selecao or {}).items():
+            mascara &= dados[dimensao].isin(valores).to_numpy()
+        exato = dados.loc[mascara, 'NM_CONTRAPARTE'].nunique()
+        assert abs(sketches.contar(selecao) - exato) <= max(3 * erro * exato, 2)
+    assert sketches.contar({'SG_PARTIDO': ['INEXISTENTE']}) == 0
+
+
+def test_contar_por(dados, sketches):
+    erro = erro_padrao()
+    exato = dados.groupby('SG_PARTIDO', observed=True)['NM_CONTRAPARTE'].nunique()
+    aproximado = sketches.contar_por('SG_PARTIDO')
+    assert list(aproximado.index) == sorted(exato.index)
+    for partido, quantidade in exato.items():
+        assert abs(aproximado[partido] - quantidade) <= max(3 * erro * quantidade, 2)
+
+
+def test_mesclar_igual_a_construir_de_tudo(dados):
+    dimensoes = ['NM_ESFERA', 'SG_PARTIDO']
+    metade = len(dados) // 2
+    mesclados = SketchesCelulas.de_transacoes(dados.iloc[:metade], dimensoes).mesclar(
+        SketchesCelulas.de_transacoes(dados.iloc[metade:], dimensoes)
+    )
+    completos = SketchesCelulas.de_transacoes(dados, dimensoes)
+
+    pd.testing.assert_frame_equal(mesclados.celulas.astype(object), completos.celulas.astype(object))
+    np.testing.assert_array_equal(mesclados.registradores, completos.registradores)
+
+
+def test_de_registros_igual_a_de_transacoes(dados):
+    dimensoes = ['NM_ESFERA', 'SG_PARTIDO']
+    hashes, validos = hash_valores(dados['NM_CONTRAPARTE'])
+    registrador, posto = _posicoes(hashes, PRECISAO_PADRAO)
+    registros = dados.loc[validos, dimensoes].assign(REGISTRADOR=registrador, POSTO=posto)
+    registros = registros.groupby(dimensoes + ['REGISTRADOR'], observed=True)['POSTO'].max().reset_index()
+
+    np.testing.assert_array_equal(
+        SketchesCelulas.de_registros(registros, dimensoes).registradores,
+        SketchesCelulas.de_transacoes(dados, dimensoes).registradores
+    )
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from armazenamento import COLUNAS_CATEGORICAS, compactar_dados
+from cubo import DIMENSOES_CUBO, agrupar_cauda, construir_cubo, filtrar_cubo, resumo_cubo, somar_cubos
+
+
+@pytest.fixture(scope='module')
+def dados(consultas_pandas):
+    return consultas_pandas.dados
+
+
+@pytest.fixture(scope='module')
+def texto(dados):
+    """O mesmo frame com as colunas de texto como objetos Python."""
+    return dados.astype({coluna: object for coluna in COLUNAS_CATEGORICAS})
+
+
+def agrupar(texto):
+    """Referência: group-by direto sobre as transações em texto."""
+    return texto.groupby(DIMENSOES_CUBO).agg(
+        VR_LANCAMENTO_NUM=('VR_LANCAMENTO_NUM', 'sum'),
+        QTD_TRANSACOES=('VR_LANCAMENTO_NUM', 'size')
+    ).reset_index()
+
+
+def comparar_cubos(cubo, esperado):
+    cubo = cubo.astype({dimensao: object for dimensao in DIMENSOES_CUBO})
+    cubo = cubo.sort_values(DIMENSOES_CUBO, ignore_index=True)
+    esperado = esperado.sort_values(DIMENSOES_CUBO, ignore_index=True)
+    pd.testing.assert_frame_equal(cubo[esperado.columns], esperado, check_dtype=False)
+
+
+def test_compactar_dados_preserva_os_valores(texto):
+    compacto = compactar_dados(texto.copy())
+    for coluna in COLUNAS_CATEGORICAS:
+        assert isinstance(compacto[coluna].dtype, pd.CategoricalDtype)
+        assert compacto[coluna].cat.categories.is_monotonic_increasing
+        assert (compacto[coluna].astype(object) == texto[coluna]).all()
+
+
+def test_cubo_igual_ao_groupby(dados, texto):
+    comparar_cubos(construir_cubo(dados), agrupar(texto))
+
+
+def test_filtrar_cubo_igual_a_filtrar_as_transacoes(dados, texto):
+    esferas = list(texto['NM_ESFERA'].unique()[:2])
+    categorias = list(texto['CATEGORIA_GASTO'].unique()[:4])
+    partidos = list(texto['SG_PARTIDO'].unique()[:10])
+    filtrado = filtrar_cubo(construir_cubo(dados), esferas, categorias, partidos)
+    transacoes = texto[
+        texto['NM_ESFERA'].isin(esferas) & texto['CATEGORIA_GASTO'].isin(categorias) & texto['SG_PARTIDO'].isin(partidos)
+    ]
+
+    comparar_cubos(filtrado, agrupar(transacoes))
+    resumo = resumo_cubo(filtrado)
+    assert resumo['valor_total'] == pytest.approx(transacoes['VR_LANCAMENTO_NUM'].sum())
+    assert resumo['transacoes'] == len(transacoes)
+    assert resumo['partidos'] == transacoes['SG_PARTIDO'].nunique()
+
+
+def test_somar_cubos_igual_ao_cubo_de_tudo(dados, texto):
+    metade = len(dados) // 2
+    somado = somar_cubos(construir_cubo(dados.iloc[:metade]), construir_cubo(dados.iloc[metade:]))
+    comparar_cubos(somado, agrupar(texto))
+
+
+def test_agrupar_cauda_preserva_os_totais(dados):
+    agregado = construir_cubo(dados).groupby(['NM_ESFERA', 'SG_PARTIDO'], observed=True)[
+        'VR_LANCAMENTO_NUM'].sum().reset_index()
+    resultado = agrupar_cauda(agregado, 'NM_ESFERA', 'SG_PARTIDO', 'VR_LANCAMENTO_NUM', 3)
+
+    antes = agregado.groupby('NM_ESFERA', observed=True)['VR_LANCAMENTO_NUM'].sum()
+    depois = resultado.groupby('NM_ESFERA', observed=True)['VR_LANCAMENTO_NUM'].sum()
+    np.testing.assert_allclose(depois.loc[antes.index], antes)
+    for esfera, grupo in resultado.groupby('NM_ESFERA', observed=True):
+        principais = agregado[agregado['NM_ESFERA'] == esfera].nlargest(3, 'VR_LANCAMENTO_NUM')
+        assert set(grupo['SG_PARTIDO']) == set(principais['SG_PARTIDO']) | {'Outros'}
@@ -0,0 +1,132 @@
+import hashlib
+import http.server
+import os
+import threading
+
+import pytest
+
+import download
+from download import ErroChecksum, GerenciadorDownload
+
+CONTEUDO = bytes(range(256)) * 400
+
+
+class ServidorArquivo(http.server.BaseHTTPRequestHandler):
+    """Serve CONTEUDO com suporte a Range; `cortes` respostas saem pela metade."""
+
+    conteudo = CONTEUDO
+    cortes = 0
+    sem_tamanho = False
+    faixas = []
+
+    def do_GET(self):
+        faixa = self.headers.get('Range')
+        type(self).faixas.append(faixa)
+        inicio = int(faixa[6:-1]) if faixa else 0
+        total = len(self.conteudo)
+        if inicio >= total:
+            self.send_response(416)
+            self.send_header('Content-Range', f"bytes */{total}")
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        corpo = self.conteudo[inicio:]
+        self.send_response(206 if faixa else 200)
+        if faixa:
+            self.send_header('Content-Range', f"bytes {inicio}-{total - 1}/{total}")
+        if not self.sem_tamanho:
+            self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        if type(self).cortes:
+            # Conexão interrompida no meio da resposta
+            type(self).cortes -= 1
+            corpo = corpo[:len(corpo) // 2]
+        self.wfile.write(corpo)
+        self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def servidor(monkeypatch):
+    monkeypatch.setattr(download.time, 'sleep', lambda segundos: None)
+    ServidorArquivo.cortes = 0
+    ServidorArquivo.sem_tamanho = False
+    ServidorArquivo.faixas = []
+    http_server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), ServidorArquivo)
+    thread = threading.Thread(target=http_server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{http_server.server_address[1]}/base.csv"
+    http_server.shutdown()
+    http_server.server_close()
+
+
+def test_retoma_apos_conexao_interrompida(servidor, tmp_path):
+    ServidorArquivo.cortes = 2
+    destino = str(tmp_path / "base.csv")
+
+    GerenciadorDownload(servidor, destino, tamanho_bloco=1024).baixar()
+
+    with open(destino, 'rb') as arquivo:
+        assert arquivo.read() == CONTEUDO
+    assert not os.path.exists(destino + ".part")
+    # A segunda e a terceira tentativas continuam de onde pararam
+    assert ServidorArquivo.faixas[0] is None
+    assert ServidorArquivo.faixas[1] == f"bytes={len(CONTEUDO) // 2}-"
+    assert len(ServidorArquivo.faixas) == 3
+
+
+def test_desiste_depois_das_tentativas(servidor, tmp_path):
+    ServidorArquivo.cortes = 10
+    destino = str(tmp_path / "base.csv")
+
+    with pytest.raises(OSError):
+        GerenciadorDownload(servidor, destino, tentativas=3).baixar()
+    assert len(ServidorArquivo.faixas) == 3
+    assert not os.path.exists(destino)
+
+
+def test_416_com_parcial_completo(servidor, tmp_path):
+    destino = str(tmp_path / "base.csv")
+    with open(destino + ".part", 'wb') as arquivo:
+        arquivo.write(CONTEUDO)
+
+    GerenciadorDownload(servidor, destino).baixar()
+
+    assert ServidorArquivo.faixas == [f"bytes={len(CONTEUDO)}-"]
+    with open(destino, 'rb') as arquivo:
+        assert arquivo.read() == CONTEUDO
+
+
+def test_416_com_parcial_maior_que_o_arquivo(servidor, tmp_path):
+    destino = str(tmp_path / "base.csv")
+    with open(destino + ".part", 'wb') as arquivo:
+        arquivo.write(CONTEUDO + b"lixo")
+
+    with pytest.raises(ErroChecksum):
+        GerenciadorDownload(servidor, destino).baixar()
+    assert not os.path.exists(destino)
+    assert not os.path.exists(destino + ".part")
+
+
+def test_sha256_divergente(servidor, tmp_path):
+    destino = str(tmp_path / "base.csv")
+
+    with pytest.raises(ErroChecksum):
+        GerenciadorDownload(servidor, destino, sha256="0" * 64).baixar()
+    assert not os.path.exists(destino)
+
+
+def test_sem_tamanho_exige_sha256(servidor, tmp_path):
+    ServidorArquivo.sem_tamanho = True
+    destino = str(tmp_path / "base.csv")
+
+    with pytest.raises(ErroChecksum):
+        GerenciadorDownload(servidor, destino).baixar()
+
+    sha256 = hashlib.sha256(CONTEUDO).hexdigest()
+    GerenciadorDownload(servidor, destino, sha256=sha256).baixar()
+    with open(destino, 'rb') as arquivo:
+        assert arquivo.read() == CONTEUDO
@@ -0,0 +1,55 @@
+import gzip
+import io
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from conftest import mesmas_linhas
+from exportacao import exportar
+
+COLUNAS = ['DT_LANCAMENTO', 'SG_PARTIDO', 'NM_CONTRAPARTE', 'VR_LANCAMENTO_NUM']
+
+SELECAO = {'SG_PARTIDO': ['PT', 'PSL'], 'DT_LANCAMENTO': (pd.Timestamp('2020-03-01'), pd.Timestamp('2020-08-31'))}
+
+
+def ler_exportacao(dados, formato, comprimir):
+    if formato == 'csv':
+        return pd.read_csv(io.BytesIO(gzip.decompress(dados) if comprimir else dados))
+    return pq.read_table(io.BytesIO(dados)).to_pandas()
+
+
+@pytest.fixture(params=['consultas_pandas', 'motor_duckdb'])
+def consultas(request):
+    return request.getfixturevalue(request.param)
+
+
+@pytest.mark.parametrize('selecao', [None, SELECAO])
+@pytest.mark.parametrize('formato', ['csv', 'parquet'])
+@pytest.mark.parametrize('comprimir', [False, True])
+def test_exportacao_volta_igual(consultas, consultas_pandas, selecao, formato, comprimir):
+    destino = io.BytesIO()
+    # Lotes pequenos: a exportação passa por vários blocos
+    gravados = exportar(consultas, destino, selecao, COLUNAS, formato, comprimir, linhas=400)
+
+    assert gravados == len(destino.getvalue())
+    lido = ler_exportacao(destino.getvalue(), formato, comprimir)
+    assert list(lido.columns) == COLUNAS
+    mesmas_linhas(lido, consultas_pandas.filtrar(selecao)[COLUNAS])
+
+
+@pytest.mark.parametrize('formato', ['csv', 'parquet'])
+def test_exportacao_vazia(consultas, formato):
+    destino = io.BytesIO()
+    exportar(consultas, destino, {'SG_PARTIDO': ['INEXISTENTE']}, COLUNAS, formato)
+
+    lido = ler_exportacao(destino.getvalue(), formato, False)
+    assert list(lido.columns) == COLUNAS and len(lido) == 0
+
+
+def test_exportacao_em_arquivo(consultas_pandas, tmp_path):
+    caminho = tmp_path / 'transacoes.csv.gz'
+    gravados = exportar(consultas_pandas, str(caminho), None, COLUNAS, 'csv', True)
+
+    assert caminho.stat().st_size == gravados
+    mesmas_linhas(pd.read_csv(caminho), consultas_pandas.dados[COLUNAS])
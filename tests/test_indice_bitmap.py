@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from indice_bitmap import DIMENSOES_FILTRO, IndiceBitmap
+
+
+@pytest.fixture(scope='module')
+def dados(consultas_pandas):
+    return consultas_pandas.dados
+
+
+@pytest.fixture(scope='module')
+def indice(dados):
+    return IndiceBitmap(dados)
+
+
+def mascara(dados, selecoes):
+    """Referência: E entre dimensões de máscaras isin."""
+    resultado = np.ones(len(dados), dtype=bool)
+    for dimensao, valores in selecoes.items():
+        resultado &= dados[dimensao].isin(valores).to_numpy()
+    return resultado
+
+
+def selecoes_aleatorias(dados, quantidade=30, semente=0):
+    gerador = np.random.default_rng(semente)
+    for _ in range(quantidade):
+        selecoes = {}
+        for dimensao in gerador.permutation(DIMENSOES_FILTRO)[:gerador.integers(1, 4)]:
+            opcoes = list(dados[dimensao].cat.categories)
+            selecoes[dimensao] = list(gerador.choice(opcoes, gerador.integers(1, len(opcoes) + 1), replace=False))
+        yield selecoes
+
+
+def test_selecionar_igual_a_mascara(dados, indice):
+    for selecoes in selecoes_aleatorias(dados):
+        posicoes = indice.selecionar(selecoes)
+        esperado = mascara(dados, selecoes)
+        if posicoes is None:
+            assert esperado.all()
+        else:
+            np.testing.assert_array_equal(posicoes, np.flatnonzero(esperado))
+
+
+def test_selecao_completa_nao_filtra(dados, indice):
+    todos = {dimensao: list(dados[dimensao].cat.categories) for dimensao in DIMENSOES_FILTRO}
+    assert indice.selecionar(todos) is None
+    assert indice.filtrar(dados, todos) is dados
+
+
+def test_valores_vazios_ou_ausentes(dados, indice):
+    assert len(indice.selecionar({'SG_PARTIDO': []})) == 0
+    assert len(indice.selecionar({'SG_PARTIDO': ['INEXISTENTE']})) == 0
+    partido = dados['SG_PARTIDO'].iloc[0]
+    np.testing.assert_array_equal(
+        indice.selecionar({'SG_PARTIDO': [partido, 'INEXISTENTE']}),
+        np.flatnonzero((dados['SG_PARTIDO'] == partido).to_numpy())
+    )
+
+
+def test_filtrar_igual_ao_frame_mascarado(dados, indice):
+    selecoes = next(selecoes_aleatorias(dados, semente=3))
+    pd.testing.assert_frame_equal(indice.filtrar(dados, selecoes), dados[mascara(dados, selecoes)])
+
+
+def test_linhas_fora_de_multiplo_de_oito():
+    dados = pd.DataFrame({dimensao: pd.Categorical(list('abcab')) for dimensao in DIMENSOES_FILTRO})
+    indice = IndiceBitmap(dados)
+    np.testing.assert_array_equal(indice.selecionar({'NM_ESFERA': ['b']}), [1, 4])
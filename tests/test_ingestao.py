@@ -0,0 +1,132 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import armazenamento
+from armazenamento import SUFIXO_VERSAO_ANTERIOR, abrir_dataset, dataset_existe, substituir_dataset
+from conftest import extrato_bruto, gravar_extrato_bruto
+from ingestao import (
+    carregar_manifesto, chave_manifesto, converter_valor_brasileiro, hash_arquivo, ingerir_arquivo,
+    salvar_manifesto
+)
+
+
+def criar_versao(diretorio, conteudo):
+    os.makedirs(diretorio)
+    with open(os.path.join(diretorio, 'peca.parquet'), 'w') as arquivo:
+        arquivo.write(conteudo)
+
+
+def ler_versao(diretorio):
+    with open(os.path.join(diretorio, 'peca.parquet')) as arquivo:
+        return arquivo.read()
+
+
+def test_substituir_dataset(tmp_path):
+    diretorio, temporario = str(tmp_path / 'dataset'), str(tmp_path / 'dataset.tmp')
+    criar_versao(diretorio, 'v1')
+    criar_versao(temporario, 'v2')
+
+    substituir_dataset(temporario, diretorio)
+
+    assert ler_versao(diretorio) == 'v2'
+    assert sorted(os.listdir(tmp_path)) == ['dataset']
+
+
+def test_substituir_dataset_com_falha_mantem_a_anterior(tmp_path):
+    diretorio = str(tmp_path / 'dataset')
+    criar_versao(diretorio, 'v1')
+
+    with pytest.raises(OSError):
+        substituir_dataset(str(tmp_path / 'inexistente'), diretorio)
+
+    assert ler_versao(diretorio) == 'v1'
+    assert sorted(os.listdir(tmp_path)) == ['dataset']
+
+
+def test_dataset_existe_espera_a_troca(tmp_path, monkeypatch):
+    monkeypatch.setattr(armazenamento, 'ESPERA_TROCA', 0.01)
+    diretorio = str(tmp_path / 'dataset')
+    # Meio da troca: a versão anterior já saiu do lugar e a nova ainda não entrou
+    criar_versao(diretorio + SUFIXO_VERSAO_ANTERIOR + '1', 'v1')
+    criar_versao(diretorio + '.tmp', 'v2')
+    troca = threading.Timer(0.1, os.replace, (diretorio + '.tmp', diretorio))
+    troca.start()
+    try:
+        assert dataset_existe(diretorio)
+    finally:
+        troca.join()
+
+
+def test_dataset_existe_sem_troca(tmp_path):
+    assert not dataset_existe(str(tmp_path / 'dataset'))
+    criar_versao(str(tmp_path / 'dataset'), 'v1')
+    assert dataset_existe(str(tmp_path / 'dataset'))
+
+
+def test_converter_valor_brasileiro():
+    valores = pd.Series(['1.234,56', '-1.234.567,8', '0,5', '1234', ' 12,00 ', 'abc', None])
+    esperado = [1234.56, -1234567.8, 0.5, 1234.0, 12.0, np.nan, np.nan]
+    np.testing.assert_array_equal(converter_valor_brasileiro(valores).to_numpy(), esperado)
+
+
+def test_converter_valor_com_ponto_decimal():
+    valores = pd.Series(['1234.56', '-0.75', '1e3'])
+    np.testing.assert_array_equal(converter_valor_brasileiro(valores).to_numpy(), [1234.56, -0.75, 1000.0])
+
+
+def linhas_por_ano(diretorio):
+    tabela = abrir_dataset(diretorio).to_table(columns=['ANO'])
+    return tabela.to_pandas()['ANO'].astype(str).value_counts().to_dict()
+
+
+def test_extratos_com_o_mesmo_nome_em_pastas_diferentes(tmp_path):
+    diretorio = str(tmp_path / 'dataset')
+    nome = 'extrato_bancario_partido_2020.csv'
+    (tmp_path / 'a').mkdir()
+    (tmp_path / 'b').mkdir()
+    primeiro = gravar_extrato_bruto(tmp_path / 'a' / nome, extrato_bruto(300, semente=1))
+    segundo = gravar_extrato_bruto(tmp_path / 'b' / nome, extrato_bruto(200, semente=2))
+
+    assert ingerir_arquivo(primeiro, diretorio)
+    assert ingerir_arquivo(segundo, diretorio)
+    assert linhas_por_ano(diretorio) == {'2020': 500}
+
+    # Uma nova versão do primeiro substitui só as peças dele
+    gravar_extrato_bruto(primeiro, extrato_bruto(100, semente=3))
+    assert ingerir_arquivo(primeiro, diretorio)
+    assert not ingerir_arquivo(segundo, diretorio)
+    assert linhas_por_ano(diretorio) == {'2020': 300}
+
+
+def test_mesmo_extrato_em_anos_diferentes(tmp_path):
+    diretorio = str(tmp_path / 'dataset')
+    caminho = gravar_extrato_bruto(tmp_path / 'extrato.csv', extrato_bruto(150))
+
+    assert ingerir_arquivo(caminho, diretorio, ano='2020')
+    assert ingerir_arquivo(caminho, diretorio, ano='2022')
+    assert not ingerir_arquivo(caminho, diretorio, ano='2020')
+    assert linhas_por_ano(diretorio) == {'2020': 150, '2022': 150}
+
+
+def test_manifesto_antigo_pelo_nome_do_arquivo(tmp_path):
+    diretorio = str(tmp_path / 'dataset')
+    caminho = gravar_extrato_bruto(tmp_path / 'extrato_bancario_partido_2020.csv', extrato_bruto(120))
+    ingerir_arquivo(caminho, diretorio)
+    # Manifesto e peças como eram gravados antes: chave pelo nome do arquivo
+    # e o início do hash do conteúdo como prefixo das peças
+    conteudo = hash_arquivo(caminho)
+    for raiz, _, nomes in os.walk(diretorio):
+        for nome in nomes:
+            if nome.endswith('.parquet'):
+                os.rename(os.path.join(raiz, nome), os.path.join(raiz, conteudo[:16] + '-' + nome.split('-', 1)[1]))
+    salvar_manifesto(diretorio, {'extrato_bancario_partido_2020.csv': {'hash': conteudo}})
+
+    assert not ingerir_arquivo(caminho, diretorio)
+    gravar_extrato_bruto(caminho, extrato_bruto(80, semente=5))
+    assert ingerir_arquivo(caminho, diretorio)
+    assert linhas_por_ano(diretorio) == {'2020': 80}
+    assert list(carregar_manifesto(diretorio)) == [chave_manifesto(caminho)]
@@ -0,0 +1,116 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import extrato_bruto, gravar_extrato_bruto
+from ingestao import converter_valor_brasileiro, hash_arquivo
+from perfil_extrato import (
+    ERRO_QUANTIS, LINHAS_AMOSTRA, Momentos, Quantis, carregar_perfil, gerar_perfil, perfilar_extrato
+)
+
+
+@pytest.fixture(scope='module')
+def extrato():
+    """Extrato bruto com valores negativos, zeros e campos ausentes."""
+    extrato = extrato_bruto(2000, semente=3)
+    gerador = np.random.default_rng(4)
+    negativos = gerador.random(len(extrato)) < 0.2
+    extrato.loc[negativos, 'VR_LANCAMENTO'] = '-' + extrato.loc[negativos, 'VR_LANCAMENTO']
+    extrato.loc[gerador.random(len(extrato)) < 0.02, 'VR_LANCAMENTO'] = '0,00'
+    extrato.loc[gerador.random(len(extrato)) < 0.05, 'NM_CONTRAPARTE'] = None
+    extrato['TP_LANCAMENTO'] = np.where(negativos, 'Débito', 'Crédito')
+    return extrato
+
+
+@pytest.fixture(scope='module')
+def caminho(extrato, tmp_path_factory):
+    return gravar_extrato_bruto(tmp_path_factory.mktemp('perfil') / 'extrato_bancario_partido_2020.csv', extrato)
+
+
+@pytest.fixture(scope='module')
+def lido(caminho):
+    """O extrato como o perfil o lê: tudo texto."""
+    return pd.read_csv(caminho, encoding='latin-1', sep=';', dtype=str)
+
+
+def comparar_perfis(perfil, esperado):
+    assert perfil.keys() == esperado.keys()
+    for chave in ['linhas', 'colunas', 'amostra', 'ausentes', 'tipos', 'distintos', 'exemplos', 'hash']:
+        assert perfil[chave] == esperado[chave]
+    assert perfil['valor'] == pytest.approx(esperado['valor'])
+    assert perfil['valor_total'] == pytest.approx(esperado['valor_total'])
+    assert perfil['partidos'].keys() == esperado['partidos'].keys()
+    for partido, totais in esperado['partidos'].items():
+        assert perfil['partidos'][partido] == pytest.approx(totais)
+
+
+@pytest.mark.parametrize('linhas_por_bloco', [7, 37, 500, 1999])
+def test_blocos_igual_a_uma_passada(caminho, linhas_por_bloco):
+    comparar_perfis(perfilar_extrato(caminho, linhas_por_bloco), perfilar_extrato(caminho, 10_000))
+
+
+def test_perfil_igual_ao_pandas(caminho, lido):
+    perfil = perfilar_extrato(caminho, 300)
+    valores = converter_valor_brasileiro(lido['VR_LANCAMENTO'])
+
+    assert perfil['linhas'] == len(lido)
+    assert perfil['colunas'] == list(lido.columns)
+    assert perfil['hash'] == hash_arquivo(caminho)
+    assert perfil['amostra'] == lido.head(LINHAS_AMOSTRA).astype(object).where(
+        lido.head(LINHAS_AMOSTRA).notna(), None).to_dict('records')
+    assert perfil['ausentes'] == lido.isna().sum().to_dict()
+    assert perfil['tipos'] == lido['TP_LANCAMENTO'].value_counts().to_dict()
+    assert perfil['distintos']['NM_CONTRAPARTE'] == lido['NM_CONTRAPARTE'].nunique()
+    assert perfil['distintos']['DS_LANCAMENTO'] == lido['DS_LANCAMENTO'].nunique()
+    assert perfil['exemplos']['NM_CONTRAPARTE'] == lido['NM_CONTRAPARTE'].dropna().head(5).tolist()
+
+    descricao = valores.describe()
+    for estatistica in ['count', 'mean', 'std', 'min', 'max']:
+        assert perfil['valor'][estatistica] == pytest.approx(descricao[estatistica])
+    assert perfil['valor_total'] == pytest.approx(valores.sum())
+    totais = valores.groupby(lido['SG_PARTIDO']).agg(['sum', 'count'])
+    assert perfil['partidos'] == {
+        partido: {'valor': pytest.approx(linha['sum']), 'transacoes': linha['count']}
+        for partido, linha in totais.iterrows()
+    }
+
+
+def test_momentos_mesclados():
+    valores = np.random.default_rng(0).normal(1e6, 10, 10_000)
+    mesclado = Momentos()
+    for parte in np.array_split(valores, 7):
+        mesclado = mesclado.mesclar(Momentos.de_valores(parte))
+    resultado = mesclado.resultado()
+    # Média alta e desvio pequeno: a soma de quadrados ingênua perderia os dígitos
+    assert resultado['std'] == pytest.approx(valores.std(ddof=1), rel=1e-9)
+    assert resultado['mean'] == pytest.approx(valores.mean(), rel=1e-12)
+    assert Momentos().mesclar(Momentos()).resultado()['mean'] is None
+
+
+def test_quantis_dentro_do_erro(lido):
+    valores = converter_valor_brasileiro(lido['VR_LANCAMENTO']).to_numpy(dtype=np.float64)
+    mesclado = Quantis()
+    for parte in np.array_split(valores, 9):
+        mesclado = mesclado.mesclar(Quantis.de_valores(parte))
+    ordenados = np.sort(valores)
+    probabilidades = [0, 0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 1]
+    for probabilidade, estimativa in zip(probabilidades, mesclado.quantis(probabilidades)):
+        exato = ordenados[int(probabilidade * (len(ordenados) - 1))]
+        assert abs(estimativa - exato) <= ERRO_QUANTIS * abs(exato) + 1e-12
+    assert Quantis().quantis([0.5]) == [None]
+
+
+def test_perfil_gravado_acompanha_o_arquivo(extrato, tmp_path):
+    caminho = gravar_extrato_bruto(tmp_path / 'extrato_bancario_partido_2020.csv', extrato)
+    perfil = gerar_perfil(caminho)
+    assert carregar_perfil(caminho) == perfil
+
+    # Só tocado: o hash confirma o perfil gravado
+    info = os.stat(caminho)
+    os.utime(caminho, ns=(info.st_atime_ns, info.st_mtime_ns + 10**9))
+    assert carregar_perfil(caminho)['hash'] == perfil['hash']
+
+    gravar_extrato_bruto(caminho, extrato.iloc[1:])
+    assert carregar_perfil(caminho) is None
@@ -0,0 +1,84 @@
+import pandas as pd
+import pytest
+
+from conftest import mesmas_linhas
+from cubo import DIMENSOES_CUBO
+from serie_temporal import (
+    agregar_mensal, construir_cubo_diario, cubo_no_periodo, limites_periodo, ordenar_por_data,
+    somar_cubos_diarios
+)
+
+PERIODOS = [
+    ('2020-01-01', '2020-12-31'),
+    ('2020-03-15', '2020-03-15'),
+    ('2020-02-10', '2020-07-31'),
+]
+
+
+@pytest.fixture(scope='module')
+def dados(consultas_pandas):
+    return consultas_pandas.dados
+
+
+def no_periodo(dados, inicio, fim):
+    dias = dados['DT_LANCAMENTO'].dt.normalize()
+    return dados[(dias >= pd.Timestamp(inicio)) & (dias <= pd.Timestamp(fim))]
+
+
+def agrupar(dados, por):
+    return dados.groupby(por + DIMENSOES_CUBO, observed=True).agg(
+        VR_LANCAMENTO_NUM=('VR_LANCAMENTO_NUM', 'sum'),
+        QTD_TRANSACOES=('VR_LANCAMENTO_NUM', 'size')
+    ).reset_index()
+
+
+def test_ordenar_por_data():
+    dados = pd.DataFrame({'DT_LANCAMENTO': pd.to_datetime(['2020-03-01', None, '2020-01-01', '2020-02-01']),
+                          'VALOR': [3, 0, 1, 2]})
+    ordenado = ordenar_por_data(dados)
+    assert ordenado['VALOR'].tolist() == [1, 2, 3, 0]
+    assert ordenar_por_data(ordenado) is ordenado
+
+
+@pytest.mark.parametrize('inicio, fim', PERIODOS)
+def test_limites_periodo_igual_a_mascara(dados, inicio, fim):
+    i, j = limites_periodo(dados['DT_LANCAMENTO'].to_numpy(), inicio, fim)
+    pd.testing.assert_frame_equal(dados.iloc[i:j], no_periodo(dados, inicio, fim))
+
+
+@pytest.mark.parametrize('inicio, fim', PERIODOS)
+def test_cubo_no_periodo_igual_ao_groupby(dados, inicio, fim):
+    cubo = cubo_no_periodo(construir_cubo_diario(dados), inicio, fim)
+    mesmas_linhas(cubo, agrupar(no_periodo(dados, inicio, fim), []))
+
+
+def test_periodo_sem_transacoes(dados):
+    assert limites_periodo(dados['DT_LANCAMENTO'].to_numpy(), '2019-01-01', '2019-12-31') == (0, 0)
+    assert len(cubo_no_periodo(construir_cubo_diario(dados), '2019-01-01', '2019-12-31')) == 0
+
+
+def test_agregar_mensal_igual_ao_groupby(dados):
+    mensal = agregar_mensal(construir_cubo_diario(dados))
+    esperado = agrupar(dados.assign(MES=dados['DT_LANCAMENTO'].dt.to_period('M').dt.to_timestamp()), ['MES'])
+    mesmas_linhas(mensal, esperado)
+
+
+def test_somar_cubos_diarios_igual_ao_cubo_de_tudo(dados):
+    # Um lote novo com dias já presentes no cubo e fora de ordem
+    embaralhado = dados.sample(frac=1, random_state=0)
+    metade = len(dados) // 2
+    somado = somar_cubos_diarios(construir_cubo_diario(embaralhado.iloc[:metade]),
+                                 construir_cubo_diario(embaralhado.iloc[metade:]))
+    assert somado['DIA'].is_monotonic_increasing
+    mesmas_linhas(somado, construir_cubo_diario(dados))
+
+
+@pytest.mark.parametrize('inicio, fim', PERIODOS[1:3])
+def test_consultas_no_periodo(consultas_pandas, dados, inicio, fim):
+    selecao = {'SG_PARTIDO': ['PT', 'PSL'], 'DT_LANCAMENTO': (pd.Timestamp(inicio), pd.Timestamp(fim))}
+    esperado = no_periodo(dados, inicio, fim)
+    esperado = esperado[esperado['SG_PARTIDO'].isin(['PT', 'PSL'])]
+
+    pd.testing.assert_frame_equal(consultas_pandas.filtrar(selecao), esperado)
+    assert consultas_pandas.resumo(selecao)['transacoes'] == len(esperado)
+    assert consultas_pandas.resumo(selecao)['valor_total'] == pytest.approx(esperado['VR_LANCAMENTO_NUM'].sum())